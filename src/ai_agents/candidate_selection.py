@@ -0,0 +1,167 @@
+# src/ai_agents/candidate_selection.py
+import asyncio
+import os
+import sys
+import httpx
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import (
+    SPIN_CANDIDATE_COUNT,
+    SPIN_CANDIDATE_TEMPERATURE,
+    SPIN_CANDIDATE_SCORING,
+    LLM_PROMPT_TOKEN_BUDGET,
+)
+from ai_agents.prompts import REVIEWER_PROMPT_TEMPLATE
+from ai_agents.llm_client import get_llm_client
+from ai_agents.token_budget import estimate_tokens, truncate_to_token_budget
+from ai_agents.writer_agent import build_spin_prompt, spin_chapter_content, store_spun_version
+from ai_agents.reviewer_agent import generate_review_text, store_review_comments
+from rl_system.reward_model import calculate_candidate_reward, calculate_review_reward, log_workflow_event
+from database.chroma_manager import ChromaManager
+
+async def generate_candidates(prompt: str, candidate_count: int, temperature: float = SPIN_CANDIDATE_TEMPERATURE,
+                              retries: int = 3) -> list:
+    """
+    Generates up to candidate_count texts for one writer prompt. All candidates are requested in a
+    single call with candidateCount; if the model rejects that (400) or returns fewer, the rest
+    are sampled with parallel single-candidate calls. Sampling never uses the response cache, or a
+    repeated run would replay the same candidates.
+
+    Returns:
+        list: Dictionaries with 'text' and 'finish_reason'. Empty if no candidate could be generated.
+    """
+    llm_client = get_llm_client()
+    candidates = []
+
+    try:
+        result = await llm_client.generate_content(
+            prompt,
+            timeout=120.0,
+            generation_config={"candidateCount": candidate_count, "temperature": temperature},
+            use_cache=False,
+            retries=retries,
+            purpose="writer_candidates"
+        )
+        for i, candidate in enumerate(result.get("candidates") or []):
+            text = llm_client.extract_text(result, i)
+            if text:
+                candidates.append({"text": text, "finish_reason": candidate.get("finishReason")})
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 400:
+            print(f"AI Writer: An HTTP status error occurred: {e.response.status_code} - {e.response.text}")
+            return candidates
+        print("AI Writer: Model rejected candidateCount, falling back to parallel requests.")
+    except httpx.RequestError as e:
+        print(f"AI Writer: An HTTP request error occurred: {e}")
+        return candidates
+
+    missing = candidate_count - len(candidates)
+    if missing > 0:
+        async def sample(seed: int):
+            # A distinct seed per call keeps the samples apart.
+            try:
+                result = await llm_client.generate_content(
+                    prompt,
+                    timeout=120.0,
+                    generation_config={"temperature": temperature, "seed": seed},
+                    use_cache=False,
+                    retries=retries,
+                    purpose="writer_candidates"
+                )
+            except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                print(f"AI Writer: Candidate request failed: {e}")
+                return None
+            text = llm_client.extract_text(result)
+            if not text:
+                return None
+            return {"text": text, "finish_reason": result["candidates"][0].get("finishReason")}
+
+        samples = await asyncio.gather(*(sample(len(candidates) + i) for i in range(missing)))
+        candidates.extend(s for s in samples if s is not None)
+
+    return candidates
+
+async def score_candidates(candidates: list, original_content: str, scoring: str = SPIN_CANDIDATE_SCORING,
+                           use_cache: bool = True, retries: int = 3) -> list:
+    """
+    Scores candidates in place. "heuristic" uses calculate_candidate_reward only; "review" also runs
+    a quick review of every candidate (concurrently) and adds its calculate_review_reward.
+
+    Returns:
+        list: The candidates, each with a 'score' and a 'review' (None unless scoring is "review").
+    """
+    for candidate in candidates:
+        candidate["score"] = calculate_candidate_reward(candidate["text"], original_content, candidate["finish_reason"])
+        candidate["review"] = None
+
+    if scoring == "review":
+        def review_prompt(text: str) -> str:
+            template_tokens = estimate_tokens(REVIEWER_PROMPT_TEMPLATE)
+            return REVIEWER_PROMPT_TEMPLATE.format(
+                spun_chapter_content=truncate_to_token_budget(text, LLM_PROMPT_TOKEN_BUDGET - template_tokens)
+            )
+
+        reviews = await asyncio.gather(*(
+            generate_review_text(review_prompt(c["text"]), use_cache=use_cache, retries=retries, purpose="reviewer_candidate")
+            for c in candidates
+        ))
+        for candidate, review in zip(candidates, reviews):
+            if not review.startswith("Error:"):
+                candidate["review"] = review
+                candidate["score"] += calculate_review_reward(review)
+    return candidates
+
+async def spin_best_of_n(chapter_id: str, original_content: str, feedback: str = '', candidate_count: int = SPIN_CANDIDATE_COUNT,
+                         scoring: str = SPIN_CANDIDATE_SCORING, use_cache: bool = True, retries: int = 3,
+                         chroma_manager: ChromaManager = None) -> tuple:
+    """
+    Generates several candidates for the chapter, scores them and stores only the best one as the new
+    'spun' version. With "review" scoring the winner's review is stored as 'review_comments' too,
+    so no separate reviewer call is needed.
+
+    Args:
+        chapter_id (str): The ID of the chapter being spun.
+        original_content (str): The original chapter content to be spun.
+        feedback (str): Optional feedback from a human reviewer for revisions.
+        candidate_count (int): Number of candidates to generate.
+        scoring (str): "review" or "heuristic" (see SPIN_CANDIDATE_SCORING).
+        use_cache (bool): Reuse cached responses for the scoring reviews (and a single-candidate spin).
+                          Candidates are always sampled fresh.
+        retries (int): Number of times to retry on API errors (429, 5xx, network).
+        chroma_manager (ChromaManager, optional): Where to store the results; defaults to the process-wide instance.
+
+    Returns:
+        tuple: (spun_content, review_comments). spun_content may be an error message starting with "Error:";
+               review_comments is None if the chapter still has to be reviewed.
+    """
+    prompt = build_spin_prompt(original_content, feedback)
+    if candidate_count <= 1 or estimate_tokens(prompt) > LLM_PROMPT_TOKEN_BUDGET:
+        # Oversized chapters are chunked/truncated by spin_chapter_content; candidates are only compared for whole chapters.
+        print("AI Writer: Generating a single candidate.")
+        return await spin_chapter_content(chapter_id, original_content, feedback=feedback, retries=retries, use_cache=use_cache,
+                                          chroma_manager=chroma_manager), None
+
+    print(f"AI Writer: Generating {candidate_count} candidates (scoring: {scoring})...")
+    candidates = await generate_candidates(prompt, candidate_count, retries=retries)
+    if not candidates:
+        return "Error: Could not generate any candidate.", None
+
+    await score_candidates(candidates, original_content, scoring=scoring, use_cache=use_cache, retries=retries)
+    best = max(candidates, key=lambda c: c["score"])
+    scores = [round(c["score"], 3) for c in candidates]
+    print(f"AI Writer: Candidate scores {scores}, keeping the best ({best['score']:.3f}).")
+
+    version_id = await asyncio.to_thread(store_spun_version, chapter_id, best["text"], feedback, extra_metadata={
+        "spin_mode": "best_of_n",
+        "candidate_count": len(candidates),
+        "candidate_scoring": scoring,
+        "candidate_score": round(best["score"], 3)
+    }, chroma_manager=chroma_manager)
+    log_workflow_event("ai_candidate_selection", chapter_id, version_id, best["score"], {"scores": scores, "scoring": scoring})
+
+    if best["review"] is not None:
+        await asyncio.to_thread(store_review_comments, chapter_id, best["review"], extra_metadata={"review_mode": "candidate_selection"},
+                                chroma_manager=chroma_manager)
+    return best["text"], best["review"]
@@ -0,0 +1,358 @@
+# src/ai_agents/llm_client.py
+import asyncio
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import httpx
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    GEMINI_API_BASE_URL,
+    LLM_HTTP2,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_CONNECT_TIMEOUT,
+    LLM_CACHE_ENABLED,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+)
+from ai_agents.response_cache import get_response_cache
+from ai_agents.rate_limiter import get_rate_limiter, parse_retry_after, backoff_delay
+from ai_agents.token_budget import estimate_tokens, get_usage_tracker
+
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+class LLMClient:
+    """
+    Pooled async client for the Gemini REST API.
+
+    One httpx.AsyncClient (connection pool, keep-alive, HTTP/2) is kept per event loop,
+    so repeated generations reuse open connections instead of paying a new TLS handshake.
+    """
+    def __init__(self, model: str = GEMINI_MODEL, api_key: str = GEMINI_API_KEY, base_url: str = GEMINI_API_BASE_URL):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.http2 = LLM_HTTP2 and _HTTP2_AVAILABLE
+        if LLM_HTTP2 and not _HTTP2_AVAILABLE:
+            print("LLM Client: 'h2' package not installed, falling back to HTTP/1.1.")
+        self.limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        )
+        # httpx clients are bound to the event loop they were first used on.
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Forget clients whose event loop has already been closed (e.g. finished asyncio.run calls).
+            for stale_loop in [l for l in self._clients if l.is_closed()]:
+                del self._clients[stale_loop]
+
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    http2=self.http2,
+                    limits=self.limits,
+                    timeout=httpx.Timeout(None, connect=LLM_CONNECT_TIMEOUT),
+                    headers={'Content-Type': 'application/json'}
+                )
+                self._clients[loop] = client
+        return client
+
+    def build_url(self, method: str = "generateContent", model: str = None) -> str:
+        """
+        Builds the Gemini REST URL for the given model method (e.g. "generateContent").
+        """
+        return f"{self.base_url}/models/{model or self.model}:{method}?key={self.api_key}"
+
+    @staticmethod
+    def build_payload(prompt: str, generation_config: dict = None) -> dict:
+        """
+        Builds a single-turn user request body for the given prompt.
+        """
+        payload = {
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [{"text": prompt}]
+                }
+            ]
+        }
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        return payload
+
+    @staticmethod
+    def extract_text(result: dict, candidate_index: int = 0) -> str:
+        """
+        Extracts the generated text from a generateContent response.
+
+        Returns:
+            str: The concatenated text parts of the candidate, or None if the response
+                 does not have the expected structure.
+        """
+        candidates = result.get("candidates") if isinstance(result, dict) else None
+        if not candidates or len(candidates) <= candidate_index:
+            return None
+        parts = (candidates[candidate_index].get("content") or {}).get("parts")
+        if not parts:
+            return None
+        return "".join(part.get("text", "") for part in parts)
+
+    def _retry_delay(self, error: Exception, attempt: int, retries: int, backoff_base: float) -> float:
+        """
+        Decides whether a failed request is retried. 429s also throttle the shared rate limiter.
+
+        Returns:
+            float: Seconds to sleep before the next attempt, or None if the error should be raised.
+        """
+        retry_after = None
+        if isinstance(error, httpx.HTTPStatusError):
+            status_code = error.response.status_code
+            if status_code == 429:
+                retry_after = parse_retry_after(error.response)
+                get_rate_limiter().on_rate_limited(retry_after)
+            elif 500 <= status_code < 600:
+                retry_after = parse_retry_after(error.response)
+            else:
+                return None
+        elif not isinstance(error, httpx.RequestError):
+            return None
+
+        if attempt >= retries:
+            return None
+        return backoff_delay(attempt, backoff_base, LLM_RETRY_MAX_DELAY, retry_after)
+
+    async def generate_content(self, prompt: str, timeout: float = 60.0, generation_config: dict = None, use_cache: bool = True,
+                               retries: int = LLM_MAX_RETRIES, backoff_base: float = LLM_RETRY_BASE_DELAY, purpose: str = "generic") -> dict:
+        """
+        Sends a generateContent request and returns the parsed JSON response.
+        Responses with generated text are served from / stored in the response cache
+        unless use_cache is False or LLM_CACHE_ENABLED is off.
+
+        Every attempt waits for the shared rate limiter. 429, 5xx and network errors are retried
+        up to `retries` times with jittered exponential backoff (starting at backoff_base seconds).
+        The response's usageMetadata is recorded under `purpose` (e.g. "writer") by the usage tracker.
+
+        Raises:
+            httpx.RequestError: On network problems once retries are exhausted.
+            httpx.HTTPStatusError: On non-2xx API responses that are not retried or once retries are exhausted.
+        """
+        use_cache = use_cache and LLM_CACHE_ENABLED
+        if use_cache:
+            cache = get_response_cache()
+            cache_key = cache.make_key(self.model, prompt, generation_config)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"LLM Client: Cache hit for request {cache_key[:12]}.")
+                return cached
+
+        client = self._get_http_client()
+        rate_limiter = get_rate_limiter()
+        estimated_tokens = estimate_tokens(prompt)
+
+        started = time.perf_counter()
+        for attempt in range(retries + 1):
+            await rate_limiter.acquire(estimated_tokens)
+            try:
+                response = await client.post(
+                    self.build_url("generateContent"),
+                    json=self.build_payload(prompt, generation_config),
+                    timeout=timeout
+                )
+                response.raise_for_status()
+            except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                delay = self._retry_delay(e, attempt, retries, backoff_base)
+                if delay is None:
+                    raise
+                reason = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                print(f"LLM Client: Request failed ({reason}). Retrying in {delay:.1f} seconds (Attempt {attempt + 1}/{retries})...")
+                await asyncio.sleep(delay)
+                continue
+
+            rate_limiter.on_success()
+            result = response.json()
+            usage = result.get("usageMetadata")
+            rate_limiter.record_usage(estimated_tokens, (usage or {}).get("totalTokenCount"))
+            get_usage_tracker().record(purpose, self.model, usage, estimated_tokens, time.perf_counter() - started)
+
+            # Only cache usable answers, so a malformed or empty response is retried next time.
+            if use_cache and self.extract_text(result):
+                cache.set(cache_key, result)
+            return result
+
+    async def stream_generate_content(self, prompt: str, timeout: float = 120.0, generation_config: dict = None, use_cache: bool = True,
+                                      retries: int = LLM_MAX_RETRIES, backoff_base: float = LLM_RETRY_BASE_DELAY, purpose: str = "generic"):
+        """
+        Sends a streamGenerateContent request and yields text chunks as they arrive.
+        The timeout applies to each read, not to the whole generation. A cached response
+        is yielded as a single chunk, and a completed stream is written back to the cache.
+
+        Opening the stream is rate limited and retried like generate_content; once text has been
+        yielded, errors are raised instead of retried so callers never receive duplicate text.
+
+        Raises:
+            httpx.RequestError: On network problems.
+            httpx.HTTPStatusError: On non-2xx API responses.
+        """
+        use_cache = use_cache and LLM_CACHE_ENABLED
+        if use_cache:
+            cache = get_response_cache()
+            cache_key = cache.make_key(self.model, prompt, generation_config)
+            cached = cache.get(cache_key)
+            cached_text = self.extract_text(cached) if cached is not None else None
+            if cached_text:
+                print(f"LLM Client: Cache hit for streamed request {cache_key[:12]}.")
+                yield cached_text
+                return
+
+        client = self._get_http_client()
+        rate_limiter = get_rate_limiter()
+        estimated_tokens = estimate_tokens(prompt)
+        parts = []
+        usage = None
+
+        started = time.perf_counter()
+        for attempt in range(retries + 1):
+            await rate_limiter.acquire(estimated_tokens)
+            try:
+                async with client.stream(
+                    "POST",
+                    self.build_url("streamGenerateContent") + "&alt=sse",
+                    json=self.build_payload(prompt, generation_config),
+                    timeout=timeout
+                ) as response:
+                    if response.is_error:
+                        await response.aread() # Make the error body available to callers
+                        response.raise_for_status()
+                    rate_limiter.on_success()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if not data:
+                            continue
+                        chunk = json.loads(data)
+                        usage = chunk.get("usageMetadata") or usage
+                        chunk_text = self.extract_text(chunk)
+                        if chunk_text:
+                            parts.append(chunk_text)
+                            yield chunk_text
+                break
+            except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                delay = None if parts else self._retry_delay(e, attempt, retries, backoff_base)
+                if delay is None:
+                    raise
+                reason = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                print(f"LLM Client: Stream request failed ({reason}). Retrying in {delay:.1f} seconds (Attempt {attempt + 1}/{retries})...")
+                await asyncio.sleep(delay)
+
+        rate_limiter.record_usage(estimated_tokens, (usage or {}).get("totalTokenCount"))
+        get_usage_tracker().record(purpose, self.model, usage, estimated_tokens, time.perf_counter() - started)
+        if use_cache and parts:
+            cache.set(cache_key, {"candidates": [{"content": {"role": "model", "parts": [{"text": "".join(parts)}]}}]})
+
+    async def aclose(self):
+        """
+        Closes the pooled HTTP client belonging to the current event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """
+    Returns the process-wide LLMClient, creating it on first use.
+    """
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient()
+    return _llm_client
+
+
+# --- Shared background event loop ---
+# Flask runs every async view in a fresh event loop, which would throw away the connection pool
+# after each request. Coroutines submitted here run on one long-lived loop instead.
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            _background_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_background_loop.run_forever, name="llm-client-loop", daemon=True)
+            thread.start()
+    return _background_loop
+
+def run_coroutine(coro):
+    """
+    Schedules a coroutine on the process-wide LLM event loop.
+
+    Returns:
+        concurrent.futures.Future: Await it from another loop with asyncio.wrap_future(),
+                                   or call .result() from synchronous code.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+
+def iterate_in_background(async_iterable):
+    """
+    Drives an async iterator on the process-wide LLM event loop and yields its items synchronously.
+    Used to feed async generators into Flask streaming responses.
+    """
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                item = run_coroutine(iterator.__anext__()).result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        # Runs when the client disconnects early, so the upstream stream is closed too.
+        if hasattr(iterator, "aclose"):
+            run_coroutine(iterator.aclose()).result()
+
+def shutdown():
+    """
+    Closes the pooled connections of the background loop and stops it.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        loop = _background_loop
+        _background_loop = None
+    if loop is None or loop.is_closed():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(get_llm_client().aclose(), loop).result(timeout=5)
+    except Exception as e:
+        print(f"LLM Client: Error while closing HTTP client: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+atexit.register(shutdown)
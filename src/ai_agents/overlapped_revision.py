@@ -0,0 +1,60 @@
+# src/ai_agents/overlapped_revision.py
+import asyncio
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents.writer_agent import spin_chapter_content_chunked
+from ai_agents.reviewer_agent import review_section_content, merge_section_reviews, store_review_comments
+from database.chroma_manager import ChromaManager
+
+async def spin_and_review_overlapped(chapter_id: str, original_content: str, feedback: str = '', use_cache: bool = True,
+                                     chroma_manager: ChromaManager = None) -> tuple:
+    """
+    Runs the writer and reviewer as a pipeline: the chapter is spun in sections, and each finished
+    section is reviewed while later sections are still being written. The section reviews are
+    merged into one 'review_comments' version once the whole chapter has been spun and stored.
+
+    Args:
+        chapter_id (str): The ID of the chapter being revised.
+        original_content (str): The original chapter content to be spun.
+        feedback (str): Optional feedback from a human reviewer for revisions.
+        use_cache (bool): Reuse cached responses for identical prompts. Pass False for fresh sampling.
+        chroma_manager (ChromaManager, optional): Where to store the results; defaults to the process-wide instance.
+
+    Returns:
+        tuple: (spun_content, review_comments). Either may be an error message starting with "Error:";
+               if spinning fails, no review is produced.
+    """
+    review_tasks = {}
+
+    def on_window_spun(index: int, window_count: int, spun_text: str):
+        review_tasks[index] = asyncio.create_task(
+            review_section_content(spun_text, index + 1, window_count, use_cache=use_cache)
+        )
+
+    print("AI Pipeline: Starting overlapped writer/reviewer run...")
+    spun_content = await spin_chapter_content_chunked(
+        chapter_id, original_content, feedback=feedback, use_cache=use_cache, on_window_spun=on_window_spun,
+        chroma_manager=chroma_manager
+    )
+
+    if spun_content.startswith("Error:"):
+        for task in review_tasks.values():
+            task.cancel()
+        await asyncio.gather(*review_tasks.values(), return_exceptions=True)
+        return spun_content, "Error: Review skipped because spinning failed."
+
+    section_reviews = await asyncio.gather(*(review_tasks[i] for i in sorted(review_tasks)))
+    failed = [i + 1 for i, review in enumerate(section_reviews) if review.startswith("Error:")]
+    if failed:
+        print(f"AI Pipeline: Failed to review sections {failed}.")
+        return spun_content, f"Error: Failed to review {len(failed)} of {len(section_reviews)} sections: {section_reviews[failed[0] - 1]}"
+
+    review_comments = merge_section_reviews(section_reviews)
+    print("AI Reviewer: Review completed successfully (overlapped)!")
+    await asyncio.to_thread(store_review_comments, chapter_id, review_comments,
+                            extra_metadata={"review_mode": "sectioned", "section_count": len(section_reviews)}, chroma_manager=chroma_manager)
+    return spun_content, review_comments
@@ -34,3 +34,58 @@ Here is the "spun" chapter content to review:
 
 Please provide a detailed review, including a summary of strengths, weaknesses, and actionable suggestions for improvement.
 """
+
+# Prompt for spinning one window of a long chapter (chunked mode).
+# The surrounding context keeps tone and continuity consistent across windows but must not be rewritten.
+CHUNK_WRITER_PROMPT_TEMPLATE = """
+You are an AI book writer. You are rewriting a long chapter one section at a time.
+Only rewrite the section marked "Section to Rewrite". The preceding and following context is shown
+so that your section connects smoothly with its neighbours; do not rewrite or repeat it.
+
+Here are the instructions for this rewrite:
+{instructions}
+
+**Preceding Context (do not rewrite):**
+---
+{context_before}
+---
+
+**Section to Rewrite (part {window_number} of {window_count}):**
+---
+{chapter_content}
+---
+
+**Following Context (do not rewrite):**
+---
+{context_after}
+---
+
+Please provide only the rewritten section below:
+"""
+
+# Default instructions used by CHUNK_WRITER_PROMPT_TEMPLATE when no human feedback is given.
+CHUNK_WRITER_DEFAULT_INSTRUCTIONS = """- **Audience:** Rewrite this section for a general audience, making it more engaging and accessible with a simple english, such that it is understandable.
+- **Tone:** Maintain a slightly formal but captivating tone, suitable for a narrative book.
+- **Length:** Expand the content slightly, aiming for about 1.5 times the original length, but do not add new factual information not present in the original.
+- **Focus:** Emphasize the narrative flow and character actions, if any are implied."""
+
+# Prompt for reviewing one section of a spun chapter while later sections are still being written.
+SECTION_REVIEWER_PROMPT_TEMPLATE = """
+You are an AI book reviewer. You are reviewing a long "spun" chapter one section at a time,
+while the remaining sections are still being written. Review only the section below (part {section_number} of {section_count}).
+Do not comment on missing content that may appear in other sections.
+
+Assess it on:
+- **Coherence & Flow:** Does the section read smoothly? Are there any abrupt transitions?
+- **Grammar & Spelling:** Identify any grammatical errors, typos, or punctuation mistakes.
+- **Adherence to Instructions:** Does it suit a general audience with a slightly formal but captivating tone?
+- **Engagement:** Is the content engaging and interesting?
+- **Potential Improvements:** Suggest specific sentences that could be improved.
+
+Here is the section to review:
+---
+{section_content}
+---
+
+Please provide a concise review of this section with strengths, weaknesses, and actionable suggestions.
+"""
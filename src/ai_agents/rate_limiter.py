@@ -0,0 +1,175 @@
+# src/ai_agents/rate_limiter.py
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+    Callers reserve capacity up front and are told how long to wait if the bucket went into debt.
+    Not thread-safe on its own; AdaptiveRateLimiter serialises access.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0 # Tokens per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Takes amount tokens from the bucket.
+
+        Returns:
+            float: Seconds the caller has to wait until its reservation is covered (0 if available now).
+        """
+        self._refill(now)
+        self.tokens -= amount
+        if self.tokens >= 0 or self.rate <= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        """
+        Returns (or, if negative, additionally charges) tokens, e.g. after the real usage is known.
+        """
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def set_rate(self, per_minute: float):
+        self._refill(time.monotonic())
+        self.rate = per_minute / 60.0
+
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide limiter for requests/min and tokens/min.
+
+    Uses additive-increase/multiplicative-decrease: every 429 halves the allowed rate (down to
+    min_fraction of the quota) and pauses all callers for the Retry-After period, and every
+    success restores a little of the rate, so throughput settles just under the quota.
+    Safe to share between threads and event loops.
+    """
+    def __init__(self, requests_per_minute: int = GEMINI_REQUESTS_PER_MINUTE, tokens_per_minute: int = GEMINI_TOKENS_PER_MINUTE,
+                 min_fraction: float = 0.1, increase_step: float = 0.05):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_fraction = min_fraction
+        self.increase_step = increase_step
+
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.rate_fraction = 1.0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _apply_rate_fraction(self):
+        self.request_bucket.set_rate(self.requests_per_minute * self.rate_fraction)
+        self.token_bucket.set_rate(self.tokens_per_minute * self.rate_fraction)
+
+    async def acquire(self, estimated_tokens: int = 0):
+        """
+        Waits until one request of roughly estimated_tokens tokens may be sent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.blocked_until - now,
+                self.request_bucket.reserve(1, now),
+                self.token_bucket.reserve(estimated_tokens, now)
+            )
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate_fraction < 1.0:
+                self.rate_fraction = min(1.0, self.rate_fraction + self.increase_step)
+                self._apply_rate_fraction()
+
+    def on_rate_limited(self, retry_after: float = None):
+        with self._lock:
+            self.rate_fraction = max(self.min_fraction, self.rate_fraction / 2)
+            self._apply_rate_fraction()
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        print(f"Rate Limiter: Rate limited by API, throttling to {self.rate_fraction:.0%} of quota"
+              + (f" and pausing for {retry_after:.1f}s." if retry_after else "."))
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Corrects the token bucket once the real token usage of a request is known.
+        """
+        if actual_tokens is None:
+            return
+        with self._lock:
+            self.token_bucket.refund(estimated_tokens - actual_tokens)
+
+
+def parse_retry_after(response) -> float:
+    """
+    Extracts the server's retry hint from a 429/503 response: the Retry-After header
+    (seconds or HTTP date) or the retryDelay of a Gemini RetryInfo error detail.
+
+    Returns:
+        float: Seconds to wait, or None if the response carries no hint.
+    """
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(header) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        details = response.json().get("error", {}).get("details", [])
+    except Exception:
+        return None
+    for detail in details:
+        retry_delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(retry_delay, str) and retry_delay.endswith("s"):
+            try:
+                return float(retry_delay[:-1])
+            except ValueError:
+                continue
+    return None
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: float = None) -> float:
+    """
+    Full-jitter exponential backoff. A server-provided retry_after is used as the lower bound.
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """
+    Returns the process-wide AdaptiveRateLimiter, creating it on first use.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = AdaptiveRateLimiter()
+    return _rate_limiter
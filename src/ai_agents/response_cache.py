@@ -0,0 +1,125 @@
+# src/ai_agents/response_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES
+
+
+class ResponseCache:
+    """
+    Content-addressed, disk-backed cache for LLM responses.
+
+    Entries are keyed on a hash of model + prompt + generation params, expire after a TTL,
+    and the least recently used entries are evicted once the cache exceeds its size budget.
+    """
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL_SECONDS, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, generation_config: dict = None) -> str:
+        """
+        Returns the SHA-256 key for a request.
+        """
+        raw = json.dumps(
+            {"model": model, "prompt": prompt, "generation_config": generation_config or {}},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict:
+        """
+        Returns the cached response for the key, or None if missing or expired.
+        """
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                response, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(response)
+        except Exception as e:
+            print(f"LLM Cache: Error reading cache entry: {e}")
+            return None
+
+    def set(self, key: str, response: dict):
+        """
+        Stores a response and evicts expired and least recently used entries if needed.
+        """
+        now = time.time()
+        serialized = json.dumps(response, ensure_ascii=False)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, serialized, len(serialized.encode("utf-8")), now, now)
+                )
+                self._evict(now)
+        except Exception as e:
+            print(f"LLM Cache: Error writing cache entry: {e}")
+
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+            if total_size <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total_size -= size
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide ResponseCache, creating it on first use.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
@@ -9,11 +9,75 @@ import httpx
 # Add the parent directory to the Python path to allow imports from src/
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from config import GEMINI_API_KEY, DEFAULT_CHAPTER_ID
-from ai_agents.prompts import REVIEWER_PROMPT_TEMPLATE
-from database.chroma_manager import ChromaManager
+from config import DEFAULT_CHAPTER_ID, LLM_PROMPT_TOKEN_BUDGET, LLM_OVERSIZE_STRATEGY
+from ai_agents.prompts import REVIEWER_PROMPT_TEMPLATE, SECTION_REVIEWER_PROMPT_TEMPLATE
+from ai_agents.llm_client import get_llm_client
+from ai_agents.token_budget import estimate_tokens, truncate_to_token_budget
+from database.chroma_manager import ChromaManager, get_chroma_manager
+
+def store_review_comments(chapter_id: str, review_comments: str, extra_metadata: dict = None,
+                          chroma_manager: ChromaManager = None) -> str:
+    """
+    Stores review comments in ChromaDB as a new 'review_comments' version.
+    extra_metadata is merged into the version metadata (e.g. how the review was produced).
+    chroma_manager defaults to the process-wide instance.
+
+    Returns:
+        str: The new version ID, or None if storing failed.
+    """
+    metadata = {"reviewed_version_type": "spun"}
+    if extra_metadata:
+        metadata.update(extra_metadata)
+
+    chroma_manager = chroma_manager or get_chroma_manager()
+    version_id = chroma_manager.add_chapter_version(
+        chapter_id=chapter_id,
+        content=review_comments,
+        version_type="review_comments",
+        metadata=metadata
+    )
+    if version_id:
+        print(f"AI Reviewer: Review comments stored in ChromaDB with ID: {version_id}")
+    else:
+        print("AI Reviewer: Failed to store review comments in ChromaDB.")
+    return version_id
+
+async def generate_review_text(prompt: str, use_cache: bool = True, retries: int = 3, purpose: str = "reviewer") -> str:
+    """
+    Sends a reviewer prompt to the LLM. Nothing is stored.
 
-async def review_chapter_content(chapter_id: str, spun_chapter_content: str) -> str:
+    Returns:
+        str: The review comments, or an error message starting with "Error:".
+    """
+    llm_client = get_llm_client()
+
+    try:
+        result = await llm_client.generate_content(prompt, timeout=60.0, use_cache=use_cache, retries=retries, purpose=purpose)
+
+        review_comments = llm_client.extract_text(result)
+        if review_comments is not None:
+            if review_comments:
+                return review_comments
+            else:
+                print("AI Reviewer: Warning - Review comments text part is empty.")
+                return "Error: Review comments text part is empty."
+        else:
+            print("AI Reviewer: Error - No review generated or unexpected response structure.")
+            print(f"Full API response: {result}")
+            return "Error: Could not generate review comments."
+
+    except httpx.RequestError as e:
+        print(f"AI Reviewer: An HTTP request error occurred: {e}")
+        return f"Error: Failed to review content due to network or request issue: {e}"
+    except httpx.HTTPStatusError as e:
+        print(f"AI Reviewer: An HTTP status error occurred: {e.response.status_code} - {e.response.text}")
+        return f"Error: Failed to review content due to API error: {e.response.status_code}"
+    except Exception as e:
+        print(f"AI Reviewer: An unexpected error occurred: {e}")
+        return f"Error: Failed to review content due to unexpected issue: {e}"
+
+async def review_chapter_content(chapter_id: str, spun_chapter_content: str, use_cache: bool = True, retries: int = 3,
+                                 chroma_manager: ChromaManager = None) -> str:
     """
     Uses an LLM (Gemini) to review the given spun chapter content.
     Stores the review comments in ChromaDB.
@@ -21,6 +85,9 @@ async def review_chapter_content(chapter_id: str, spun_chapter_content: str) ->
     Args:
         chapter_id (str): The ID of the chapter being reviewed.
         spun_chapter_content (str): The spun chapter content to be reviewed.
+        use_cache (bool): Reuse a cached response for an identical prompt. Pass False for fresh sampling.
+        retries (int): Number of times to retry on API errors (429, 5xx, network) via the shared rate-limited client.
+        chroma_manager (ChromaManager, optional): Where to store the review; defaults to the process-wide instance.
 
     Returns:
         str: The review comments from the AI Reviewer, or an error message.
@@ -28,74 +95,112 @@ async def review_chapter_content(chapter_id: str, spun_chapter_content: str) ->
     print("AI Reviewer: Reviewing spun chapter content...")
 
     prompt = REVIEWER_PROMPT_TEMPLATE.format(spun_chapter_content=spun_chapter_content)
-    payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
-    }
-
-    apiUrl = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                apiUrl,
-                headers={'Content-Type': 'application/json'},
-                json=payload,
-                timeout=60.0
+
+    prompt_tokens = estimate_tokens(prompt)
+    if prompt_tokens > LLM_PROMPT_TOKEN_BUDGET:
+        print(f"AI Reviewer: Prompt is ~{prompt_tokens} tokens, over the budget of {LLM_PROMPT_TOKEN_BUDGET} (strategy: {LLM_OVERSIZE_STRATEGY}).")
+        if LLM_OVERSIZE_STRATEGY == "chunk":
+            return await review_chapter_in_sections(chapter_id, spun_chapter_content, use_cache=use_cache, retries=retries,
+                                                    chroma_manager=chroma_manager)
+        elif LLM_OVERSIZE_STRATEGY == "truncate":
+            template_tokens = prompt_tokens - estimate_tokens(spun_chapter_content)
+            prompt = REVIEWER_PROMPT_TEMPLATE.format(
+                spun_chapter_content=truncate_to_token_budget(spun_chapter_content, LLM_PROMPT_TOKEN_BUDGET - template_tokens)
             )
-            response.raise_for_status()
-
-            result = response.json()
-
-            if result.get("candidates") and len(result["candidates"]) > 0 and \
-               result["candidates"][0].get("content") and \
-               result["candidates"][0]["content"].get("parts") and \
-               len(result["candidates"][0]["content"]["parts"]) > 0:
-                review_comments = result["candidates"][0]["content"]["parts"][0].get("text", "")
-                if review_comments:
-                    print("AI Reviewer: Review completed successfully!")
-                    
-                    chroma_manager = ChromaManager()
-                    version_id = chroma_manager.add_chapter_version(
-                        chapter_id=chapter_id,
-                        content=review_comments,
-                        version_type="review_comments",
-                        metadata={"reviewed_version_type": "spun"}
-                    )
-                    if version_id:
-                        print(f"AI Reviewer: Review comments stored in ChromaDB with ID: {version_id}")
-                    else:
-                        print("AI Reviewer: Failed to store review comments in ChromaDB.")
-
-                    return review_comments
-                else:
-                    print("AI Reviewer: Warning - Review comments text part is empty.")
-                    return "Error: Review comments text part is empty."
-            else:
-                print("AI Reviewer: Error - No review generated or unexpected response structure.")
-                print(f"Full API response: {result}")
-                return "Error: Could not generate review comments."
-
-        except httpx.RequestError as e:
-            print(f"AI Reviewer: An HTTP request error occurred: {e}")
-            return f"Error: Failed to review content due to network or request issue: {e}"
-        except httpx.HTTPStatusError as e:
-            print(f"AI Reviewer: An HTTP status error occurred: {e.response.status_code} - {e.response.text}")
-            return f"Error: Failed to review content due to API error: {e.response.status_code}"
-        except Exception as e:
-            print(f"AI Reviewer: An unexpected error occurred: {e}")
-            return f"Error: Failed to review content due to unexpected issue: {e}"
+        else:
+            return f"Error: Prompt of ~{prompt_tokens} tokens exceeds the budget of {LLM_PROMPT_TOKEN_BUDGET} tokens."
+
+    review_comments = await generate_review_text(prompt, use_cache=use_cache, retries=retries)
+    if review_comments.startswith("Error:"):
+        return review_comments
+
+    print("AI Reviewer: Review completed successfully!")
+    # ChromaDB writes (and embedding) block; keep them off the event loop other LLM calls share.
+    await asyncio.to_thread(store_review_comments, chapter_id, review_comments, chroma_manager=chroma_manager)
+    return review_comments
+
+async def review_section_content(section_content: str, section_number: int, section_count: int, use_cache: bool = True, retries: int = 3) -> str:
+    """
+    Reviews one section of a spun chapter. Nothing is stored; see merge_section_reviews.
+
+    Args:
+        section_content (str): The spun text of the section.
+        section_number (int): 1-based position of the section in the chapter.
+        section_count (int): Total number of sections in the chapter.
+        use_cache (bool): Reuse a cached response for an identical prompt. Pass False for fresh sampling.
+        retries (int): Number of times to retry on API errors (429, 5xx, network).
+
+    Returns:
+        str: The review of the section, or an error message.
+    """
+    print(f"AI Reviewer: Reviewing section {section_number}/{section_count}...")
+    prompt = SECTION_REVIEWER_PROMPT_TEMPLATE.format(
+        section_content=section_content,
+        section_number=section_number,
+        section_count=section_count
+    )
+    llm_client = get_llm_client()
+
+    try:
+        result = await llm_client.generate_content(prompt, timeout=60.0, use_cache=use_cache, retries=retries, purpose="reviewer_section")
+        section_review = llm_client.extract_text(result)
+        if section_review:
+            return section_review
+        print(f"AI Reviewer: Error - No review generated for section {section_number}.")
+        return "Error: Could not generate section review."
+    except httpx.HTTPStatusError as e:
+        print(f"AI Reviewer: An HTTP status error occurred: {e.response.status_code} - {e.response.text}")
+        return f"Error: Failed to review section due to API error: {e.response.status_code}"
+    except httpx.RequestError as e:
+        print(f"AI Reviewer: An HTTP request error occurred: {e}")
+        return f"Error: Failed to review section due to network or request issue: {e}"
+    except Exception as e:
+        print(f"AI Reviewer: An unexpected error occurred: {e}")
+        return f"Error: Failed to review section due to unexpected issue: {e}"
+
+def merge_section_reviews(section_reviews: list) -> str:
+    """
+    Merges per-section reviews (in chapter order) into one review document.
+    """
+    section_count = len(section_reviews)
+    return "\n\n".join(
+        f"## Section {i + 1} of {section_count}\n\n{review.strip()}"
+        for i, review in enumerate(section_reviews)
+    )
+
+async def review_chapter_in_sections(chapter_id: str, spun_chapter_content: str, use_cache: bool = True, retries: int = 3,
+                                    chroma_manager: ChromaManager = None) -> str:
+    """
+    Reviews a chapter that is too large for one prompt by reviewing its sections concurrently
+    and storing the merged result as one 'review_comments' version (in chroma_manager, default the process-wide instance).
+
+    Returns:
+        str: The merged review comments, or an error message.
+    """
+    # Imported here because the writer module is only needed for oversized chapters.
+    from ai_agents.writer_agent import split_into_windows
+
+    sections = [window["text"] for window in split_into_windows(spun_chapter_content, overlap_chars=0)]
+    section_reviews = await asyncio.gather(*(
+        review_section_content(section, i + 1, len(sections), use_cache=use_cache, retries=retries)
+        for i, section in enumerate(sections)
+    ))
+    failed = [review for review in section_reviews if review.startswith("Error:")]
+    if failed:
+        return f"Error: Failed to review {len(failed)} of {len(sections)} sections: {failed[0]}"
+
+    review_comments = merge_section_reviews(section_reviews)
+    print("AI Reviewer: Review completed successfully (sectioned)!")
+    await asyncio.to_thread(store_review_comments, chapter_id, review_comments,
+                            extra_metadata={"review_mode": "sectioned", "section_count": len(sections)}, chroma_manager=chroma_manager)
+    return review_comments
 
 async def main():
     """
     Main function to fetch spun content from ChromaDB, review it, and save comments to ChromaDB.
     """
     chapter_id = DEFAULT_CHAPTER_ID # Use the centralized ID
-    chroma_manager = ChromaManager()
+    chroma_manager = get_chroma_manager()
 
     latest_spun_version = chroma_manager.get_latest_chapter_version(chapter_id, "spun")
 
@@ -107,10 +212,12 @@ async def main():
     spun_content = latest_spun_version['content']
     print(f"Retrieved latest spun content from ChromaDB (ID: {latest_spun_version['id']})")
 
-    review_comments = await review_chapter_content(chapter_id, spun_content)
+    review_comments = await review_chapter_content(chapter_id, spun_content, use_cache="--no-cache" not in sys.argv)
 
     if review_comments.startswith("Error:"):
         print(f"Failed to review chapter due to error: {review_comments}")
 
+    await get_llm_client().aclose() # Release pooled connections before the event loop closes
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,124 @@
+# src/ai_agents/test_candidate_selection.py
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents import candidate_selection
+from ai_agents.candidate_selection import generate_candidates, spin_best_of_n
+from ai_agents.llm_client import LLMClient
+
+ORIGINAL = "The storm broke over the harbour.\n\nShips strained at their moorings."
+
+
+def candidates_response(*texts: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"} for text in texts]}
+
+class FakeLLMClient:
+    """
+    Answers generateContent calls from a list of responses (or exceptions) and records every call.
+    """
+    extract_text = staticmethod(LLMClient.extract_text)
+
+    def __init__(self, responses: list):
+        self.responses = responses
+        self.calls = []
+
+    async def generate_content(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+def rejected(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://gemini.test")
+    return httpx.HTTPStatusError("rejected", request=request, response=httpx.Response(status_code, request=request))
+
+@pytest.fixture
+def use_client(monkeypatch):
+    def use(client: FakeLLMClient) -> FakeLLMClient:
+        monkeypatch.setattr(candidate_selection, "get_llm_client", lambda: client)
+        return client
+    return use
+
+def test_candidates_come_from_one_call(use_client):
+    client = use_client(FakeLLMClient([candidates_response("one", "two", "three")]))
+    candidates = asyncio.run(generate_candidates("prompt", 3))
+    assert [c["text"] for c in candidates] == ["one", "two", "three"]
+    assert client.calls[0]["generation_config"]["candidateCount"] == 3
+
+def test_missing_candidates_are_sampled_with_distinct_seeds(use_client):
+    client = use_client(FakeLLMClient([candidates_response("one"), candidates_response("two"), candidates_response("three")]))
+    candidates = asyncio.run(generate_candidates("prompt", 3))
+    assert sorted(c["text"] for c in candidates) == ["one", "three", "two"]
+    assert sorted(call["generation_config"]["seed"] for call in client.calls[1:]) == [1, 2]
+
+def test_rejected_candidate_count_falls_back_to_single_calls(use_client):
+    client = use_client(FakeLLMClient([rejected(400), candidates_response("one"), rejected(503)]))
+    candidates = asyncio.run(generate_candidates("prompt", 2))
+    assert [c["text"] for c in candidates] == ["one"]
+    assert len(client.calls) == 3
+
+def test_other_errors_do_not_fall_back(use_client):
+    client = use_client(FakeLLMClient([rejected(403)]))
+    assert asyncio.run(generate_candidates("prompt", 2)) == []
+    assert len(client.calls) == 1
+
+def test_candidates_are_never_served_from_the_cache(use_client):
+    client = use_client(FakeLLMClient([candidates_response("one"), candidates_response("two")]))
+    asyncio.run(generate_candidates("prompt", 2))
+    assert [call["use_cache"] for call in client.calls] == [False, False]
+
+def test_best_candidate_is_stored_in_the_given_manager(use_client, monkeypatch):
+    use_client(FakeLLMClient([candidates_response("short", "a much better rewrite of the chapter")]))
+    monkeypatch.setattr(candidate_selection, "calculate_candidate_reward", lambda text, original, finish_reason: len(text) / 100)
+    stored = []
+    def fake_store(chapter_id, content, feedback, extra_metadata=None, chroma_manager=None):
+        stored.append((content, extra_metadata, chroma_manager))
+        return "v1"
+    monkeypatch.setattr(candidate_selection, "store_spun_version", fake_store)
+    chroma_manager = object()
+
+    spun, review = asyncio.run(spin_best_of_n("chapter_1", ORIGINAL, candidate_count=2, scoring="heuristic", chroma_manager=chroma_manager))
+
+    assert spun == "a much better rewrite of the chapter"
+    assert review is None
+    content, metadata, manager = stored[0]
+    assert content == spun
+    assert metadata["spin_mode"] == "best_of_n" and metadata["candidate_count"] == 2
+    assert manager is chroma_manager
+
+def test_review_scoring_stores_the_winners_review(use_client, monkeypatch):
+    use_client(FakeLLMClient([candidates_response("first rewrite", "second rewrite")]))
+    monkeypatch.setattr(candidate_selection, "calculate_candidate_reward", lambda text, original, finish_reason: 0.0)
+    review_calls = []
+    async def fake_review(prompt, use_cache=True, retries=3, purpose="reviewer"):
+        review_calls.append(use_cache)
+        return "Great." if "second rewrite" in prompt else "Poor."
+    monkeypatch.setattr(candidate_selection, "generate_review_text", fake_review)
+    monkeypatch.setattr(candidate_selection, "calculate_review_reward", lambda review: 1.0 if review == "Great." else -1.0)
+    monkeypatch.setattr(candidate_selection, "store_spun_version", lambda *args, **kwargs: "v1")
+    stored_reviews = []
+    monkeypatch.setattr(candidate_selection, "store_review_comments",
+                        lambda chapter_id, review, extra_metadata=None, chroma_manager=None: stored_reviews.append(review))
+
+    spun, review = asyncio.run(spin_best_of_n("chapter_1", ORIGINAL, candidate_count=2, scoring="review"))
+
+    assert (spun, review) == ("second rewrite", "Great.")
+    assert stored_reviews == ["Great."]
+    # Scoring reviews of a given text may come from the cache
+    assert review_calls == [True, True]
+
+def test_no_candidates_is_an_error(use_client):
+    use_client(FakeLLMClient([rejected(403)]))
+    spun, review = asyncio.run(spin_best_of_n("chapter_1", ORIGINAL, candidate_count=2))
+    assert spun == "Error: Could not generate any candidate."
+    assert review is None
@@ -0,0 +1,124 @@
+# src/ai_agents/test_llm_client.py
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents import llm_client
+from ai_agents.llm_client import LLMClient
+from ai_agents.rate_limiter import AdaptiveRateLimiter
+from ai_agents.token_budget import UsageTracker
+
+
+def gemini_response(text: str, total_tokens: int = 10) -> dict:
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}],
+        "usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": total_tokens - 4, "totalTokenCount": total_tokens}
+    }
+
+@pytest.fixture
+def make_client(tmp_path, monkeypatch):
+    """
+    Returns a factory for LLMClients whose requests are answered by handler(request) instead of the API.
+    """
+    rate_limiter = AdaptiveRateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000)
+    usage_tracker = UsageTracker(log_path=str(tmp_path / "usage.jsonl"))
+    monkeypatch.setattr(llm_client, "get_rate_limiter", lambda: rate_limiter)
+    monkeypatch.setattr(llm_client, "get_usage_tracker", lambda: usage_tracker)
+    sleeps = []
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(llm_client.asyncio, "sleep", fake_sleep)
+
+    def factory(handler):
+        client = LLMClient(model="test-model", api_key="test-key", base_url="http://gemini.test/v1beta/")
+        client.sleeps = sleeps
+        client._get_http_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return client
+    return factory
+
+def test_build_url_and_payload():
+    client = LLMClient(model="test-model", api_key="test-key", base_url="http://gemini.test/v1beta/")
+    assert client.build_url() == "http://gemini.test/v1beta/models/test-model:generateContent?key=test-key"
+    assert client.build_url("streamGenerateContent", model="other") == "http://gemini.test/v1beta/models/other:streamGenerateContent?key=test-key"
+    assert LLMClient.build_payload("Hi") == {"contents": [{"role": "user", "parts": [{"text": "Hi"}]}]}
+    assert LLMClient.build_payload("Hi", {"temperature": 0.5})["generationConfig"] == {"temperature": 0.5}
+
+def test_extract_text():
+    assert LLMClient.extract_text(gemini_response("Hello")) == "Hello"
+    two_parts = {"candidates": [{"content": {"parts": [{"text": "Hel"}, {"text": "lo"}]}}]}
+    assert LLMClient.extract_text(two_parts) == "Hello"
+    assert LLMClient.extract_text({"candidates": [{"finishReason": "SAFETY"}]}) is None
+    assert LLMClient.extract_text({"candidates": []}) is None
+    assert LLMClient.extract_text(None) is None
+    assert LLMClient.extract_text(gemini_response("Hello"), candidate_index=1) is None
+
+def test_generate_content_sends_prompt_and_records_usage(make_client):
+    requests = []
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=gemini_response("Spun text", total_tokens=12))
+    client = make_client(handler)
+
+    result = asyncio.run(client.generate_content("Rewrite this.", use_cache=False, purpose="writer"))
+
+    assert LLMClient.extract_text(result) == "Spun text"
+    assert json.loads(requests[0].content)["contents"][0]["parts"][0]["text"] == "Rewrite this."
+    assert llm_client.get_usage_tracker().get_totals()["writer"]["total_tokens"] == 12
+
+def test_generate_content_retries_rate_limits_with_retry_after(make_client):
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(503),
+        httpx.Response(200, json=gemini_response("Done"))
+    ]
+    client = make_client(lambda request: responses.pop(0))
+
+    result = asyncio.run(client.generate_content("Prompt", use_cache=False, retries=3))
+
+    assert LLMClient.extract_text(result) == "Done"
+    assert responses == []
+    # Retry-After is the lower bound of the first backoff (the limiter also holds later attempts back)
+    assert client.sleeps[0] >= 3
+    # The 429 throttled the shared limiter, and the success afterwards restored a little of the rate
+    assert llm_client.get_rate_limiter().rate_fraction == pytest.approx(0.55)
+
+def test_generate_content_does_not_retry_client_errors(make_client):
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+    client = make_client(handler)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.generate_content("Prompt", use_cache=False, retries=3))
+    assert len(calls) == 1
+
+def test_generate_content_gives_up_after_retries(make_client):
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+    client = make_client(handler)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.generate_content("Prompt", use_cache=False, retries=2))
+    assert len(calls) == 3
+
+def test_stream_generate_content_yields_chunks(make_client):
+    body = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in [
+        gemini_response("The storm "), gemini_response("broke.", total_tokens=20)
+    ])
+    client = make_client(lambda request: httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"}))
+
+    async def collect():
+        return [chunk async for chunk in client.stream_generate_content("Prompt", use_cache=False, purpose="writer")]
+
+    assert asyncio.run(collect()) == ["The storm ", "broke."]
+    assert llm_client.get_usage_tracker().get_totals()["writer"]["total_tokens"] == 20
@@ -0,0 +1,71 @@
+# src/ai_agents/test_overlapped_revision.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents import overlapped_revision
+from ai_agents.overlapped_revision import spin_and_review_overlapped
+
+
+@pytest.fixture
+def agents(monkeypatch):
+    """
+    Replaces the writer and reviewer with fakes that record the order of events.
+    """
+    events = []
+    stored = []
+
+    async def fake_spin(chapter_id, original_content, feedback='', use_cache=True, on_window_spun=None, chroma_manager=None):
+        windows = original_content.split("|")
+        # Windows finish out of order; later windows are still being written while the first are reviewed
+        for index in reversed(range(len(windows))):
+            events.append(f"spun {index}")
+            on_window_spun(index, len(windows), windows[index].upper())
+            await asyncio.sleep(0)
+        if "fail" in original_content:
+            return "Error: Failed to spin 1 of 2 chapter windows"
+        events.append("stored spun")
+        return " ".join(window.upper() for window in windows)
+
+    async def fake_review(section_content, section_number, section_count, use_cache=True):
+        events.append(f"reviewed {section_number - 1}")
+        return "Error: quota" if "BAD" in section_content else f"Review of {section_content}"
+
+    monkeypatch.setattr(overlapped_revision, "spin_chapter_content_chunked", fake_spin)
+    monkeypatch.setattr(overlapped_revision, "review_section_content", fake_review)
+    monkeypatch.setattr(overlapped_revision, "store_review_comments",
+                        lambda chapter_id, review, extra_metadata=None, chroma_manager=None: stored.append((review, extra_metadata, chroma_manager)))
+    return events, stored
+
+def test_sections_are_reviewed_while_spinning_and_merged_in_order(agents):
+    events, stored = agents
+    chroma_manager = object()
+
+    spun, review = asyncio.run(spin_and_review_overlapped("chapter_1", "storm|harbour|gulls", chroma_manager=chroma_manager))
+
+    assert spun == "STORM HARBOUR GULLS"
+    assert events.index("reviewed 2") < events.index("spun 0")
+    assert review.index("Review of STORM") < review.index("Review of HARBOUR") < review.index("Review of GULLS")
+    assert review.startswith("## Section 1 of 3")
+    assert stored == [(review, {"review_mode": "sectioned", "section_count": 3}, chroma_manager)]
+
+def test_failed_spin_skips_the_review(agents):
+    events, stored = agents
+    spun, review = asyncio.run(spin_and_review_overlapped("chapter_1", "storm|fail"))
+    assert spun.startswith("Error:")
+    assert review == "Error: Review skipped because spinning failed."
+    assert stored == []
+
+def test_failed_section_review_is_reported(agents):
+    events, stored = agents
+    spun, review = asyncio.run(spin_and_review_overlapped("chapter_1", "storm|bad"))
+    assert spun == "STORM BAD"
+    assert review == "Error: Failed to review 1 of 2 sections: Error: quota"
+    assert stored == []
@@ -0,0 +1,85 @@
+# src/ai_agents/test_rate_limiter.py
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents.rate_limiter import AdaptiveRateLimiter, TokenBucket, backoff_delay, parse_retry_after
+
+
+def test_token_bucket_reports_wait_once_in_debt():
+    bucket = TokenBucket(60) # One token per second
+    now = bucket.updated
+    assert bucket.reserve(60, now) == 0.0
+    assert bucket.reserve(2, now) == 2.0
+    # Two seconds later the debt is paid off again
+    assert bucket.reserve(0, now + 2) == 0.0
+
+def test_rate_limited_halves_rate_down_to_floor():
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=6000, min_fraction=0.2)
+    limiter.on_rate_limited()
+    assert limiter.rate_fraction == 0.5
+    assert limiter.request_bucket.rate == 0.5
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.rate_fraction == 0.2
+    assert limiter.token_bucket.rate == 6000 * 0.2 / 60
+
+def test_success_restores_rate_additively():
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=6000, increase_step=0.25)
+    limiter.on_rate_limited()
+    limiter.on_success()
+    assert limiter.rate_fraction == 0.75
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate_fraction == 1.0
+
+def test_retry_after_blocks_callers(monkeypatch):
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.on_rate_limited(retry_after=3)
+
+    slept = []
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    asyncio.run(limiter.acquire(10))
+    assert len(slept) == 1 and 2.5 < slept[0] <= 3
+
+def test_record_usage_refunds_overestimate():
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    limiter.token_bucket.reserve(500, limiter.token_bucket.updated)
+    limiter.record_usage(estimated_tokens=500, actual_tokens=200)
+    assert 799 <= limiter.token_bucket.tokens <= 801
+    limiter.record_usage(estimated_tokens=500, actual_tokens=None)
+    assert limiter.token_bucket.tokens <= 1000
+
+def test_parse_retry_after_seconds_header():
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+
+def test_parse_retry_after_http_date_header():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    response = httpx.Response(503, headers={"Retry-After": format_datetime(retry_at, usegmt=True)})
+    assert 25 < parse_retry_after(response) <= 30
+
+def test_parse_retry_after_gemini_retry_info():
+    body = {"error": {"code": 429, "details": [
+        {"@type": "type.googleapis.com/google.rpc.QuotaFailure"},
+        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}
+    ]}}
+    assert parse_retry_after(httpx.Response(429, json=body)) == 12.0
+
+def test_parse_retry_after_without_hint():
+    assert parse_retry_after(httpx.Response(429, text="Too Many Requests")) is None
+    assert parse_retry_after(httpx.Response(429, json={"error": {"code": 429}})) is None
+
+def test_backoff_delay_respects_retry_after_and_cap():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt, base_delay=1, max_delay=8) <= 8
+    assert backoff_delay(0, base_delay=1, max_delay=8, retry_after=5) >= 5
+    assert backoff_delay(0, base_delay=1, max_delay=8, retry_after=60) == 8
@@ -0,0 +1,55 @@
+# src/ai_agents/test_response_cache.py
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents import response_cache
+from ai_agents.response_cache import ResponseCache
+
+
+def make_cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+def test_make_key_ignores_param_order_and_separates_requests():
+    key = ResponseCache.make_key("gemini", "prompt", {"temperature": 0.2, "seed": 1})
+    assert key == ResponseCache.make_key("gemini", "prompt", {"seed": 1, "temperature": 0.2})
+    assert key != ResponseCache.make_key("gemini", "prompt", {"seed": 2, "temperature": 0.2})
+    assert key != ResponseCache.make_key("other-model", "prompt", {"seed": 1, "temperature": 0.2})
+
+def test_round_trip(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=60, max_bytes=10_000)
+    cache.set("k", {"candidates": [{"text": "hello"}]})
+    assert cache.get("k") == {"candidates": [{"text": "hello"}]}
+    assert cache.get("missing") is None
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = make_cache(tmp_path, ttl_seconds=10, max_bytes=10_000)
+    cache.set("k", {"v": 1})
+
+    now[0] += 9
+    assert cache.get("k") == {"v": 1}
+    now[0] += 2
+    assert cache.get("k") is None
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    entry = {"text": "x" * 40}
+    entry_size = len('{"text": "' + "x" * 40 + '"}')
+    cache = make_cache(tmp_path, ttl_seconds=0, max_bytes=entry_size * 2)
+
+    cache.set("a", entry)
+    now[0] += 1
+    cache.set("b", entry)
+    now[0] += 1
+    assert cache.get("a") == entry # "a" is now more recently used than "b"
+    now[0] += 1
+    cache.set("c", entry)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == entry
+    assert cache.get("c") == entry
@@ -0,0 +1,55 @@
+# src/ai_agents/test_token_budget.py
+import json
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents.token_budget import UsageTracker, estimate_tokens, truncate_to_token_budget
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+def test_truncate_keeps_text_within_budget():
+    assert truncate_to_token_budget("short text", 100) == "short text"
+    truncated = truncate_to_token_budget("x" * 100, 5)
+    assert truncated == "x" * 20
+
+def test_truncate_prefers_paragraph_boundary():
+    text = "First paragraph of the chapter.\nSecond paragraph runs on and on and on."
+    # 10 tokens = 40 chars, which ends inside the second paragraph
+    assert truncate_to_token_budget(text, 10) == "First paragraph of the chapter."
+
+def test_truncate_ignores_early_paragraph_boundary():
+    text = "Hi.\n" + "y" * 100
+    # Cutting at the only newline would throw away most of the budget
+    assert truncate_to_token_budget(text, 10) == ("Hi.\n" + "y" * 100)[:40]
+
+def test_usage_tracker_aggregates_and_logs(tmp_path):
+    log_path = tmp_path / "usage" / "llm_usage.jsonl"
+    tracker = UsageTracker(log_path=str(log_path))
+    tracker.record("writer", "gemini", {"promptTokenCount": 100, "candidatesTokenCount": 40, "totalTokenCount": 140},
+                   estimated_prompt_tokens=110, latency_s=1.23456)
+    tracker.record("writer", "gemini", None, estimated_prompt_tokens=50)
+    tracker.record("reviewer", "gemini", {"promptTokenCount": 10, "totalTokenCount": 10}, estimated_prompt_tokens=12)
+
+    totals = tracker.get_totals()
+    assert totals["writer"] == {"calls": 2, "prompt_tokens": 100, "output_tokens": 40, "total_tokens": 140,
+                                "estimated_prompt_tokens": 160}
+    assert totals["reviewer"]["output_tokens"] == 0
+
+    entries = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["purpose"] for entry in entries] == ["writer", "writer", "reviewer"]
+    assert entries[0]["latency_s"] == 1.235
+    assert entries[1]["prompt_tokens"] is None
+
+def test_usage_totals_are_snapshots(tmp_path):
+    tracker = UsageTracker(log_path=str(tmp_path / "llm_usage.jsonl"))
+    tracker.record("writer", "gemini", {"totalTokenCount": 5}, estimated_prompt_tokens=5)
+    snapshot = tracker.get_totals()
+    snapshot["writer"]["calls"] = 99
+    assert tracker.get_totals()["writer"]["calls"] == 1
@@ -0,0 +1,152 @@
+# src/ai_agents/test_writer_agent.py
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai_agents import writer_agent
+from ai_agents.writer_agent import split_into_windows
+
+CHAPTER = (
+    "The storm broke over the harbour at dusk.\n"
+    "Ships strained at their moorings.\n"
+    "\n"
+    "Old Tom watched from the lighthouse.\n"
+    "\n\n"
+    "* * *\n"
+    "\n"
+    "By morning the sea was calm again. The gulls came back.\n"
+)
+
+def stitch(windows: list, texts: list = None) -> str:
+    texts = texts if texts is not None else [window["text"] for window in windows]
+    return "".join(window["separator_before"] + text.strip() for window, text in zip(windows, texts))
+
+def test_windows_stitch_back_to_the_original_layout():
+    for max_chars in (20, 60, 90, 1000):
+        windows = split_into_windows(CHAPTER, max_chars=max_chars, overlap_chars=10)
+        assert stitch(windows) == CHAPTER.strip()
+
+def test_scene_break_ends_a_window():
+    windows = split_into_windows(CHAPTER, max_chars=1000, overlap_chars=0)
+    assert len(windows) == 2
+    assert windows[0]["separator_before"] == ""
+    assert "* * *" in windows[1]["separator_before"]
+    assert windows[1]["text"] == "By morning the sea was calm again. The gulls came back."
+
+def test_windows_respect_max_chars_and_carry_context():
+    windows = split_into_windows(CHAPTER, max_chars=60, overlap_chars=15)
+    assert len(windows) > 2
+    assert all(len(window["text"]) <= 60 for window in windows)
+    assert windows[0]["context_before"] == ""
+    assert windows[-1]["context_after"] == ""
+    for previous, window in zip(windows, windows[1:]):
+        assert window["context_before"] == previous["text"][-15:]
+        assert previous["context_after"] == window["text"][:15]
+
+def test_long_paragraph_is_split_at_sentences():
+    paragraph = " ".join(f"Sentence number {i} ends here." for i in range(10))
+    windows = split_into_windows(paragraph, max_chars=70, overlap_chars=0)
+    assert all(window["text"].endswith(".") for window in windows)
+    assert stitch(windows) == paragraph
+
+def test_long_paragraph_keeps_line_breaks_and_indentation():
+    paragraph = "\tOld Tom climbed the stairs.\nHe lit the lamp.\nThe beam swept over the supercalifragilistic water."
+    windows = split_into_windows(paragraph, max_chars=20, overlap_chars=0)
+    assert all(len(window["text"]) <= 20 for window in windows)
+    assert windows[0]["text"] == "Old Tom climbed the"
+    assert stitch(windows) == paragraph.strip()
+
+def test_chunked_spin_stitches_windows_in_order(monkeypatch):
+    async def fake_generate(prompt, **kwargs):
+        # Echo the window's text in upper case, with the surrounding whitespace models like to add
+        window_text = prompt.split("<<")[1].split(">>")[0] if "<<" in prompt else prompt
+        return f"\n{window_text.upper()}\n"
+    monkeypatch.setattr(writer_agent, "CHUNK_WRITER_PROMPT_TEMPLATE", "<<{chapter_content}>>{instructions}{context_before}{context_after}{window_number}{window_count}")
+    monkeypatch.setattr(writer_agent, "generate_spun_text", fake_generate)
+    stored = []
+    monkeypatch.setattr(writer_agent, "store_spun_version", lambda chapter_id, content, feedback, **kwargs: stored.append((content, kwargs)))
+    spun_windows = []
+
+    spun = asyncio.run(writer_agent.spin_chapter_content_chunked(
+        "chapter_1", CHAPTER, max_window_chars=60, overlap_chars=10,
+        on_window_spun=lambda index, count, text: spun_windows.append(index)
+    ))
+
+    assert spun == CHAPTER.strip().upper()
+    assert sorted(spun_windows) == list(range(len(split_into_windows(CHAPTER, 60, 10))))
+    assert stored[0][0] == spun
+    assert stored[0][1]["extra_metadata"]["spin_mode"] == "chunked"
+
+def test_chunked_spin_fails_if_a_window_fails(monkeypatch):
+    async def fake_generate(prompt, **kwargs):
+        return "Error: quota exhausted" if "Old Tom" in prompt else "spun"
+    monkeypatch.setattr(writer_agent, "generate_spun_text", fake_generate)
+    stored = []
+    monkeypatch.setattr(writer_agent, "store_spun_version", lambda *args, **kwargs: stored.append(args))
+
+    result = asyncio.run(writer_agent.spin_chapter_content_chunked("chapter_1", CHAPTER, max_window_chars=60, overlap_chars=0))
+
+    assert result.startswith("Error:")
+    assert stored == []
+
+class FakeStreamingClient:
+    """
+    Stands in for the LLM client: streams the given chunks, then raises error if one is set.
+    """
+    def __init__(self, chunks: list, error: Exception = None):
+        self.chunks = chunks
+        self.error = error
+
+    async def stream_generate_content(self, prompt, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+def collect_stream(chapter_id: str) -> list:
+    async def collect():
+        return [chunk async for chunk in writer_agent.stream_spin_chapter_content(chapter_id, CHAPTER)]
+    return asyncio.run(collect())
+
+@pytest.fixture
+def stream_setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(writer_agent, "STREAM_CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(writer_agent, "STREAM_CHECKPOINT_INTERVAL_CHARS", 10)
+    stored = []
+    monkeypatch.setattr(writer_agent, "store_spun_version", lambda chapter_id, content, feedback, **kwargs: stored.append((content, kwargs)))
+    def use_client(client):
+        monkeypatch.setattr(writer_agent, "get_llm_client", lambda: client)
+    return use_client, stored
+
+def test_stream_spin_stores_result_and_removes_checkpoint(stream_setup):
+    use_client, stored = stream_setup
+    use_client(FakeStreamingClient(["The storm ", "broke over ", "the harbour."]))
+
+    assert collect_stream("chapter_1") == ["The storm ", "broke over ", "the harbour."]
+    assert stored == [("The storm broke over the harbour.", {"extra_metadata": {"spin_mode": "streamed"}})]
+    assert not os.path.exists(writer_agent.get_stream_checkpoint_path("chapter_1"))
+
+def test_stream_spin_keeps_checkpoint_when_interrupted(stream_setup):
+    use_client, stored = stream_setup
+    use_client(FakeStreamingClient(["The storm ", "broke"], error=httpx.ReadTimeout("stalled")))
+
+    with pytest.raises(httpx.ReadTimeout):
+        collect_stream("chapter_1")
+    with open(writer_agent.get_stream_checkpoint_path("chapter_1"), encoding="utf-8") as f:
+        assert f.read() == "The storm broke"
+    assert stored == []
+
+def test_stream_spin_rejects_empty_output(stream_setup):
+    use_client, stored = stream_setup
+    use_client(FakeStreamingClient([]))
+    with pytest.raises(ValueError):
+        collect_stream("chapter_1")
+    assert stored == []
@@ -0,0 +1,96 @@
+# src/ai_agents/token_budget.py
+import json
+import math
+import os
+import sys
+import threading
+from datetime import datetime
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import LLM_USAGE_LOG_PATH
+
+CHARS_PER_TOKEN = 4 # Typical for English prose with Gemini's tokenizer
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate for a piece of text (no tokenizer round trip).
+    """
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+def truncate_to_token_budget(text: str, max_tokens: int) -> str:
+    """
+    Cuts text down to roughly max_tokens tokens, preferring to end on a paragraph boundary.
+    """
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    truncated = text[:max_chars]
+    paragraph_end = truncated.rfind("\n")
+    if paragraph_end > max_chars // 2:
+        truncated = truncated[:paragraph_end]
+    return truncated.rstrip()
+
+
+class UsageTracker:
+    """
+    Records the usageMetadata of every LLM response: appended to a JSONL log for cost analysis
+    and aggregated in memory per purpose (e.g. "writer", "reviewer").
+    """
+    def __init__(self, log_path: str = LLM_USAGE_LOG_PATH):
+        self.log_path = log_path
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, purpose: str, model: str, usage_metadata: dict, estimated_prompt_tokens: int, latency_s: float = None):
+        usage_metadata = usage_metadata or {}
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "purpose": purpose,
+            "model": model,
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            "prompt_tokens": usage_metadata.get("promptTokenCount"),
+            "output_tokens": usage_metadata.get("candidatesTokenCount"),
+            "total_tokens": usage_metadata.get("totalTokenCount"),
+            "latency_s": round(latency_s, 3) if latency_s is not None else None
+        }
+
+        with self._lock:
+            totals = self.totals.setdefault(purpose, {
+                "calls": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0, "estimated_prompt_tokens": 0
+            })
+            totals["calls"] += 1
+            totals["estimated_prompt_tokens"] += estimated_prompt_tokens
+            for key in ("prompt_tokens", "output_tokens", "total_tokens"):
+                totals[key] += entry[key] or 0
+
+            try:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Token Budget: Failed to write usage log: {e}")
+
+    def get_totals(self) -> dict:
+        """
+        Returns a snapshot of the aggregated usage per purpose since process start.
+        """
+        with self._lock:
+            return {purpose: dict(values) for purpose, values in self.totals.items()}
+
+
+_usage_tracker = None
+_usage_tracker_lock = threading.Lock()
+
+def get_usage_tracker() -> UsageTracker:
+    """
+    Returns the process-wide UsageTracker, creating it on first use.
+    """
+    global _usage_tracker
+    if _usage_tracker is None:
+        with _usage_tracker_lock:
+            if _usage_tracker is None:
+                _usage_tracker = UsageTracker()
+    return _usage_tracker
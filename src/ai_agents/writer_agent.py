@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 load_dotenv() # This loads variables from .env file
 import asyncio
 import os
+import re
 import sys
 import httpx
 import time
@@ -10,9 +11,22 @@ import time
 # Add the parent directory to the Python path to allow imports from src/
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from config import GEMINI_API_KEY, ORIGINAL_CHAPTER_PATH, DEFAULT_CHAPTER_ID
+from config import (
+    ORIGINAL_CHAPTER_PATH,
+    DEFAULT_CHAPTER_ID,
+    STREAM_CHECKPOINT_DIR,
+    STREAM_CHECKPOINT_INTERVAL_CHARS,
+    SPIN_CHUNK_MAX_CHARS,
+    SPIN_CHUNK_OVERLAP_CHARS,
+    SPIN_CHUNK_CONCURRENCY,
+    LLM_PROMPT_TOKEN_BUDGET,
+    LLM_OVERSIZE_STRATEGY,
+)
 from ai_agents.prompts import WRITER_PROMPT_TEMPLATE # Assuming this prompt will be updated or a new one created
-from database.chroma_manager import ChromaManager
+from ai_agents.prompts import CHUNK_WRITER_PROMPT_TEMPLATE, CHUNK_WRITER_DEFAULT_INSTRUCTIONS
+from ai_agents.llm_client import get_llm_client
+from ai_agents.token_budget import estimate_tokens, truncate_to_token_budget
+from database.chroma_manager import ChromaManager, get_chroma_manager
 
 # Define a new prompt template for revisions, or modify the existing one
 REVISION_PROMPT_TEMPLATE = """
@@ -28,7 +42,87 @@ Revised Chapter Content:
 {chapter_content}
 """
 
-async def spin_chapter_content(chapter_id: str, original_content: str, feedback: str = '', retries: int = 3, delay: int = 5) -> str: # Added feedback parameter
+def build_spin_prompt(original_content: str, feedback: str = '') -> str:
+    """
+    Builds the writer prompt: a revision prompt if feedback is given, otherwise the initial spin prompt.
+    """
+    if feedback:
+        print(f"AI Writer: Revising chapter content based on feedback: '{feedback}'")
+        return REVISION_PROMPT_TEMPLATE.format(feedback=feedback, chapter_content=original_content)
+    print("AI Writer: Spinning new chapter content...")
+    return WRITER_PROMPT_TEMPLATE.format(chapter_content=original_content)
+
+def store_spun_version(chapter_id: str, spun_content: str, feedback: str = '', extra_metadata: dict = None,
+                       chroma_manager: ChromaManager = None) -> str:
+    """
+    Stores spun content in ChromaDB as a new 'spun' version.
+    extra_metadata is merged into the version metadata (e.g. how the text was generated).
+    chroma_manager defaults to the process-wide instance.
+
+    Returns:
+        str: The new version ID, or None if storing failed.
+    """
+    metadata = {"source_version_type": "original", "revision_feedback": feedback if feedback else "none"}
+    if extra_metadata:
+        metadata.update(extra_metadata)
+
+    chroma_manager = chroma_manager or get_chroma_manager()
+    version_id = chroma_manager.add_chapter_version(
+        chapter_id=chapter_id,
+        content=spun_content,
+        version_type="spun", # Still store as 'spun', but it's a new iteration
+        metadata=metadata
+    )
+    if version_id:
+        print(f"AI Writer: Spun content stored in ChromaDB with ID: {version_id}")
+    else:
+        print("AI Writer: Failed to store spun content in ChromaDB.")
+    return version_id
+
+async def generate_spun_text(prompt: str, retries: int = 3, delay: int = 5, use_cache: bool = True, purpose: str = "writer") -> str:
+    """
+    Sends a writer prompt to the LLM. Rate limiting and retries (429, 5xx and network errors,
+    with jittered exponential backoff starting at `delay` seconds) are handled by the shared LLM client.
+
+    Returns:
+        str: The generated text, or an error message starting with "Error:".
+    """
+    llm_client = get_llm_client()
+
+    try:
+        result = await llm_client.generate_content(
+            prompt,
+            timeout=120.0, # Increased timeout for potentially longer generation
+            use_cache=use_cache,
+            retries=retries,
+            backoff_base=delay,
+            purpose=purpose
+        )
+
+        spun_content = llm_client.extract_text(result)
+        if spun_content is not None:
+            if spun_content:
+                return spun_content
+            else:
+                print("AI Writer: Warning - Spun content text part is empty.")
+                return "Error: Spun content text part is empty."
+        else:
+            print("AI Writer: Error - No content generated or unexpected response structure.")
+            print(f"Full API response: {result}")
+            return "Error: Could not generate spun content."
+
+    except httpx.HTTPStatusError as e:
+        print(f"AI Writer: An HTTP status error occurred: {e.response.status_code} - {e.response.text}")
+        return f"Error: Failed to spin content due to API error: {e.response.status_code}"
+    except httpx.RequestError as e:
+        print(f"AI Writer: An HTTP request error occurred: {e}")
+        return f"Error: Failed to spin content due to network or request issue: {e}"
+    except Exception as e:
+        print(f"AI Writer: An unexpected error occurred: {e}")
+        return f"Error: Failed to spin content due to unexpected issue: {e}"
+
+async def spin_chapter_content(chapter_id: str, original_content: str, feedback: str = '', retries: int = 3, delay: int = 5, use_cache: bool = True,
+                               chroma_manager: ChromaManager = None) -> str: # Added feedback parameter
     """
     Uses an LLM (Gemini) to "spin" (rewrite, expand, adapt) the given chapter content.
     If feedback is provided, it revises the content based on that feedback.
@@ -38,90 +132,279 @@ async def spin_chapter_content(chapter_id: str, original_content: str, feedback:
         chapter_id (str): The ID of the chapter being spun.
         original_content (str): The original chapter content to be spun.
         feedback (str): Optional feedback from a human reviewer for revisions.
-        retries (int): Number of times to retry on API errors.
-        delay (int): Delay in seconds between retries.
+        retries (int): Number of times to retry on API errors (429, 5xx, network).
+        delay (int): Base delay in seconds for the jittered exponential backoff between retries.
+        use_cache (bool): Reuse a cached response for an identical prompt. Pass False for fresh sampling.
+        chroma_manager (ChromaManager, optional): Where to store the result; defaults to the process-wide instance.
 
     Returns:
         str: The spun (rewritten) version of the chapter content, or an error message.
     """
+    prompt = build_spin_prompt(original_content, feedback)
+
+    prompt_tokens = estimate_tokens(prompt)
+    if prompt_tokens > LLM_PROMPT_TOKEN_BUDGET:
+        print(f"AI Writer: Prompt is ~{prompt_tokens} tokens, over the budget of {LLM_PROMPT_TOKEN_BUDGET} (strategy: {LLM_OVERSIZE_STRATEGY}).")
+        if LLM_OVERSIZE_STRATEGY == "chunk":
+            return await spin_chapter_content_chunked(chapter_id, original_content, feedback=feedback, retries=retries, delay=delay, use_cache=use_cache,
+                                                      chroma_manager=chroma_manager)
+        elif LLM_OVERSIZE_STRATEGY == "truncate":
+            template_tokens = prompt_tokens - estimate_tokens(original_content)
+            original_content = truncate_to_token_budget(original_content, LLM_PROMPT_TOKEN_BUDGET - template_tokens)
+            prompt = build_spin_prompt(original_content, feedback)
+        else:
+            return f"Error: Prompt of ~{prompt_tokens} tokens exceeds the budget of {LLM_PROMPT_TOKEN_BUDGET} tokens."
+
+    spun_content = await generate_spun_text(prompt, retries=retries, delay=delay, use_cache=use_cache)
+    if spun_content.startswith("Error:"):
+        return spun_content
+
+    print("AI Writer: Chapter spun/revised successfully!")
+    # ChromaDB writes (and embedding) block; keep them off the event loop other LLM calls share.
+    await asyncio.to_thread(store_spun_version, chapter_id, spun_content, feedback, chroma_manager=chroma_manager)
+    return spun_content
+
+# --- Chunked spinning for long chapters ---
+
+SCENE_BREAK_PATTERN = re.compile(r"^\s*(?:[*#~-]\s*){3,}$") # e.g. "* * *" or "---"
+
+def _split_long_paragraph(paragraph: str, max_chars: int) -> list:
+    """
+    Splits a paragraph that exceeds max_chars at sentence boundaries (wrapping long sentences at the last
+    space that fits, or hard-wrapping as a last resort).
+
+    Returns:
+        list: (piece, separator_before) tuples; separator_before is the original whitespace between the
+              piece and the previous one ("" for the first piece and after a hard wrap).
+    """
+    pieces = [] # [text, separator_before]
+    current = None
+    parts = re.split(r"(?<=[.!?])(\s+)", paragraph) # Sentences alternating with the whitespace between them
+    for i in range(0, len(parts), 2):
+        sentence, separator = parts[i], parts[i - 1] if i else ""
+        while len(sentence) > max_chars:
+            current = None
+            spaces = [m for m in re.finditer(r"\s+", sentence) if 0 < m.start() <= max_chars]
+            cut, resume = (spaces[-1].start(), spaces[-1].end()) if spaces else (max_chars, max_chars)
+            pieces.append([sentence[:cut], separator])
+            sentence, separator = sentence[resume:], sentence[cut:resume]
+        if not sentence:
+            continue
+        if current is not None and len(current[0]) + len(separator) + len(sentence) <= max_chars:
+            current[0] += separator + sentence
+        else:
+            current = [sentence, separator]
+            pieces.append(current)
+    return [(text, separator) for text, separator in pieces]
+
+def _split_paragraphs(content: str) -> list:
+    """
+    Splits content into paragraphs (runs of non-blank lines that are not scene breaks), each with the
+    original text between it and the previous paragraph.
+
+    Returns:
+        list: (paragraph, separator_before) tuples; separator_before is "" for the first paragraph.
+    """
+    paragraphs = []
+    start = end = None
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped and not SCENE_BREAK_PATTERN.match(stripped):
+            if start is None:
+                start = offset + len(line) - len(line.lstrip()) # Indentation belongs to the separator
+            end = offset + len(line.rstrip())
+        elif start is not None:
+            paragraphs.append((start, end))
+            start = None
+        offset += len(line)
+    if start is not None:
+        paragraphs.append((start, end))
+    return [
+        (content[start:end], content[paragraphs[i - 1][1]:start] if i > 0 else "")
+        for i, (start, end) in enumerate(paragraphs)
+    ]
+
+def split_into_windows(content: str, max_chars: int = SPIN_CHUNK_MAX_CHARS, overlap_chars: int = SPIN_CHUNK_OVERLAP_CHARS) -> list:
+    """
+    Splits chapter content into paragraph windows of at most max_chars characters, keeping the original
+    text between paragraphs. Scene breaks always end a window. Each window carries read-only context
+    from its neighbours, and the original text that preceded it (blank lines, scene-break markers), so
+    stitching windows back together with their separators restores the chapter's layout.
+
+    Returns:
+        list: Dictionaries with 'text', 'separator_before' ("" for the first window), 'context_before' and 'context_after'.
+    """
+    windows = [] # [text, separator_before]
+    current = None
+
+    for paragraph, separator in _split_paragraphs(content):
+        scene_break = any(SCENE_BREAK_PATTERN.match(line.strip()) for line in separator.splitlines())
+        pieces = _split_long_paragraph(paragraph, max_chars) if len(paragraph) > max_chars else [(paragraph, "")]
+        for n, (piece, inner_separator) in enumerate(pieces):
+            piece_separator = separator if n == 0 else inner_separator
+            if current is None or (n == 0 and scene_break) or len(current[0]) + len(piece_separator) + len(piece) > max_chars:
+                current = [piece, piece_separator if windows else ""]
+                windows.append(current)
+            else:
+                current[0] += piece_separator + piece
+
+    return [
+        {
+            "text": text,
+            "separator_before": separator,
+            "context_before": windows[i - 1][0][-overlap_chars:] if i > 0 and overlap_chars else "",
+            "context_after": windows[i + 1][0][:overlap_chars] if i + 1 < len(windows) and overlap_chars else "",
+        }
+        for i, (text, separator) in enumerate(windows)
+    ]
+
+async def spin_chapter_content_chunked(chapter_id: str, original_content: str, feedback: str = '', max_window_chars: int = SPIN_CHUNK_MAX_CHARS,
+                                       overlap_chars: int = SPIN_CHUNK_OVERLAP_CHARS, max_concurrency: int = SPIN_CHUNK_CONCURRENCY,
+                                       retries: int = 3, delay: int = 5, use_cache: bool = True, on_window_spun=None,
+                                       chroma_manager: ChromaManager = None) -> str:
+    """
+    Chunked variant of spin_chapter_content for long chapters.
+    Splits the original into overlapping paragraph/scene windows, spins them concurrently
+    (at most max_concurrency requests in flight) and stitches the results into one 'spun' version,
+    separated by the original text between the windows (paragraph spacing, scene-break markers).
+
+    Args:
+        chapter_id (str): The ID of the chapter being spun.
+        original_content (str): The original chapter content to be spun.
+        feedback (str): Optional feedback from a human reviewer for revisions.
+        max_window_chars (int): Maximum characters of original text per window.
+        overlap_chars (int): Characters of neighbouring text passed as context to each window.
+        max_concurrency (int): Maximum number of windows spun at the same time.
+        retries (int): Number of times to retry each window on API errors (429, 5xx, network).
+        delay (int): Base delay in seconds for the jittered exponential backoff between retries.
+        use_cache (bool): Reuse cached responses for identical prompts. Pass False for fresh sampling.
+        on_window_spun (callable, optional): Called as on_window_spun(index, window_count, spun_text) as soon as
+                                             each window is done, e.g. to start reviewing it early.
+        chroma_manager (ChromaManager, optional): Where to store the result; defaults to the process-wide instance.
+
+    Returns:
+        str: The stitched spun chapter content, or an error message.
+    """
+    windows = split_into_windows(original_content, max_window_chars, overlap_chars)
+    if not windows:
+        print("AI Writer: Error - Original content is empty, nothing to spin.")
+        return "Error: Original content is empty."
+
+    print(f"AI Writer: Spinning chapter in {len(windows)} windows (max {max_concurrency} concurrent)...")
     if feedback:
         print(f"AI Writer: Revising chapter content based on feedback: '{feedback}'")
-        prompt = REVISION_PROMPT_TEMPLATE.format(feedback=feedback, chapter_content=original_content)
+        instructions = f"- **Reviewer Feedback:** Rewrite and refine this section based on the following feedback, keeping the original style and tone:\n{feedback}"
     else:
-        print("AI Writer: Spinning new chapter content...")
-        prompt = WRITER_PROMPT_TEMPLATE.format(chapter_content=original_content)
-
-    payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
-    }
-
-    apiUrl = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}";
-    
-    async with httpx.AsyncClient() as client:
-        for attempt in range(retries + 1):
-            try:
-                response = await client.post(
-                    apiUrl,
-                    headers={'Content-Type': 'application/json'},
-                    json=payload,
-                    timeout=120.0 # Increased timeout for potentially longer generation
-                )
-                response.raise_for_status()
-
-                result = response.json()
-
-                if result.get("candidates") and len(result["candidates"]) > 0 and \
-                   result["candidates"][0].get("content") and \
-                   result["candidates"][0]["content"].get("parts") and \
-                   len(result["candidates"][0]["content"]["parts"]) > 0:
-                    spun_content = result["candidates"][0]["content"]["parts"][0].get("text", "")
-                    if spun_content:
-                        print("AI Writer: Chapter spun/revised successfully!")
-                        
-                        chroma_manager = ChromaManager()
-                        version_id = chroma_manager.add_chapter_version(
-                            chapter_id=chapter_id,
-                            content=spun_content,
-                            version_type="spun", # Still store as 'spun', but it's a new iteration
-                            metadata={"source_version_type": "original", "revision_feedback": feedback if feedback else "none"}
-                        )
-                        if version_id:
-                            print(f"AI Writer: Spun content stored in ChromaDB with ID: {version_id}")
-                        else:
-                            print("AI Writer: Failed to store spun content in ChromaDB.")
-
-                        return spun_content
-                    else:
-                        print("AI Writer: Warning - Spun content text part is empty.")
-                        return "Error: Spun content text part is empty."
-                else:
-                    print("AI Writer: Error - No content generated or unexpected response structure.")
-                    print(f"Full API response: {result}")
-                    return "Error: Could not generate spun content."
-
-            except httpx.HTTPStatusError as e:
-                if 500 <= e.response.status_code < 600 and attempt < retries:
-                    print(f"AI Writer: API error {e.response.status_code}. Retrying in {delay} seconds (Attempt {attempt + 1}/{retries})...")
-                    await asyncio.sleep(delay)
-                else:
-                    print(f"AI Writer: An HTTP status error occurred: {e.response.status_code} - {e.response.text}")
-                    return f"Error: Failed to spin content due to API error: {e.response.status_code}"
-            except httpx.RequestError as e:
-                if attempt < retries:
-                    print(f"AI Writer: A request error occurred: {e}. Retrying in {delay} seconds (Attempt {attempt + 1}/{retries})...")
-                    await asyncio.sleep(delay)
-                else:
-                    print(f"AI Writer: An HTTP request error occurred: {e}")
-                    return f"Error: Failed to spin content due to network or request issue: {e}"
-            except Exception as e:
-                print(f"AI Writer: An unexpected error occurred: {e}")
-                return f"Error: Failed to spin content due to unexpected issue: {e}"
-        return "Error: Max retries exceeded for spinning content."
+        instructions = CHUNK_WRITER_DEFAULT_INSTRUCTIONS
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def spin_window(index: int, window: dict) -> str:
+        prompt = CHUNK_WRITER_PROMPT_TEMPLATE.format(
+            instructions=instructions,
+            context_before=window["context_before"] or "(start of chapter)",
+            context_after=window["context_after"] or "(end of chapter)",
+            chapter_content=window["text"],
+            window_number=index + 1,
+            window_count=len(windows)
+        )
+        async with semaphore:
+            spun_window = await generate_spun_text(prompt, retries=retries, delay=delay, use_cache=use_cache, purpose="writer_window")
+        if not spun_window.startswith("Error:"):
+            print(f"AI Writer: Window {index + 1}/{len(windows)} spun.")
+            if on_window_spun is not None:
+                on_window_spun(index, len(windows), spun_window.strip())
+        return spun_window
+
+    spun_windows = await asyncio.gather(*(spin_window(i, w) for i, w in enumerate(windows)))
+
+    failed = [i + 1 for i, text in enumerate(spun_windows) if text.startswith("Error:")]
+    if failed:
+        print(f"AI Writer: Failed to spin windows {failed}.")
+        return f"Error: Failed to spin {len(failed)} of {len(windows)} chapter windows: {spun_windows[failed[0] - 1]}"
+
+    # Windows are rejoined with the original text between them, so scene breaks and spacing survive
+    spun_content = "".join(window["separator_before"] + text.strip() for window, text in zip(windows, spun_windows))
+    print("AI Writer: Chapter spun/revised successfully (chunked)!")
+    await asyncio.to_thread(store_spun_version, chapter_id, spun_content, feedback,
+                            extra_metadata={"spin_mode": "chunked", "window_count": len(windows)}, chroma_manager=chroma_manager)
+    return spun_content
+
+def get_stream_checkpoint_path(chapter_id: str) -> str:
+    """
+    Returns the file that holds the partial output of a streamed spin for the chapter.
+    """
+    return os.path.join(STREAM_CHECKPOINT_DIR, f"{chapter_id}_spun.partial.txt")
+
+def _write_stream_checkpoint(checkpoint_path: str, text: str):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, checkpoint_path) # Atomic, so readers never see a half-written checkpoint
+
+async def stream_spin_chapter_content(chapter_id: str, original_content: str, feedback: str = '', use_cache: bool = True):
+    """
+    Streaming variant of spin_chapter_content built on streamGenerateContent.
+    Yields text chunks as they arrive, periodically checkpoints the partial output to disk,
+    and stores the complete text in ChromaDB as a new 'spun' version once the stream ends.
+
+    Args:
+        chapter_id (str): The ID of the chapter being spun.
+        original_content (str): The original chapter content to be spun.
+        feedback (str): Optional feedback from a human reviewer for revisions.
+        use_cache (bool): Reuse a cached response for an identical prompt. Pass False for fresh sampling.
+
+    Yields:
+        str: Chunks of the spun chapter content.
+
+    Raises:
+        httpx.HTTPError: If the API request fails. The partial checkpoint is kept on disk.
+        ValueError: If the stream finished without producing any text, or the prompt is over budget with strategy "error".
+    """
+    prompt = build_spin_prompt(original_content, feedback)
+    prompt_tokens = estimate_tokens(prompt)
+    if prompt_tokens > LLM_PROMPT_TOKEN_BUDGET:
+        # A single stream cannot be split into windows, so "chunk" falls back to truncation here.
+        print(f"AI Writer: Prompt is ~{prompt_tokens} tokens, over the budget of {LLM_PROMPT_TOKEN_BUDGET} (strategy: {LLM_OVERSIZE_STRATEGY}).")
+        if LLM_OVERSIZE_STRATEGY == "error":
+            raise ValueError(f"Prompt of ~{prompt_tokens} tokens exceeds the budget of {LLM_PROMPT_TOKEN_BUDGET} tokens.")
+        template_tokens = prompt_tokens - estimate_tokens(original_content)
+        prompt = build_spin_prompt(truncate_to_token_budget(original_content, LLM_PROMPT_TOKEN_BUDGET - template_tokens), feedback)
+    llm_client = get_llm_client()
+
+    os.makedirs(STREAM_CHECKPOINT_DIR, exist_ok=True)
+    checkpoint_path = get_stream_checkpoint_path(chapter_id)
+    parts = []
+    unsaved_chars = 0
+
+    try:
+        async for chunk in llm_client.stream_generate_content(prompt, timeout=120.0, use_cache=use_cache, purpose="writer_stream"):
+            parts.append(chunk)
+            unsaved_chars += len(chunk)
+            if unsaved_chars >= STREAM_CHECKPOINT_INTERVAL_CHARS:
+                _write_stream_checkpoint(checkpoint_path, "".join(parts))
+                unsaved_chars = 0
+            yield chunk
+    except httpx.HTTPStatusError as e:
+        print(f"AI Writer: An HTTP status error occurred while streaming: {e.response.status_code} - {e.response.text}")
+        raise
+    except httpx.RequestError as e:
+        print(f"AI Writer: An HTTP request error occurred while streaming: {e}")
+        raise
+    finally:
+        if parts and unsaved_chars:
+            _write_stream_checkpoint(checkpoint_path, "".join(parts))
+
+    spun_content = "".join(parts)
+    if not spun_content:
+        print("AI Writer: Warning - Streamed spun content is empty.")
+        raise ValueError("Streamed spun content is empty.")
+
+    print("AI Writer: Chapter spun/revised successfully (streamed)!")
+    await asyncio.to_thread(store_spun_version, chapter_id, spun_content, feedback, extra_metadata={"spin_mode": "streamed"})
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
 
 async def main():
     """
@@ -141,10 +424,16 @@ async def main():
         return
 
     # This call is for initial spinning without feedback
-    spun_chapter = await spin_chapter_content(chapter_id, original_content)
+    use_cache = "--no-cache" not in sys.argv
+    if "--chunked" in sys.argv:
+        spun_chapter = await spin_chapter_content_chunked(chapter_id, original_content, use_cache=use_cache)
+    else:
+        spun_chapter = await spin_chapter_content(chapter_id, original_content, use_cache=use_cache)
 
     if spun_chapter.startswith("Error:"):
         print(f"Failed to spin chapter due to error: {spun_chapter}")
 
+    await get_llm_client().aclose() # Release pooled connections before the event loop closes
+
 if __name__ == "__main__":
     asyncio.run(main())
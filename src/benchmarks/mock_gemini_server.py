@@ -0,0 +1,193 @@
+# src/benchmarks/mock_gemini_server.py
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Words used to build fake generated text of the requested size.
+LOREM_WORDS = (
+    "the knight rode through the silent forest while morning light broke over distant hills "
+    "and the old schooner drifted toward an island where strangers waited beside the shore"
+).split()
+
+MODEL_PATH_PATTERN = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+
+
+class MockGeminiSettings:
+    """
+    Behaviour of the mock server. All latencies are in seconds.
+    """
+    def __init__(self, base_latency: float = 0.5, latency_per_output_token: float = 0.002, jitter: float = 0.1,
+                 output_tokens: int = 800, stream_chunks: int = 10, rate_429: float = 0.0, rate_5xx: float = 0.0,
+                 retry_after: float = 1.0):
+        self.base_latency = base_latency
+        self.latency_per_output_token = latency_per_output_token
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        self.stream_chunks = stream_chunks
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+
+
+def _fake_text(token_count: int) -> str:
+    # Roughly one word per 1.3 tokens, like English prose.
+    word_count = max(1, int(token_count / 1.3))
+    return " ".join(LOREM_WORDS[i % len(LOREM_WORDS)] for i in range(word_count))
+
+def _usage(prompt_text: str, output_tokens: int) -> dict:
+    prompt_tokens = max(1, len(prompt_text) // 4)
+    return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens, "totalTokenCount": prompt_tokens + output_tokens}
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    """
+    Serves generateContent and streamGenerateContent (alt=sse) with the configured latency,
+    token sizes and error rates.
+    """
+    protocol_version = "HTTP/1.1"
+    settings = MockGeminiSettings()
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark output readable
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        match = MODEL_PATH_PATTERN.match(path)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request_body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON payload."}})
+            return
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {path}"}})
+            return
+
+        settings = self.settings
+        roll = random.random()
+        if roll < settings.rate_429:
+            time.sleep(settings.base_latency * 0.1)
+            self._send_json(
+                429,
+                {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded (mock).", "details": [
+                    {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{settings.retry_after}s"}
+                ]}},
+                headers={"Retry-After": str(settings.retry_after)}
+            )
+            return
+        if roll < settings.rate_429 + settings.rate_5xx:
+            time.sleep(settings.base_latency * 0.1)
+            self._send_json(503, {"error": {"code": 503, "status": "UNAVAILABLE", "message": "The model is overloaded (mock)."}})
+            return
+
+        try:
+            prompt_text = "".join(part.get("text", "") for part in request_body["contents"][0]["parts"])
+        except (KeyError, IndexError, TypeError):
+            prompt_text = ""
+        candidate_count = int((request_body.get("generationConfig") or {}).get("candidateCount", 1))
+        output_tokens = settings.output_tokens
+        generation_time = settings.base_latency + output_tokens * settings.latency_per_output_token + random.uniform(0, settings.jitter)
+
+        if match.group("method") == "generateContent":
+            time.sleep(generation_time)
+            self._send_json(200, {
+                "candidates": [
+                    {"content": {"role": "model", "parts": [{"text": _fake_text(output_tokens)}]}, "finishReason": "STOP", "index": i}
+                    for i in range(candidate_count)
+                ],
+                "usageMetadata": _usage(prompt_text, output_tokens * candidate_count),
+                "modelVersion": match.group("model")
+            })
+            return
+
+        # streamGenerateContent: the first chunk arrives after the base latency, the rest are spread over the generation time.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        words = _fake_text(output_tokens).split(" ")
+        chunk_count = max(1, settings.stream_chunks)
+        chunk_size = max(1, len(words) // chunk_count)
+        chunks = [" ".join(words[i:i + chunk_size]) + " " for i in range(0, len(words), chunk_size)]
+        time.sleep(settings.base_latency)
+        per_chunk_delay = (generation_time - settings.base_latency) / len(chunks)
+        for i, chunk in enumerate(chunks):
+            event = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}, "index": 0}]}
+            if i == len(chunks) - 1:
+                event["candidates"][0]["finishReason"] = "STOP"
+                event["usageMetadata"] = _usage(prompt_text, output_tokens)
+            self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(per_chunk_delay)
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, settings: MockGeminiSettings = None) -> ThreadingHTTPServer:
+    """
+    Starts the mock server in a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server. Its base URL for GEMINI_API_BASE_URL is
+                             f"http://{host}:{server.server_port}/v1beta". Call shutdown() to stop it.
+    """
+    handler = type("ConfiguredMockGeminiHandler", (MockGeminiHandler,), {"settings": settings or MockGeminiSettings()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-gemini-server", daemon=True).start()
+    return server
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the mock behaviour options to an argument parser (shared with the benchmark).
+    """
+    defaults = MockGeminiSettings()
+    parser.add_argument("--base-latency", type=float, default=defaults.base_latency, help="Seconds before the first token.")
+    parser.add_argument("--latency-per-token", type=float, default=defaults.latency_per_output_token, help="Seconds per generated token.")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="Random extra latency (seconds).")
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens, help="Tokens generated per candidate.")
+    parser.add_argument("--stream-chunks", type=int, default=defaults.stream_chunks, help="Chunks per streamed response.")
+    parser.add_argument("--rate-429", type=float, default=defaults.rate_429, help="Fraction of requests answered with 429.")
+    parser.add_argument("--rate-5xx", type=float, default=defaults.rate_5xx, help="Fraction of requests answered with 503.")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after, help="Retry-After seconds sent with 429s.")
+
+def settings_from_args(args) -> MockGeminiSettings:
+    return MockGeminiSettings(
+        base_latency=args.base_latency,
+        latency_per_output_token=args.latency_per_token,
+        jitter=args.jitter,
+        output_tokens=args.output_tokens,
+        stream_chunks=args.stream_chunks,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_mock_server(args.host, args.port, settings_from_args(args))
+    print(f"Mock Gemini server listening. Set GEMINI_API_BASE_URL=http://{args.host}:{server.server_port}/v1beta")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
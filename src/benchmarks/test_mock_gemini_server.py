@@ -0,0 +1,55 @@
+# src/benchmarks/test_mock_gemini_server.py
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.mock_gemini_server import MockGeminiSettings, start_mock_server
+
+PAYLOAD = {"contents": [{"parts": [{"text": "Rewrite this chapter."}]}], "generationConfig": {"candidateCount": 2}}
+
+
+@pytest.fixture
+def serve():
+    servers = []
+    def serve(**settings) -> str:
+        settings = dict({"base_latency": 0.0, "latency_per_output_token": 0.0, "jitter": 0.0, "output_tokens": 40}, **settings)
+        server = start_mock_server(settings=MockGeminiSettings(**settings))
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/v1beta/models/gemini-test"
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_generate_content_returns_each_candidate_with_usage(serve):
+    response = httpx.post(f"{serve()}:generateContent", json=PAYLOAD, trust_env=False)
+    body = response.json()
+    assert response.status_code == 200
+    assert len(body["candidates"]) == 2
+    assert body["candidates"][0]["content"]["parts"][0]["text"]
+    assert body["usageMetadata"]["candidatesTokenCount"] == 80
+    assert body["modelVersion"] == "gemini-test"
+
+def test_stream_generate_content_sends_server_sent_events(serve):
+    response = httpx.post(f"{serve(stream_chunks=4)}:streamGenerateContent?alt=sse", json=PAYLOAD, trust_env=False)
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert response.headers["content-type"] == "text/event-stream"
+    assert len(events) >= 4
+    assert events[-1]["candidates"][0]["finishReason"] == "STOP"
+    assert "usageMetadata" in events[-1]
+
+def test_rate_limited_requests_carry_retry_after(serve):
+    response = httpx.post(f"{serve(rate_429=1.0, retry_after=2.5)}:generateContent", json=PAYLOAD, trust_env=False)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2.5"
+    assert response.json()["error"]["details"][0]["retryDelay"] == "2.5s"
+
+def test_overloaded_and_unknown_requests(serve):
+    assert httpx.post(f"{serve(rate_5xx=1.0)}:generateContent", json=PAYLOAD, trust_env=False).status_code == 503
+    assert httpx.post(f"{serve()}:countTokens", json=PAYLOAD, trust_env=False).status_code == 404
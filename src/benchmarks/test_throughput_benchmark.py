@@ -0,0 +1,42 @@
+# src/benchmarks/test_throughput_benchmark.py
+import asyncio
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.throughput_benchmark import percentile, run_async_stage, run_sync_stage, summarize
+
+
+def test_percentile_uses_nearest_rank():
+    values = [0.1 * i for i in range(1, 11)]
+    assert percentile(values, 50) == values[4]
+    assert percentile(values, 95) == values[9]
+    assert percentile(values, 0) == values[0]
+    assert percentile([], 99) == 0.0
+
+def test_summarize_reports_milliseconds_and_throughput():
+    summary = summarize("spin", [0.3, 0.1, 0.2], errors=1, wall_seconds=0.5)
+    assert summary == {"stage": "spin", "count": 3, "errors": 1, "wall_s": 0.5, "throughput_per_s": 6.0,
+                       "p50_ms": 200.0, "p95_ms": 300.0, "p99_ms": 300.0}
+
+def test_async_stage_limits_concurrency_and_counts_errors():
+    in_flight, peak = 0, 0
+    async def call(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if i == 3:
+            raise RuntimeError("boom")
+        return "Error: quota" if i == 5 else "ok"
+
+    summary = asyncio.run(run_async_stage("spin", call, iterations=8, concurrency=3))
+    assert peak == 3
+    assert (summary["count"], summary["errors"]) == (8, 2)
+
+def test_sync_stage_counts_errors():
+    summary = run_sync_stage("search", lambda i: None if i % 2 else ["hit"], iterations=4)
+    assert (summary["count"], summary["errors"]) == (4, 2)
@@ -0,0 +1,234 @@
+# src/benchmarks/throughput_benchmark.py
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.mock_gemini_server import start_mock_server, add_settings_arguments, settings_from_args
+
+APP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'human_in_loop', 'backend', 'app.py'))
+
+SEARCH_QUERIES = ["brave knight", "island shore", "morning light over the hills", "schooner adrift", "strangers waiting"]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(stage: str, latencies: list, errors: int, wall_seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "stage": stage,
+        "count": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall_seconds, 3),
+        "throughput_per_s": round(len(latencies) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+def _is_error(result) -> bool:
+    return result is None or (isinstance(result, str) and result.startswith("Error:"))
+
+async def run_async_stage(stage: str, make_call, iterations: int, concurrency: int) -> dict:
+    """
+    Runs make_call(i) for i in range(iterations) with at most `concurrency` calls in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await make_call(i)
+                if _is_error(result):
+                    errors += 1
+            except Exception as e:
+                print(f"Benchmark: {stage} call {i} raised: {e}")
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    return summarize(stage, latencies, errors, time.perf_counter() - started)
+
+def run_sync_stage(stage: str, call, iterations: int) -> dict:
+    """
+    Runs call(i) for i in range(iterations) one after another.
+    """
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        try:
+            if _is_error(call(i)):
+                errors += 1
+        except Exception as e:
+            print(f"Benchmark: {stage} call {i} raised: {e}")
+            errors += 1
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(stage, latencies, errors, time.perf_counter() - started)
+
+def _flask_call(client, method: str, path: str, json_body: dict = None):
+    response = client.open(path, method=method, json=json_body)
+    return None if response.status_code >= 400 else response.status_code
+
+def _flask_revision(client, chapter_id: str, feedback: str, timeout: float):
+    # /request_revision only queues a job; wait for it so the stage measures the whole revision.
+    response = client.post(f"/request_revision/{chapter_id}", json={"feedback": feedback})
+    if response.status_code >= 400:
+        return None
+    job_url = response.get_json()["status_url"]
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        job = client.get(job_url).get_json()
+        if job["status"] in ("succeeded", "failed"):
+            return job["status"] if job["status"] == "succeeded" else None
+        time.sleep(0.05)
+    print(f"Benchmark: Revision job {job_url} did not finish within {timeout}s.")
+    return None
+
+def print_report(results: list):
+    header = f"{'stage':<22}{'count':>7}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['stage']:<22}{r['count']:>7}{r['errors']:>8}{r['throughput_per_s']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark writer, reviewer, ChromaManager and Flask endpoints against a local mock Gemini server.")
+    parser.add_argument("--base-url", help="Use an already running (mock) Gemini endpoint instead of starting one.")
+    parser.add_argument("--iterations", type=int, default=20, help="Calls per LLM stage.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent calls per LLM stage.")
+    parser.add_argument("--db-iterations", type=int, default=50, help="Calls per ChromaManager / Flask read stage.")
+    parser.add_argument("--revision-iterations", type=int, default=3, help="Calls to the Flask /request_revision endpoint.")
+    parser.add_argument("--revision-timeout", type=float, default=300.0, help="Seconds to wait for a revision job before counting it as an error.")
+    parser.add_argument("--requests-per-minute", type=int, default=100000, help="Rate limit used by the LLM client during the run.")
+    parser.add_argument("--chroma-path", help="ChromaDB directory to use (default: a fresh temporary directory).")
+    parser.add_argument("--skip-flask", action="store_true", help="Do not benchmark the Flask endpoints.")
+    parser.add_argument("--report", help="Write the results as JSON to this path.")
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = start_mock_server(settings=settings_from_args(args))
+        base_url = f"http://127.0.0.1:{server.server_port}/v1beta"
+        print(f"Benchmark: Mock Gemini server started at {base_url}")
+
+    # Configuration is read at import time, so it has to be in place before the project modules are imported.
+    os.environ["GEMINI_API_BASE_URL"] = base_url
+    os.environ["LLM_CACHE_ENABLED"] = "false" # Measure real round trips, not cache hits
+    os.environ.setdefault("CHROMA_SEARCH_CACHE_SIZE", "0") # Same for the repeated search queries
+    os.environ["GEMINI_REQUESTS_PER_MINUTE"] = str(args.requests_per_minute)
+    os.environ["GEMINI_TOKENS_PER_MINUTE"] = str(args.requests_per_minute * 100000)
+    os.environ.setdefault("GEMINI_API_KEY", "mock-key")
+    os.environ["CHROMA_DB_PATH"] = args.chroma_path or tempfile.mkdtemp(prefix="bench_chroma_")
+    print(f"Benchmark: Using ChromaDB at {os.environ['CHROMA_DB_PATH']}")
+    os.environ.setdefault("JOB_DB_PATH", os.path.join(os.environ["CHROMA_DB_PATH"], "jobs.sqlite3")) # Keep benchmark jobs out of the real queue
+
+    from config import DEFAULT_CHAPTER_ID, ORIGINAL_CHAPTER_PATH
+    from ai_agents.writer_agent import spin_chapter_content
+    from ai_agents.reviewer_agent import review_chapter_content
+    from ai_agents.llm_client import get_llm_client
+    from database.chroma_manager import get_chroma_manager
+
+    chapter_id = DEFAULT_CHAPTER_ID
+    if os.path.exists(ORIGINAL_CHAPTER_PATH):
+        with open(ORIGINAL_CHAPTER_PATH, "r", encoding="utf-8") as f:
+            original_content = f.read()
+    else:
+        original_content = "\n".join(f"Paragraph {i}: the knight rode toward the shore at first light." for i in range(150))
+
+    results = []
+    chroma_manager = get_chroma_manager()
+    chroma_manager.warm_up() # Keep model loading out of the measured stages
+    chroma_manager.add_chapter_version(chapter_id, original_content, "original")
+
+    async def run_llm_stages():
+        results.append(await run_async_stage(
+            "writer.spin", lambda i: spin_chapter_content(chapter_id, original_content, feedback=f"benchmark run {i}", use_cache=False),
+            args.iterations, args.concurrency
+        ))
+        results.append(await run_async_stage(
+            "reviewer.review", lambda i: review_chapter_content(chapter_id, f"{original_content}\n(benchmark run {i})", use_cache=False),
+            args.iterations, args.concurrency
+        ))
+        await get_llm_client().aclose()
+
+    asyncio.run(run_llm_stages())
+
+    results.append(run_sync_stage(
+        "chroma.add_version", lambda i: chroma_manager.add_chapter_version(f"bench_chapter_{i % 10}", original_content, "original"),
+        args.db_iterations
+    ))
+    results.append(run_sync_stage(
+        "chroma.add_versions_x10", lambda i: chroma_manager.add_chapter_versions([
+            {"chapter_id": f"bench_chapter_{i % 10}", "content": original_content, "version_type": "original"} for _ in range(10)
+        ]),
+        max(1, args.db_iterations // 10)
+    ))
+    results.append(run_sync_stage(
+        "chroma.latest_version", lambda i: chroma_manager.get_latest_chapter_version(chapter_id, "spun"),
+        args.db_iterations
+    ))
+    results.append(run_sync_stage(
+        "chroma.semantic_search", lambda i: chroma_manager.semantic_search(SEARCH_QUERIES[i % len(SEARCH_QUERIES)], 5),
+        args.db_iterations
+    ))
+
+    if not args.skip_flask:
+        spec = importlib.util.spec_from_file_location("benchmark_backend_app", APP_PATH)
+        backend = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(backend)
+        client = backend.app.test_client()
+
+        results.append(run_sync_stage(
+            "flask.content", lambda i: _flask_call(client, "GET", f"/content/{chapter_id}/{('original', 'spun', 'review_comments')[i % 3]}"),
+            args.db_iterations
+        ))
+        results.append(run_sync_stage(
+            "flask.semantic_search", lambda i: _flask_call(client, "POST", "/semantic_search", {"query_text": SEARCH_QUERIES[i % len(SEARCH_QUERIES)], "n_results": 5}),
+            args.db_iterations
+        ))
+        results.append(run_sync_stage("flask.chromadb_status", lambda i: _flask_call(client, "GET", "/chromadb_status"), args.db_iterations))
+        results.append(run_sync_stage(
+            "flask.request_revision", lambda i: _flask_revision(client, chapter_id, f"benchmark revision {i}", args.revision_timeout),
+            args.revision_iterations
+        ))
+
+    print_report(results)
+    embedding = chroma_manager.get_embedding_stats()
+    print(f"\nEmbeddings ({embedding['backend']}, batch {embedding['batch_size']}): {embedding['texts']} texts in "
+          f"{embedding['seconds']}s = {embedding['texts_per_s']} texts/s, {embedding['chars_per_s']} chars/s")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBenchmark: Report written to {args.report}")
+
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # src/config.py
 
+import json
 import os
 
 # Get the absolute path to the directory containing this script (src/)
@@ -19,8 +20,33 @@ ORIGINAL_CHAPTER_PATH = os.path.join(PROJECT_ROOT, "src", "data", "raw", "chapte
 SCREENSHOT_OUTPUT_FILE_PATH = os.path.join(PROJECT_ROOT, "src", "data", "raw", "chapter_screenshot.png")
 
 # ChromaDB configuration - NOW ABSOLUTE AND RELATIVE TO PROJECT_ROOT
-CHROMA_DB_PATH = os.path.join(PROJECT_ROOT, "src", "database", "chroma_db") # Absolute path where ChromaDB will store its data
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", os.path.join(PROJECT_ROOT, "src", "database", "chroma_db")) # Absolute path where ChromaDB will store its data
 CHROMA_COLLECTION_NAME = "book_chapters" # Name of the collection for our chapters
+# Write-behind queue for bulk ingestion: versions are grouped into one embedding batch / transaction
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "64")) # Max versions per write
+CHROMA_WRITE_FLUSH_INTERVAL = float(os.getenv("CHROMA_WRITE_FLUSH_INTERVAL", "0.5")) # Seconds to wait for more versions before writing
+# Passage index: every version is also embedded as overlapping passages (in "<collection>_passages") for precise search
+CHROMA_PASSAGE_CHARS = int(os.getenv("CHROMA_PASSAGE_CHARS", "1000")) # Target passage length
+CHROMA_PASSAGE_OVERLAP_CHARS = int(os.getenv("CHROMA_PASSAGE_OVERLAP_CHARS", "200")) # Text shared by neighbouring passages
+CHROMA_SEARCH_CACHE_SIZE = int(os.getenv("CHROMA_SEARCH_CACHE_SIZE", "256")) # Cached search results (0 disables); cleared on every write
+# Search modes: "vector" (embeddings), "keyword" (BM25 over an FTS5 index of the passages, no embedding) or "hybrid" (both, fused)
+CHROMA_SEARCH_MODE = os.getenv("CHROMA_SEARCH_MODE", "vector") # Default mode of /semantic_search
+CHROMA_HYBRID_RRF_K = int(os.getenv("CHROMA_HYBRID_RRF_K", "60")) # Reciprocal rank fusion constant; larger values flatten rank differences
+# Delta storage: new text is stored as a word diff against its parent version (approved_spun_version_id /
+# revised_spun_version_id, else the chapter's previous version of the same type) and rebuilt on read
+CHROMA_DELTA_ENABLED = os.getenv("CHROMA_DELTA_ENABLED", "true").lower() == "true"
+CHROMA_DELTA_SNAPSHOT_INTERVAL = int(os.getenv("CHROMA_DELTA_SNAPSHOT_INTERVAL", "8")) # Store a full copy after this many chained diffs
+CHROMA_DELTA_MAX_RATIO = float(os.getenv("CHROMA_DELTA_MAX_RATIO", "0.5")) # Store a full copy if the diff is larger than this share of the text
+CHROMA_CONTENT_CACHE_SIZE = int(os.getenv("CHROMA_CONTENT_CACHE_SIZE", "64")) # Rebuilt version texts kept in memory
+# Embedding backend used by both collections:
+#   "default"     - Chroma's built-in all-MiniLM-L6-v2 (ONNX)
+#   "onnx_minilm" - the same model with EMBEDDING_THREADS intra-op threads
+#   "hashed_bow"  - hashed bag-of-words vectors; no model to load, fast but not semantic (tests/benchmarks)
+# Vectors from different backends are not comparable: use a fresh CHROMA_DB_PATH after switching.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "default")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32")) # Texts per model call
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) # onnx_minilm intra-op threads (0 = onnxruntime default)
+EMBEDDING_HASH_DIM = int(os.getenv("EMBEDDING_HASH_DIM", "384")) # hashed_bow vector size
 
 # --- Centralized Chapter ID ---
 # This ID will be used across all Python scripts and the Flask backend
@@ -31,3 +57,91 @@ DEFAULT_CHAPTER_ID = "the_gates_of_morning_book1_chapter1"
 # SPUN_CHAPTER_PATH and REVIEW_COMMENTS_PATH are conceptually managed by ChromaDB now
 SPUN_CHAPTER_PATH = os.path.join(PROJECT_ROOT, "src", "data", "processed", "spun_chapter.txt")
 REVIEW_COMMENTS_PATH = os.path.join(PROJECT_ROOT, "src", "data", "processed", "review_comments.txt")
+
+# --- LLM (Gemini) client configuration ---
+# A single pooled HTTP client is shared by the writer, the reviewer and the Flask backend.
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_API_BASE_URL = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com/v1beta") # Point at src/benchmarks/mock_gemini_server.py for local runs
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true" # Falls back to HTTP/1.1 if the 'h2' package is missing
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")) # Seconds an idle connection is kept open
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+
+# --- LLM response cache ---
+# Identical requests (same model + prompt + generation params) are answered from a local SQLite cache.
+# Set LLM_CACHE_ENABLED=false (or pass use_cache=False to the agents) when fresh sampling is wanted.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.path.join(PROJECT_ROOT, "src", "data", "cache", "llm_response_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))) # One week
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024))) # LRU eviction above 200 MB
+
+# --- Streaming generation ---
+# Partial output of streamed spins is checkpointed here so an interrupted generation is not lost.
+STREAM_CHECKPOINT_DIR = os.path.join(PROJECT_ROOT, "src", "data", "processed", "stream_checkpoints")
+STREAM_CHECKPOINT_INTERVAL_CHARS = int(os.getenv("STREAM_CHECKPOINT_INTERVAL_CHARS", "2000")) # Flush the checkpoint after this many new characters
+
+# --- Chunked spinning for long chapters ---
+# The chapter is split into paragraph/scene windows that are spun concurrently and stitched back together.
+SPIN_CHUNK_MAX_CHARS = int(os.getenv("SPIN_CHUNK_MAX_CHARS", "6000")) # Upper bound on the text spun by one request
+SPIN_CHUNK_OVERLAP_CHARS = int(os.getenv("SPIN_CHUNK_OVERLAP_CHARS", "500")) # Neighbouring text passed along as read-only context
+SPIN_CHUNK_CONCURRENCY = int(os.getenv("SPIN_CHUNK_CONCURRENCY", "4")) # Max windows in flight at once
+
+# --- Batch pipeline (scrape -> spin -> review -> store) ---
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "2")) # Browser pages open at once
+BATCH_SPIN_CONCURRENCY = int(os.getenv("BATCH_SPIN_CONCURRENCY", "4")) # Chapters being spun at once
+BATCH_REVIEW_CONCURRENCY = int(os.getenv("BATCH_REVIEW_CONCURRENCY", "4")) # Chapters being reviewed at once
+BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", "8")) # Bounded hand-off queue between stages (backpressure)
+BATCH_SCREENSHOT_DIR = os.path.join(PROJECT_ROOT, "src", "data", "raw", "screenshots")
+
+# --- Gemini rate limiting and retries ---
+# A process-wide token bucket keeps every agent just under the API quota. On 429 responses the
+# allowed rate is halved and slowly restored on success; retries use jittered exponential backoff
+# and honour Retry-After / retryDelay hints from the API.
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "2")) # Seconds; doubled on every attempt
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "60")) # Upper bound for a single backoff sleep
+
+# --- Background jobs ---
+# /request_revision queues the writer and reviewer as a job (status at /jobs/<id>) instead of holding the HTTP request open.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(PROJECT_ROOT, "src", "data", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4")) # Revisions processed concurrently
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60")) # A running job whose owner stops renewing this long is failed
+
+# --- Push updates to the UI (/events/<chapter_id>) ---
+EVENTS_KEEPALIVE_SECONDS = int(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15")) # Idle time before a keep-alive comment; also how often writes by other processes are picked up
+
+# --- HTTP response compression and caching ---
+# JSON and text responses are gzip- or brotli-compressed (brotli needs the Brotli package); content and screenshot responses carry ETags.
+HTTP_COMPRESSION_ENABLED = os.getenv("HTTP_COMPRESSION_ENABLED", "true").lower() == "true"
+HTTP_COMPRESSION_MIN_BYTES = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", "1024")) # Smaller responses are sent as they are
+HTTP_COMPRESSION_LEVEL = int(os.getenv("HTTP_COMPRESSION_LEVEL", "6")) # gzip level 1-9; brotli uses the same number as its quality (0-11)
+
+# --- Revision mode ---
+# "sequential": the reviewer starts after the writer has finished the whole chapter.
+# "overlapped": the chapter is written in sections and each finished section is reviewed while later ones are still being written.
+# "best_of_n": several candidates are generated and scored, and only the best one is stored as the new spun version.
+REVISION_MODE = os.getenv("REVISION_MODE", "sequential")
+
+# --- Multi-candidate generation (best_of_n) ---
+# Candidates come from one request with candidateCount, or from parallel requests if the model does not support it.
+# "review" scoring runs a quick review per candidate and ranks it with the reward model (the winner's review is kept);
+# "heuristic" scoring ranks the candidate texts directly without extra LLM calls.
+SPIN_CANDIDATE_COUNT = int(os.getenv("SPIN_CANDIDATE_COUNT", "3"))
+SPIN_CANDIDATE_TEMPERATURE = float(os.getenv("SPIN_CANDIDATE_TEMPERATURE", "0.9")) # Sampling temperature, so candidates differ
+SPIN_CANDIDATE_SCORING = os.getenv("SPIN_CANDIDATE_SCORING", "review")
+
+# --- Prompt token budgeting and usage accounting ---
+# Prompts are estimated before sending. Oversized ones are handled according to LLM_OVERSIZE_STRATEGY:
+# "chunk" (split into windows/sections), "truncate" (cut the chapter to fit) or "error" (fail fast).
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "24000"))
+LLM_OVERSIZE_STRATEGY = os.getenv("LLM_OVERSIZE_STRATEGY", "chunk")
+LLM_USAGE_LOG_PATH = os.path.join(PROJECT_ROOT, "src", "data", "logs", "llm_usage.jsonl") # One line per call with its usageMetadata
+
+# --- Retention and compaction (python src/database/compaction.py) ---
+# Approved versions, the versions they were made from, and the newest COMPACTION_KEEP_LAST versions of every type are always kept.
+COMPACTION_KEEP_LAST = int(os.getenv("COMPACTION_KEEP_LAST", "5")) # Newest versions of each type kept per chapter
+COMPACTION_KEEP_DAYS = int(os.getenv("COMPACTION_KEEP_DAYS", "30")) # Versions younger than this are kept (0 = age is ignored)
+COMPACTION_POLICIES = json.loads(os.getenv("COMPACTION_POLICIES", "{}")) # Per-chapter overrides, e.g. {"book1_chapter1": {"keep_last": 10}}
@@ -0,0 +1,14 @@
+# src/conftest.py
+import os
+import sys
+import tempfile
+
+# Tests import project modules the same way the scripts do (from src/)
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+# Configuration is read at import time, so keep every test run away from the real data files
+_test_data_dir = tempfile.mkdtemp(prefix="book_workflow_tests_")
+os.environ["CHROMA_DB_PATH"] = os.path.join(_test_data_dir, "chroma_db")
+os.environ["JOB_DB_PATH"] = os.path.join(_test_data_dir, "jobs.sqlite3")
+os.environ["EMBEDDING_BACKEND"] = "hashed_bow" # No model download
+os.environ["LLM_CACHE_ENABLED"] = "false"
@@ -1,34 +1,292 @@
 # src/database/chroma_manager.py
 
+import atexit
 import chromadb
+import hashlib
+import json
 import os
 import sys
+import threading
 from datetime import datetime
 
 # Add the parent directory to the Python path to allow imports from src/config
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import the absolute path for ChromaDB
-from config import CHROMA_DB_PATH, CHROMA_COLLECTION_NAME
+from config import (
+    CHROMA_DB_PATH,
+    CHROMA_COLLECTION_NAME,
+    CHROMA_PASSAGE_CHARS,
+    CHROMA_PASSAGE_OVERLAP_CHARS,
+    CHROMA_SEARCH_CACHE_SIZE,
+    CHROMA_DELTA_ENABLED,
+    CHROMA_DELTA_SNAPSHOT_INTERVAL,
+    CHROMA_DELTA_MAX_RATIO,
+    CHROMA_CONTENT_CACHE_SIZE,
+    CHROMA_HYBRID_RRF_K,
+)
+from database.version_index import VersionIndex
+from database.search_cache import SearchResultCache
+from database.delta_store import make_delta, apply_delta, ContentCache
+from database.lexical_index import LexicalIndex
+from database.embeddings import create_embedding_function
+
+def split_into_passages(content: str, passage_chars: int = CHROMA_PASSAGE_CHARS, overlap_chars: int = CHROMA_PASSAGE_OVERLAP_CHARS) -> list:
+    """
+    Splits text into overlapping passages of about passage_chars characters, ending on whitespace where possible.
+
+    Returns:
+        list: (start, end) character offsets into content.
+    """
+    passages = []
+    start = 0
+    while start < len(content):
+        end = min(len(content), start + passage_chars)
+        if end < len(content):
+            boundary = content.rfind(" ", start + passage_chars // 2, end)
+            newline = content.rfind("\n", start + passage_chars // 2, end)
+            if max(boundary, newline) > 0:
+                end = max(boundary, newline)
+        passages.append((start, end))
+        if end >= len(content):
+            break
+        start = max(end - overlap_chars, start + 1)
+        # Start the next passage on a word boundary
+        while start < end and not content[start - 1].isspace():
+            start += 1
+    return passages
+
+# Metadata keys naming the version a new version was derived from (preferred delta bases)
+DELTA_PARENT_KEYS = ("approved_spun_version_id", "revised_spun_version_id")
 
 class ChromaManager:
     """
     Manages interactions with ChromaDB for storing, retrieving, and searching chapter content.
+    Opening the client and loading the embedding function is expensive, so use the process-wide
+    instance from get_chroma_manager() instead of constructing one per call. The underlying
+    PersistentClient is safe to share between threads.
     """
-    def __init__(self):
+    def __init__(self, path: str = CHROMA_DB_PATH, collection_name: str = CHROMA_COLLECTION_NAME):
         """
         Initializes the ChromaDB client and gets/creates the collection.
         """
+        self.path = path
+
         # Ensure the ChromaDB directory exists
-        os.makedirs(CHROMA_DB_PATH, exist_ok=True)
+        os.makedirs(path, exist_ok=True)
         
         # Initialize the ChromaDB client with a persistent client
-        self.client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+        self.client = chromadb.PersistentClient(path=path)
         
+        # Both collections embed through the configured backend (see EMBEDDING_BACKEND)
+        self.embedding_function = create_embedding_function()
+
+        # A rebuild interrupted while swapping collections leaves the copy under a temporary name
+        for name in (collection_name, f"{collection_name}_passages"):
+            self._recover_collection(name)
+
         # Get or create the collection
-        self.collection = self.client.get_or_create_collection(name=CHROMA_COLLECTION_NAME)
+        self.collection = self.client.get_or_create_collection(name=collection_name, embedding_function=self.embedding_function)
+        # Passages of every version, linked back by version_id, for fine-grained search
+        self.passage_collection = self.client.get_or_create_collection(
+            name=f"{collection_name}_passages", embedding_function=self.embedding_function
+        )
         # ADDED: Explicitly print the path ChromaDB is using
-        print(f"ChromaDB initialized. Collection: '{CHROMA_COLLECTION_NAME}' at '{CHROMA_DB_PATH}'")
+        print(f"ChromaDB initialized. Collection: '{collection_name}' at '{path}'")
+
+        # Repeated searches are answered from memory until the next write
+        self.search_cache = SearchResultCache(CHROMA_SEARCH_CACHE_SIZE)
+        # Filters ChromaDB has accepted (canonical JSON), so each is validated once
+        self._valid_filters = set()
+        self._write_generation = 0
+        # Notified whenever versions are indexed, so event streams wake up without polling
+        self._versions_added = threading.Condition()
+        # Full texts of recently read versions, so delta chains are not replayed on every read
+        self.content_cache = ContentCache(CHROMA_CONTENT_CACHE_SIZE)
+
+        # Latest-version lookups go through a sidecar index (a cache of the collection's version records)
+        # instead of sorting every matching document
+        self.version_index = VersionIndex(os.path.join(path, f"{collection_name}_version_index.sqlite3"))
+        # Documents a rebuild could not index are counted too, or every start would rebuild again
+        if self.version_index.count() + self.version_index.count_skipped() != self.collection.count():
+            self._sync_version_index()
+        # Keyword search over the same passages, kept in its own SQLite file
+        self.lexical_index = LexicalIndex(os.path.join(path, f"{collection_name}_lexical.sqlite3"))
+        if self.passage_collection.count() == 0 and self.collection.count() > 0:
+            self.rebuild_passage_index()
+        elif self.collection.count() > 0 and not 0 < self.lexical_index.count_versions() <= self.collection.count():
+            # Missing, or holding versions that are no longer stored
+            self.rebuild_lexical_index()
+
+    def _search_generation(self) -> tuple:
+        # Own writes bump _write_generation; writes by other processes change the index file's data_version.
+        return (self._write_generation, self.version_index.data_version())
+
+    def warm_up(self) -> float:
+        """
+        Loads the embedding model now instead of on the first write or search.
+
+        Returns:
+            float: Seconds the warm-up took.
+        """
+        return self.embedding_function.warm_up()
+
+    def get_embedding_stats(self) -> dict:
+        """
+        Returns the embedding backend, batch size and throughput since startup.
+        """
+        return self.embedding_function.get_stats()
+
+    def rebuild_version_index(self):
+        """
+        Rebuilds the version index from the collection's metadata (no document content is loaded).
+        Every version has a record there, including those whose content another version stores.
+        """
+        results = self.collection.get(include=['metadatas'])
+        skipped = self.version_index.rebuild(list(zip(results['ids'], results['metadatas'])))
+        print(f"Rebuilt version index with {len(results['ids']) - skipped} versions"
+              + (f" (skipped {skipped} without chapter_id, version_type or timestamp)." if skipped else "."))
+
+    def _sync_version_index(self):
+        """
+        Brings the version index back in line with the collection: versions the index points at another
+        version's content but the collection has no record of (written before references were recorded
+        there) get their record, then the index is rebuilt if it still does not match.
+        """
+        stored_ids = set(self.collection.get(include=[])['ids'])
+        unrecorded = [
+            (version_id, metadata, blob_id) for version_id, metadata, blob_id in self.version_index.list_references()
+            if version_id not in stored_ids and blob_id in stored_ids
+        ]
+        if unrecorded:
+            recorded = self._add_reference_records(unrecorded, self._get_embeddings([blob_id for _, _, blob_id in unrecorded]))
+            self.version_index.update_metadata_many([(version_id, metadata) for version_id, metadata, _ in unrecorded if version_id in recorded])
+            print(f"Recorded {len(recorded)} chapter version references in ChromaDB.")
+        if self.version_index.count() + self.version_index.count_skipped() != self.collection.count():
+            self.rebuild_version_index()
+
+    def _get_embeddings(self, blob_ids: list) -> dict:
+        """
+        Returns {blob_id: embedding} for the given stored documents (missing ones are left out).
+        """
+        try:
+            results = self.collection.get(ids=list(dict.fromkeys(blob_ids)), include=['embeddings'])
+        except Exception as e:
+            print(f"Error loading embeddings from ChromaDB: {e}")
+            return {}
+        return dict(zip(results['ids'], results['embeddings']))
+
+    def _add_reference_records(self, references: list, embeddings: dict) -> set:
+        """
+        Records versions whose content another version stores: each (version_id, metadata, blob_id) becomes
+        a collection entry without text that carries the document's embedding (from embeddings) and points
+        at it with metadata 'storage' "reference" and 'blob_id' (metadata is updated in place). Vector
+        searches and metadata filters thus see every version, while the text is stored and embedded once.
+
+        Returns:
+            set: The IDs of the versions that were recorded.
+        """
+        references = [reference for reference in references if reference[2] in embeddings]
+        for _, metadata, blob_id in references:
+            metadata.update({"storage": "reference", "blob_id": blob_id})
+
+        recorded = set()
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(references), batch_size):
+            batch = references[start:start + batch_size]
+            try:
+                self.collection.add(
+                    ids=[version_id for version_id, _, _ in batch],
+                    embeddings=[embeddings[blob_id] for _, _, blob_id in batch],
+                    documents=[""] * len(batch),
+                    metadatas=[metadata for _, metadata, _ in batch]
+                )
+            except Exception as e:
+                print(f"Error adding chapter version references to ChromaDB: {e}")
+                continue
+            recorded.update(version_id for version_id, _, _ in batch)
+        return recorded
+
+    def _add_passages(self, version_ids: list, documents: list, metadatas: list, vector: bool = True):
+        """
+        Splits versions into passages and adds them to the lexical index and, unless vector is False,
+        the passage collection.
+        """
+        passage_ids, passage_documents, passage_metadatas = [], [], []
+        for version_id, content, metadata in zip(version_ids, documents, metadatas):
+            for n, (start, end) in enumerate(split_into_passages(content)):
+                passage_ids.append(f"{version_id}#p{n}")
+                passage_documents.append(content[start:end])
+                passage_metadatas.append({
+                    "version_id": version_id,
+                    "chapter_id": metadata["chapter_id"],
+                    "version_type": metadata["version_type"],
+                    "timestamp": metadata["timestamp"],
+                    "start": start,
+                    "end": end
+                })
+
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(passage_ids), batch_size):
+            batch = slice(start, start + batch_size)
+            if vector:
+                self.passage_collection.add(documents=passage_documents[batch], metadatas=passage_metadatas[batch], ids=passage_ids[batch])
+        self.lexical_index.add_many(list(zip(passage_ids, passage_documents, passage_metadatas)))
+
+    def _add_all_passages(self, vector: bool = True):
+        total = self.collection.count()
+        batch_size = 100 # Versions loaded at a time
+        for offset in range(0, total, batch_size):
+            results = self.collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+            # References have no text of their own; their document's passages are found through them
+            blob_ids = [
+                blob_id if (metadata or {}).get("storage") != "reference" else None
+                for blob_id, metadata in zip(results['ids'], results['metadatas'])
+            ]
+            contents = self._load_contents([blob_id for blob_id in blob_ids if blob_id])
+            loaded = [i for i, blob_id in enumerate(blob_ids) if blob_id in contents]
+            self._add_passages(
+                [results['ids'][i] for i in loaded], [contents[results['ids'][i]] for i in loaded], [results['metadatas'][i] for i in loaded],
+                vector=vector
+            )
+        self._write_generation += 1
+        return total
+
+    def rebuild_passage_index(self):
+        """
+        Re-creates the passage collection and the lexical index from all stored versions (e.g. for versions stored before they existed).
+        """
+        name = self.passage_collection.name
+        self.client.delete_collection(name)
+        self.passage_collection = self.client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+        self.lexical_index.clear()
+
+        total = self._add_all_passages()
+        print(f"Rebuilt passage index for {total} versions.")
+
+    def rebuild_lexical_index(self):
+        """
+        Re-creates only the lexical (keyword) index from all stored versions; nothing is embedded.
+        """
+        self.lexical_index.clear()
+        total = self._add_all_passages(vector=False)
+        print(f"Rebuilt lexical index for {total} versions.")
+
+    def close(self):
+        """
+        Stops the ChromaDB client and releases its resources. The manager cannot be used afterwards.
+        """
+        if self.client is None:
+            return
+        self.version_index.close()
+        self.lexical_index.close()
+        try:
+            self.client.clear_system_cache()
+        except Exception as e:
+            print(f"Error closing ChromaDB client: {e}")
+        self.client = None
+        self.collection = None
+        print(f"ChromaDB client at '{self.path}' closed.")
 
     def add_chapter_version(self, chapter_id: str, content: str, version_type: str, metadata: dict = None):
         """
@@ -40,80 +298,298 @@ class ChromaManager:
             version_type (str): Type of version (e.g., "original", "spun", "reviewed", "human_edited").
             metadata (dict, optional): Additional metadata to store with the document.
         """
-        # Generate a unique ID for this specific version
-        version_id = f"{chapter_id}_{version_type}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-        
-        # Prepare metadata
-        if metadata is None:
-            metadata = {}
-        metadata.update({
+        return self.add_chapter_versions([{
             "chapter_id": chapter_id,
+            "content": content,
             "version_type": version_type,
-            "timestamp": datetime.now().isoformat()
-        })
+            "metadata": metadata
+        }])[0]
+
+    def add_chapter_versions(self, versions: list) -> list:
+        """
+        Adds several chapter versions at once: one embedding batch and one ChromaDB write per
+        max batch size, instead of one per version.
+
+        Storage is content-addressed: a version whose text is already stored (same content_hash) is
+        recorded as a reference to the existing document (see _add_reference_records), so identical text
+        (e.g. 'approved' or 'revision_requested' copies of a spun version) is never stored or embedded twice.
+        New text is stored as a diff against its parent where that is smaller (see _encode_delta);
+        its embedding is still computed from the full text.
 
+        Args:
+            versions (list): Dictionaries with 'chapter_id', 'content', 'version_type' and optionally 'metadata'.
+
+        Returns:
+            list: The new version IDs in input order; None for versions that failed to store.
+        """
+        # Sequence numbers order versions and make IDs unique, even across processes writing at the same instant.
         try:
-            self.collection.add(
-                documents=[content],
-                metadatas=[metadata],
-                ids=[version_id]
-            )
-            print(f"Added chapter version '{version_id}' ({version_type}) to ChromaDB.")
-            return version_id
+            seqs = self.version_index.reserve_sequences([version['chapter_id'] for version in versions])
         except Exception as e:
-            print(f"Error adding chapter version to ChromaDB: {e}")
-            return None
+            print(f"Error reserving version sequence numbers: {e}")
+            return [None] * len(versions)
+
+        ids, documents, metadatas, blob_ids = [], [], [], []
+        new_blobs = {} # content_hash -> index of the version that stores it
+        embeddings = {} # blob_id -> embedding, for versions referencing it
+        for version, seq in zip(versions, seqs):
+            now = datetime.now()
+            # Generate a unique ID for this specific version
+            version_id = f"{version['chapter_id']}_{version['version_type']}_{seq}"
+
+            # Prepare metadata
+            content_hash = hashlib.sha256(version['content'].encode("utf-8")).hexdigest()
+            metadata = dict(version.get("metadata") or {})
+            metadata.update({
+                "chapter_id": version['chapter_id'],
+                "version_type": version['version_type'],
+                "timestamp": now.isoformat(),
+                "seq": seq,
+                # Lets listings describe a version without loading its content
+                "content_length": len(version['content']),
+                "content_hash": content_hash
+            })
+
+            if content_hash in new_blobs:
+                blob_id = ids[new_blobs[content_hash]]
+            else:
+                blob_id = self.version_index.find_blob(content_hash)
+                if blob_id is not None and blob_id not in embeddings:
+                    embeddings.update(self._get_embeddings([blob_id]))
+                if blob_id not in embeddings: # New text, or the indexed document is gone
+                    blob_id = version_id
+                    new_blobs[content_hash] = len(ids)
+            ids.append(version_id)
+            documents.append(version['content'])
+            metadatas.append(metadata)
+            blob_ids.append(blob_id)
+
+        # Unique content goes to ChromaDB (embedded once) ...
+        stored = set()
+        blob_positions = sorted(new_blobs.values())
+        stored_documents = {i: self._encode_delta(documents[i], metadatas[i]) for i in blob_positions}
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(blob_positions), batch_size):
+            batch = blob_positions[start:start + batch_size]
+            batch_ids = [ids[i] for i in batch]
+            batch_documents = [documents[i] for i in batch]
+            batch_metadatas = [metadatas[i] for i in batch]
+            try:
+                batch_embeddings = self.embedding_function(batch_documents)
+                self.collection.add(
+                    embeddings=batch_embeddings,
+                    documents=[stored_documents[i] for i in batch],
+                    metadatas=batch_metadatas,
+                    ids=batch_ids
+                )
+            except Exception as e:
+                print(f"Error adding chapter version to ChromaDB: {e}")
+                continue
+            if len(batch) == 1:
+                print(f"Added chapter version '{batch_ids[0]}' ({batch_metadatas[0]['version_type']}) to ChromaDB.")
+            else:
+                print(f"Added {len(batch)} chapter versions to ChromaDB.")
+            stored.update(batch_ids)
+            embeddings.update(zip(batch_ids, batch_embeddings))
+            for blob_id, content in zip(batch_ids, batch_documents):
+                self.content_cache.set(blob_id, content)
+
+            try:
+                self._add_passages(batch_ids, batch_documents, batch_metadatas)
+            except Exception as e:
+                # Search falls back to whole documents; rebuild_passage_index() restores the passages.
+                print(f"Error adding passages to ChromaDB: {e}")
+
+        # ... versions with the same text as a stored document are recorded as references to it ...
+        recorded = self._add_reference_records(
+            [(ids[i], metadatas[i], blob_ids[i]) for i in range(len(ids)) if blob_ids[i] != ids[i]], embeddings
+        )
+        if recorded:
+            print(f"Recorded {len(recorded)} chapter version(s) referencing already stored content.")
+
+        written = stored | recorded
+        if written:
+            self._write_generation += 1 # Invalidates cached search results
+
+        # ... and every written version goes to the version index.
+        try:
+            self.version_index.add_many([(ids[i], metadatas[i], blob_ids[i]) for i in range(len(ids)) if ids[i] in written])
+        except Exception as e:
+            # Every written version has a record in the collection, so the index can be restored from it.
+            print(f"Error updating version index, rebuilding it: {e}")
+            try:
+                self.rebuild_version_index()
+            except Exception as e:
+                print(f"Error rebuilding version index: {e}")
+        if written:
+            with self._versions_added:
+                self._versions_added.notify_all()
+
+        return [version_id if version_id in written else None for version_id in ids]
+
+    def _find_delta_base(self, metadata: dict) -> tuple:
+        """
+        Picks the stored document a new version is diffed against: the version named in its
+        DELTA_PARENT_KEYS metadata, else the chapter's latest version of the same type.
+
+        Returns:
+            tuple: (blob_id, delta_depth) of the base, or None if the chapter has no such version.
+        """
+        parent_ids = [metadata[key] for key in DELTA_PARENT_KEYS if metadata.get(key)]
+        latest = self.version_index.latest(metadata["chapter_id"], metadata["version_type"])
+        if latest:
+            parent_ids.append(latest)
+        for parent_id in parent_ids:
+            indexed = self.version_index.get_many([parent_id]).get(parent_id)
+            if indexed is None:
+                continue
+            blob_id = indexed[1]
+            # Only the version that stores the document carries its delta_depth
+            blob_metadata = indexed[0] if blob_id == parent_id else self.version_index.get_many([blob_id]).get(blob_id, ({},))[0]
+            return blob_id, blob_metadata.get("delta_depth", 0)
+        return None
+
+    def _encode_delta(self, content: str, metadata: dict) -> str:
+        """
+        Returns the document to store for new content: a diff against its parent (see _find_delta_base)
+        if that is at most CHROMA_DELTA_MAX_RATIO of the text and the parent's diff chain is shorter
+        than CHROMA_DELTA_SNAPSHOT_INTERVAL, otherwise the full text.
+        Diffs are marked in metadata with storage "delta", delta_base and delta_depth.
+        """
+        if not CHROMA_DELTA_ENABLED or not content:
+            return content
+        try:
+            base = self._find_delta_base(metadata)
+            if base is None or base[1] + 1 >= CHROMA_DELTA_SNAPSHOT_INTERVAL:
+                return content
+            base_content = self._load_contents([base[0]]).get(base[0])
+            if base_content is None:
+                return content
+            delta = make_delta(base_content, content)
+        except Exception as e:
+            print(f"Error computing delta, storing full text: {e}")
+            return content
+        if len(delta) > CHROMA_DELTA_MAX_RATIO * len(content):
+            return content
+        metadata.update({"storage": "delta", "delta_base": base[0], "delta_depth": base[1] + 1})
+        return delta
+
+    def get_latest_version_id(self, chapter_id: str, version_type: str = None) -> str:
+        """
+        Returns the ID of the chapter's latest version (of the given type, if any) without loading its
+        content, or None. Version IDs are never reused, so the ID identifies the content as well.
+        """
+        return self.version_index.latest(chapter_id, version_type)
+
+    def get_version_metadata(self, version_id: str) -> dict:
+        """
+        Returns a version's metadata (as get_latest_chapter_version does) without loading its content, or None.
+        """
+        indexed = self.version_index.get_many([version_id]).get(version_id)
+        return indexed[0] if indexed else None
 
     def get_latest_chapter_version(self, chapter_id: str, version_type: str = None) -> dict:
         """
         Retrieves the latest version of a chapter based on its chapter_id and optionally version_type.
+        The version is looked up in the version index, so only the document holding its content is loaded.
 
         Args:
             chapter_id (str): The unique identifier for the chapter.
             version_type (str, optional): The specific type of version to retrieve (e.g., "spun").
-                                          If None, returns all versions for the chapter_id, ordered by timestamp.
+                                          If None, the latest version of any type is returned.
 
         Returns:
             dict: A dictionary containing the latest version's content, ID, and metadata,
                   or None if no matching version is found.
         """
-        query_where = {"chapter_id": chapter_id}
-        if version_type:
-            query_where = {
-                "$and": [
-                    {"chapter_id": chapter_id},
-                    {"version_type": version_type}
-                ]
-            }
-
         try:
-            results = self.collection.get(
-                where=query_where,
-                include=['documents', 'metadatas'] 
-            )
+            for _ in range(2):
+                version_id = self.version_index.latest(chapter_id, version_type)
+                if version_id is None:
+                    print(f"No versions found for chapter_id: {chapter_id}, version_type: {version_type}")
+                    return None
 
-            if not results['ids']:
-                print(f"No versions found for chapter_id: {chapter_id}, version_type: {version_type}")
-                return None
+                metadata, blob_id = self.version_index.get_many([version_id])[version_id]
+                contents = self._load_contents([blob_id])
+                if blob_id in contents:
+                    print(f"Retrieved latest version '{version_id}' for chapter_id: {chapter_id}, type: {version_type}")
+                    return {
+                        "id": version_id,
+                        "content": contents[blob_id],
+                        "metadata": metadata
+                    }
 
-            # Sort results by timestamp to get the latest
-            sorted_versions = sorted(
-                zip(results['ids'], results['documents'], results['metadatas']),
-                key=lambda x: datetime.fromisoformat(x[2]['timestamp']),
-                reverse=True
-            )
-            
-            latest_version_id, latest_content, latest_metadata = sorted_versions[0]
-            print(f"Retrieved latest version '{latest_version_id}' for chapter_id: {chapter_id}, type: {version_type}")
-            return {
-                "id": latest_version_id,
-                "content": latest_content,
-                "metadata": latest_metadata
-            }
+                # The index points at content that is no longer in the collection; resync and try once more.
+                print(f"Version index is stale ('{blob_id}' not found), rebuilding...")
+                self.rebuild_version_index()
+            return None
         except Exception as e:
             print(f"Error retrieving chapter version from ChromaDB: {e}")
             return None
 
+    def _load_contents(self, blob_ids: list) -> dict:
+        """
+        Returns {blob_id: content} for the given ChromaDB document IDs (missing ones are left out).
+        Documents stored as diffs are rebuilt from their base, fetching each level of the chains in one
+        read; rebuilt texts are kept in the content cache. Reference records resolve to the document they
+        point at.
+        """
+        unique_ids = list(dict.fromkeys(blob_ids))
+        contents = {}
+        deltas = {} # blob_id -> (base blob_id, delta); delta is None for references
+        pending = []
+        for blob_id in unique_ids:
+            content = self.content_cache.get(blob_id)
+            if content is not None:
+                contents[blob_id] = content
+            else:
+                pending.append(blob_id)
+
+        while pending:
+            results = self.collection.get(ids=pending, include=['documents', 'metadatas'])
+            next_pending = []
+            for blob_id, document, metadata in zip(results['ids'], results['documents'], results['metadatas']):
+                storage = (metadata or {}).get("storage")
+                if storage not in ("delta", "reference"):
+                    contents[blob_id] = document
+                    self.content_cache.set(blob_id, document)
+                    continue
+                if storage == "reference":
+                    base_id = metadata["blob_id"]
+                    deltas[blob_id] = (base_id, None)
+                else:
+                    base_id = metadata["delta_base"]
+                    deltas[blob_id] = (base_id, document)
+                if base_id in contents or base_id in deltas or base_id in pending:
+                    continue
+                base_content = self.content_cache.get(base_id)
+                if base_content is not None:
+                    contents[base_id] = base_content
+                else:
+                    next_pending.append(base_id)
+            pending = list(dict.fromkeys(next_pending))
+
+        loaded = {}
+        for blob_id in unique_ids:
+            chain = []
+            current = blob_id
+            while current not in contents and current in deltas:
+                chain.append(current)
+                current = deltas[current][0]
+            if current not in contents:
+                if chain:
+                    print(f"Error: Base '{current}' of version '{blob_id}' is missing; cannot rebuild its content.")
+                continue
+            for delta_id in reversed(chain):
+                base_id, delta = deltas[delta_id]
+                if delta is None:
+                    contents[delta_id] = contents[base_id]
+                    continue
+                contents[delta_id] = apply_delta(contents[base_id], delta)
+                self.content_cache.set(delta_id, contents[delta_id])
+            loaded[blob_id] = contents[blob_id]
+        return loaded
+
     def semantic_search(self, query_text: str, n_results: int = 5, filter_metadata: dict = None) -> list:
         """
         Performs a semantic search on the collection.
@@ -126,64 +602,295 @@ class ChromaManager:
         Returns:
             list: A list of dictionaries, each containing 'id', 'content', 'metadata', and 'distance'.
         """
-        try:
+        return self.semantic_search_many([query_text], n_results, filter_metadata)[0]
+
+    def semantic_search_many(self, query_texts: list, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Performs several semantic searches on the collection with one embedding batch and one query.
+        Results of repeated queries are served from the search cache until the next write.
+
+        Args:
+            query_texts (list): The text queries.
+            n_results (int): Number of top results to return per query.
+            filter_metadata (dict, optional): Metadata to filter the search results.
+
+        Returns:
+            list: One result list per query, in order (see semantic_search).
+        """
+        def run_query(pending: list) -> list:
             results = self.collection.query(
-                query_texts=[query_text],
+                query_texts=pending,
                 n_results=n_results,
-                where=filter_metadata,
+                where=filter_metadata or None,
                 include=['documents', 'metadatas', 'distances']
             )
-            
-            if not results['ids']:
-                print(f"No semantic search results for query: '{query_text}'")
-                return []
+            all_results = []
+            for q in range(len(pending)):
+                formatted_results = []
+                for i in range(len(results['ids'][q])):
+                    formatted_results.append({
+                        "id": results['ids'][q][i],
+                        "content": results['documents'][q][i],
+                        "metadata": results['metadatas'][q][i],
+                        "distance": results['distances'][q][i]
+                    })
+                all_results.append(formatted_results)
 
-            formatted_results = []
-            for i in range(len(results['ids'][0])):
-                formatted_results.append({
-                    "id": results['ids'][0][i],
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "distance": results['distances'][0][i]
-                })
-            print(f"Semantic search for '{query_text}' returned {len(formatted_results)} results.")
-            return formatted_results
+            # Documents stored as diffs, and references to other documents, are returned with their full text
+            delta_ids = [
+                r["id"] for results in all_results for r in results
+                if (r["metadata"] or {}).get("storage") in ("delta", "reference")
+            ]
+            if delta_ids:
+                contents = self._load_contents(delta_ids)
+                for results in all_results:
+                    for r in results:
+                        if r["id"] in contents:
+                            r["content"] = contents[r["id"]]
+            return all_results
+
+        return self._cached_search("document", query_texts, n_results, filter_metadata, run_query)
+
+    def search_passages(self, query_text: str, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Performs a semantic search on the passage collection and returns the best passage of each
+        matching version (at most n_results versions).
+
+        Args:
+            query_text (str): The text query for semantic search.
+            n_results (int): Number of versions to return.
+            filter_metadata (dict, optional): Metadata to filter the search results (chapter_id, version_type, ...).
+
+        Returns:
+            list: A list of dictionaries, each containing the version 'id', the passage 'content',
+                  its 'start'/'end' offsets in the version, 'metadata', and 'distance'.
+        """
+        return self.search_passages_many([query_text], n_results, filter_metadata)[0]
+
+    def search_passages_many(self, query_texts: list, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Batched variant of search_passages: one embedding batch and one query for all query_texts.
+
+        Returns:
+            list: One result list per query, in order (see search_passages).
+        """
+        def run_query(pending: list) -> list:
+            targets = self._filter_targets(filter_metadata)
+            if targets == {}:
+                return [[] for _ in pending]
+            # Several passages of one version can rank high, so fetch extra before deduplicating.
+            results = self.passage_collection.query(
+                query_texts=pending,
+                n_results=n_results * 4,
+                where={"version_id": {"$in": list(targets)}} if targets is not None else None,
+                include=['documents', 'metadatas', 'distances']
+            )
+            return [
+                self._best_per_version(
+                    [(passage, metadata, distance, None) for passage, metadata, distance
+                     in zip(results['documents'][q], results['metadatas'][q], results['distances'][q])],
+                    n_results, targets
+                )
+                for q in range(len(pending))
+            ]
+
+        return self._cached_search("passage", query_texts, n_results, filter_metadata, run_query)
+
+    def search_keyword(self, query_text: str, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Performs a keyword (BM25) search on the lexical index and returns the best passage of each
+        matching version, like search_passages, but without embedding the query.
+        "Quoted phrases" in query_text must match exactly.
+
+        Returns:
+            list: Results as in search_passages, with 'score' (BM25 relevance, higher is better) and 'distance' None.
+        """
+        return self.search_keyword_many([query_text], n_results, filter_metadata)[0]
+
+    def search_keyword_many(self, query_texts: list, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Batched variant of search_keyword.
+
+        Returns:
+            list: One result list per query, in order (see search_keyword).
+        """
+        def run_query(pending: list) -> list:
+            targets = self._filter_targets(filter_metadata)
+            version_ids = list(targets) if targets is not None else None
+            return [
+                self._best_per_version(
+                    [(passage['content'], passage['metadata'], None, passage['score'])
+                     for passage in self.lexical_index.search(query_text, n_results * 4, version_ids)],
+                    n_results, targets
+                )
+                for query_text in pending
+            ]
+
+        return self._cached_search("keyword", query_texts, n_results, filter_metadata, run_query)
+
+    def _filter_targets(self, filter_metadata: dict) -> dict:
+        """
+        Resolves a metadata filter against the version records, since passages exist once per stored
+        document and carry that document's metadata only. Any filter ChromaDB accepts works, and versions
+        referencing a document (e.g. 'approved' copies) are found through it.
+
+        Returns:
+            dict: {blob_id: [(version_id, metadata), ...] newest first} of the matching versions,
+                  or None if there is no filter.
+        """
+        if not filter_metadata:
+            return None
+        results = self.collection.get(where=filter_metadata, include=['metadatas'])
+        targets = {}
+        for version_id, metadata in zip(results['ids'], results['metadatas']):
+            metadata = metadata or {}
+            blob_id = metadata.get("blob_id") if metadata.get("storage") == "reference" else version_id
+            targets.setdefault(blob_id, []).append((version_id, metadata))
+        for versions in targets.values():
+            versions.sort(key=lambda version: version[1].get("seq", 0), reverse=True)
+        return targets
+
+    @staticmethod
+    def _best_per_version(passages: list, n_results: int, targets: dict = None) -> list:
+        """
+        Keeps the best passage of each version from (passage, metadata, distance, score) tuples ordered
+        best first, up to n_results versions. With targets (see _filter_targets), a document's passages
+        are reported for the matching versions recorded with it.
+        """
+        best_per_version = {}
+        for passage, metadata, distance, score in passages:
+            if targets is None:
+                versions = [(metadata['version_id'], None)]
+            else:
+                versions = targets.get(metadata['version_id'], [])
+            for version_id, version_metadata in versions:
+                if version_id in best_per_version:
+                    continue
+                result = {
+                    "id": version_id,
+                    "content": passage,
+                    "start": metadata['start'],
+                    "end": metadata['end'],
+                    "metadata": metadata if version_metadata is None else dict(
+                        metadata,
+                        version_id=version_id,
+                        version_type=version_metadata.get("version_type"),
+                        timestamp=version_metadata.get("timestamp")
+                    ),
+                    "distance": distance
+                }
+                if score is not None:
+                    result["score"] = score
+                best_per_version[version_id] = result
+                if len(best_per_version) == n_results:
+                    return list(best_per_version.values())
+        return list(best_per_version.values())
+
+    def search_hybrid(self, query_text: str, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Combines passage (vector) search and keyword search: see search_hybrid_many.
+        """
+        return self.search_hybrid_many([query_text], n_results, filter_metadata)[0]
+
+    def search_hybrid_many(self, query_texts: list, n_results: int = 5, filter_metadata: dict = None) -> list:
+        """
+        Runs vector and keyword passage searches for all queries and fuses the two rankings per version
+        with reciprocal rank fusion (score = sum of 1 / (CHROMA_HYBRID_RRF_K + rank)), so versions found
+        by both rank first. The keyword passage is shown when there is one, since it contains the query terms.
+
+        Returns:
+            list: One result list per query, in order (see search_passages), with the fused 'score';
+                  'distance' is None for versions only found by keyword.
+        """
+        depth = n_results * 2
+        vector_results = self.search_passages_many(query_texts, depth, filter_metadata)
+        keyword_results = self.search_keyword_many(query_texts, depth, filter_metadata)
+
+        all_results = []
+        for vector, keyword in zip(vector_results, keyword_results):
+            fused = {}
+            for rank, result in enumerate(keyword, start=1):
+                fused[result['id']] = dict(result, score=1.0 / (CHROMA_HYBRID_RRF_K + rank))
+            for rank, result in enumerate(vector, start=1):
+                entry = fused.setdefault(result['id'], dict(result, score=0.0))
+                entry['score'] += 1.0 / (CHROMA_HYBRID_RRF_K + rank)
+                entry['distance'] = result['distance']
+            all_results.append(sorted(fused.values(), key=lambda r: r['score'], reverse=True)[:n_results])
+        return all_results
+
+    def _cached_search(self, kind: str, query_texts: list, n_results: int, filter_metadata: dict, run_query) -> list:
+        """
+        Answers what it can from the search cache and sends the remaining (distinct) queries to
+        run_query in one batch. Failed queries yield empty result lists and are not cached.
+
+        Raises:
+            ValueError: If filter_metadata is not a valid ChromaDB where filter.
+        """
+        generation = self._search_generation()
+        keys = [self.search_cache.make_key(kind, query_text, filter_metadata, n_results) for query_text in query_texts]
+        all_results = [self.search_cache.get(key, generation) for key in keys]
+        cached_count = len([results for results in all_results if results is not None])
+
+        pending = list(dict.fromkeys(query_texts[i] for i, results in enumerate(all_results) if results is None))
+        if pending:
+            self._check_filter(filter_metadata) # Cached results were produced with a valid filter
+            try:
+                fresh = dict(zip(pending, run_query(pending)))
+            except Exception as e:
+                print(f"Error during {kind} search: {e}")
+                fresh = {}
+            for i, results in enumerate(all_results):
+                if results is None and query_texts[i] in fresh:
+                    all_results[i] = fresh[query_texts[i]]
+            for query_text, results in fresh.items():
+                self.search_cache.set(self.search_cache.make_key(kind, query_text, filter_metadata, n_results), results, generation)
+
+        print(f"{kind.capitalize()} search for {len(query_texts)} queries ({cached_count} cached) done.")
+        return [results if results is not None else [] for results in all_results]
+
+    def _check_filter(self, filter_metadata: dict):
+        # Every search mode filters through ChromaDB, so a filter it rejects is reported instead of
+        # surfacing as a search without hits.
+        if not filter_metadata:
+            return
+        if not isinstance(filter_metadata, dict):
+            raise ValueError("Invalid filter_metadata: expected an object.")
+        key = json.dumps(filter_metadata, sort_keys=True)
+        if key in self._valid_filters:
+            return
+        try:
+            self.collection.get(where=filter_metadata, limit=1, include=[])
         except Exception as e:
-            print(f"Error during semantic search: {e}")
-            return []
+            raise ValueError(f"Invalid filter_metadata {filter_metadata}: {e}") from e
+        if len(self._valid_filters) >= CHROMA_SEARCH_CACHE_SIZE:
+            self._valid_filters.clear()
+        self._valid_filters.add(key)
 
-    def get_all_chapter_versions(self, chapter_id: str) -> list:
+    def get_all_chapter_versions(self, chapter_id: str, include_content: bool = True) -> list:
         """
-        Retrieves all versions for a given chapter_id, ordered by timestamp.
+        Retrieves all versions for a given chapter_id, newest first (by sequence number).
 
         Args:
             chapter_id (str): The unique identifier for the chapter.
+            include_content (bool): Load the document text too. Pass False when only metadata is needed.
 
         Returns:
-            list: A list of dictionaries, each containing version 'id', 'content', and 'metadata'.
+            list: A list of dictionaries, each containing version 'id', 'content', and 'metadata'
+                  ('content' is None if include_content is False).
         """
         try:
-            results = self.collection.get(
-                where={"chapter_id": chapter_id},
-                include=['documents', 'metadatas'] 
-            )
+            versions = self.version_index.list_chapter(chapter_id) # Latest first
 
-            if not results['ids']:
+            if not versions:
                 print(f"No versions found for chapter_id: {chapter_id}")
                 return []
 
-            # Sort results by timestamp
-            sorted_versions = sorted(
-                zip(results['ids'], results['documents'], results['metadatas']),
-                key=lambda x: datetime.fromisoformat(x[2]['timestamp']),
-                reverse=True # Latest first
-            )
-            
+            contents = self._load_contents([blob_id for _, _, blob_id in versions]) if include_content else {}
             formatted_results = []
-            for version_id, content, metadata in sorted_versions:
+            for version_id, metadata, blob_id in versions:
                 formatted_results.append({
                     "id": version_id,
-                    "content": content,
+                    "content": contents.get(blob_id),
                     "metadata": metadata
                 })
             print(f"Retrieved {len(formatted_results)} versions for chapter_id: {chapter_id}")
@@ -192,9 +899,248 @@ class ChromaManager:
             print(f"Error retrieving all chapter versions from ChromaDB: {e}")
             return []
 
+    def list_chapter_versions(self, chapter_id: str, version_type: str = None, limit: int = 50, cursor: str = None,
+                              include_content: bool = False) -> dict:
+        """
+        Lists a chapter's versions newest first, one page at a time. By default only metadata is loaded;
+        content_length and content_hash come from the metadata stored at write time.
+
+        Args:
+            chapter_id (str): The unique identifier for the chapter.
+            version_type (str, optional): Only list versions of this type.
+            limit (int): Maximum number of versions per page.
+            cursor (str, optional): The 'next_cursor' of the previous page.
+            include_content (bool): Also load the document text of the versions on this page.
+
+        Returns:
+            dict: 'versions' (list of dictionaries with 'id', 'metadata' and, if requested, 'content')
+                  and 'next_cursor' (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        before_seq = None
+        if cursor:
+            if not cursor.isdigit():
+                raise ValueError(f"Invalid cursor '{cursor}'.")
+            before_seq = int(cursor)
+
+        page = self.version_index.list_page(chapter_id, version_type, limit + 1, before_seq)
+        has_more = len(page) > limit
+        page = page[:limit]
+        if not page:
+            return {"versions": [], "next_cursor": None}
+
+        versions = self._describe_versions([version_id for version_id, _ in page], include_content)
+        # The cursor is the seq of the last version on the page
+        next_cursor = str(page[-1][1]) if has_more else None
+        return {"versions": versions, "next_cursor": next_cursor}
+
+    def get_chapter_versions_since(self, chapter_id: str, after_seq: int = 0, limit: int = 100, include_content: bool = False) -> dict:
+        """
+        Returns the chapter's versions with a sequence number above after_seq, oldest first, so a
+        client that remembers the last seq it saw only fetches what is new.
+
+        Args:
+            chapter_id (str): The unique identifier for the chapter.
+            after_seq (int): The highest seq the caller already has (0 for everything).
+            limit (int): Maximum number of versions to return.
+            include_content (bool): Also load the document text of the versions.
+
+        Returns:
+            dict: 'versions' (as in list_chapter_versions) and 'last_seq', the seq to pass next time
+                  (after_seq if nothing is new).
+        """
+        rows = self.version_index.list_since(chapter_id, after_seq, limit)
+        versions = self._describe_versions([version_id for version_id, _ in rows], include_content)
+        return {"versions": versions, "last_seq": rows[-1][1] if rows else after_seq}
+
+    def wait_for_chapter_versions(self, chapter_id: str, after_seq: int, timeout: float) -> dict:
+        """
+        Like get_chapter_versions_since (without content), but when nothing is new it blocks until this
+        process adds a version or timeout seconds pass. Versions added by other processes are picked up
+        when the timeout ends.
+
+        Returns:
+            dict: 'versions' and 'last_seq', as get_chapter_versions_since returns them.
+        """
+        with self._versions_added:
+            result = self.get_chapter_versions_since(chapter_id, after_seq)
+            if result["versions"]:
+                return result
+            self._versions_added.wait(timeout)
+        return self.get_chapter_versions_since(chapter_id, after_seq)
+
+    def _describe_versions(self, page_ids: list, include_content: bool) -> list:
+        """
+        Returns {'id', 'metadata'[, 'content']} for the given versions, in order, from the version index.
+        """
+        indexed = self.version_index.get_many(page_ids)
+        contents = self._load_contents([blob_id for _, blob_id in indexed.values()]) if include_content else {}
+
+        # Versions written before content_length was recorded: load just their content to fill it in.
+        missing_length = [blob_id for metadata, blob_id in indexed.values() if "content_length" not in metadata]
+        if missing_length and not include_content:
+            contents = self._load_contents(missing_length)
+
+        versions = []
+        for version_id in page_ids:
+            if version_id not in indexed:
+                continue # Deleted since the page was read
+            metadata, blob_id = indexed[version_id]
+            content = contents.get(blob_id)
+            if content is not None:
+                metadata.setdefault("content_length", len(content))
+            entry = {"id": version_id, "metadata": metadata}
+            if include_content:
+                entry["content"] = content
+            versions.append(entry)
+        return versions
+
+    def delete_versions(self, version_ids: list) -> dict:
+        """
+        Deletes versions (their records in the collection and the version index) and removes documents
+        no remaining version uses, together with their passages. A version whose document is still used by a remaining version
+        (e.g. the spun version an approval copies) is kept. Remaining documents stored as a diff against
+        a removed document are rewritten as full text first (their embeddings are reused).
+
+        Returns:
+            dict: Counts of deleted 'versions' and 'documents', 'kept' versions and 'materialized' diffs.
+        """
+        indexed = self.version_index.get_many(version_ids)
+        doomed = set(indexed)
+        blob_ids = {blob_id for _, blob_id in indexed.values()}
+        references = self.version_index.referencing(list(blob_ids))
+        delete_blobs, kept = [], []
+        for blob_id in blob_ids:
+            if all(version_id in doomed for version_id in references.get(blob_id, [])):
+                delete_blobs.append(blob_id)
+            elif blob_id in doomed:
+                # Still holds the content of a remaining version
+                doomed.discard(blob_id)
+                kept.append(blob_id)
+
+        dependents = [blob_id for blob_id in self.version_index.delta_dependents(delete_blobs) if blob_id not in delete_blobs]
+        if dependents:
+            contents = self._load_contents(dependents)
+            stored = self.collection.get(ids=dependents, include=['embeddings', 'metadatas'])
+            metadatas = [dict(metadata, storage="full", delta_base="", delta_depth=0) for metadata in stored['metadatas']]
+            self.collection.update(
+                ids=stored['ids'],
+                embeddings=stored['embeddings'],
+                documents=[contents[blob_id] for blob_id in stored['ids']],
+                metadatas=metadatas
+            )
+            indexed_dependents = self.version_index.get_many(stored['ids'])
+            self.version_index.update_metadata_many([
+                (blob_id, dict(indexed_dependents[blob_id][0], storage="full", delta_base="", delta_depth=0)) for blob_id in stored['ids']
+            ])
+
+        batch_size = self.client.get_max_batch_size()
+        doomed_ids = list(doomed)
+        for start in range(0, len(doomed_ids), batch_size):
+            self.collection.delete(ids=doomed_ids[start:start + batch_size])
+        for start in range(0, len(delete_blobs), batch_size):
+            batch = delete_blobs[start:start + batch_size]
+            self.passage_collection.delete(where={"version_id": {"$in": batch}})
+        self.lexical_index.delete_versions(delete_blobs)
+        self.version_index.delete_many(doomed_ids)
+        self.content_cache.discard(doomed_ids)
+        self._write_generation += 1
+
+        print(f"Deleted {len(doomed)} versions ({len(delete_blobs)} documents); kept {len(kept)} still referenced, "
+              f"rewrote {len(dependents)} diffs as full text.")
+        return {"versions": len(doomed), "documents": len(delete_blobs), "kept": len(kept), "materialized": len(dependents)}
+
+    def rebuild_vector_indexes(self):
+        """
+        Copies both collections into fresh ones (reusing the stored embeddings) and swaps them in, so
+        their HNSW indexes no longer carry deleted entries. Run it while nothing else writes to the database.
+        """
+        self.collection = self._rebuild_collection(self.collection)
+        self.passage_collection = self._rebuild_collection(self.passage_collection)
+        self._write_generation += 1
+
+    def _recover_collection(self, name: str):
+        """
+        Cleans up after an interrupted _rebuild_collection. If the temporary copy exists while the
+        collection itself is missing or empty, the swap was cut short and the copy is renamed back;
+        otherwise the copy is incomplete and is dropped.
+
+        Returns:
+            The restored collection, or None if nothing was restored.
+        """
+        temp_name = f"{name}_rebuild"
+        try:
+            rebuilt = self.client.get_collection(name=temp_name, embedding_function=self.embedding_function)
+        except Exception:
+            return None # No rebuild was interrupted
+        try:
+            collection = self.client.get_collection(name=name, embedding_function=self.embedding_function)
+        except Exception:
+            collection = None
+
+        if rebuilt.count() > 0 and (collection is None or collection.count() == 0):
+            if collection is not None:
+                self.client.delete_collection(name)
+            rebuilt.modify(name=name)
+            print(f"Restored '{name}' from an interrupted rebuild ({rebuilt.count()} entries).")
+            return rebuilt
+        self.client.delete_collection(temp_name)
+        print(f"Removed the incomplete copy '{temp_name}' of an interrupted rebuild.")
+        return None
+
+    def _rebuild_collection(self, collection):
+        name = collection.name
+        temp_name = f"{name}_rebuild"
+        collection = self._recover_collection(name) or collection
+        rebuilt = self.client.get_or_create_collection(name=temp_name, embedding_function=self.embedding_function, metadata=collection.metadata)
+
+        total = collection.count()
+        batch_size = self.client.get_max_batch_size()
+        for offset in range(0, total, batch_size):
+            results = collection.get(include=['embeddings', 'documents', 'metadatas'], limit=batch_size, offset=offset)
+            rebuilt.add(ids=results['ids'], embeddings=results['embeddings'], documents=results['documents'], metadatas=results['metadatas'])
+        if rebuilt.count() != total:
+            self.client.delete_collection(temp_name)
+            raise RuntimeError(f"Rebuilding '{name}' copied {rebuilt.count()} of {total} entries; the original was kept.")
+
+        self.client.delete_collection(name)
+        rebuilt.modify(name=name)
+        print(f"Rebuilt vector index of '{name}' ({total} entries).")
+        return rebuilt
+
+
+_chroma_manager = None
+_chroma_manager_lock = threading.Lock()
+
+def get_chroma_manager() -> ChromaManager:
+    """
+    Returns the process-wide ChromaManager, creating it on first use.
+    """
+    global _chroma_manager
+    if _chroma_manager is None:
+        with _chroma_manager_lock:
+            if _chroma_manager is None:
+                _chroma_manager = ChromaManager()
+    return _chroma_manager
+
+def close_chroma_manager():
+    """
+    Closes the process-wide ChromaManager, if one was created. The next get_chroma_manager() call opens a new one.
+    """
+    global _chroma_manager
+    with _chroma_manager_lock:
+        manager = _chroma_manager
+        _chroma_manager = None
+    if manager is not None:
+        manager.close()
+
+atexit.register(close_chroma_manager)
+
 # Example usage (for testing purposes)
 if __name__ == "__main__":
-    manager = ChromaManager()
+    manager = get_chroma_manager()
     chapter_id = "test_book_chapter_1"
 
     # Add an original version
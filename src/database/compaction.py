@@ -0,0 +1,146 @@
+# src/database/compaction.py
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import COMPACTION_KEEP_LAST, COMPACTION_KEEP_DAYS, COMPACTION_POLICIES
+from database.chroma_manager import ChromaManager, DELTA_PARENT_KEYS, get_chroma_manager, close_chroma_manager
+
+# Version types that are never deleted
+PROTECTED_VERSION_TYPES = ("approved",)
+
+
+def get_policy(chapter_id: str, keep_last: int = COMPACTION_KEEP_LAST, keep_days: int = COMPACTION_KEEP_DAYS) -> dict:
+    """
+    Returns the retention policy of a chapter: the defaults, overridden by its COMPACTION_POLICIES entry.
+    """
+    policy = {"keep_last": keep_last, "keep_days": keep_days}
+    policy.update(COMPACTION_POLICIES.get(chapter_id, {}))
+    return policy
+
+def select_versions_to_delete(versions: list, policy: dict, now: datetime = None) -> list:
+    """
+    Applies a retention policy to one chapter's versions.
+
+    Kept are: every approved version, the newest policy['keep_last'] versions of each type (at least
+    the newest one), versions younger than policy['keep_days'] days, and the versions a kept version
+    was made from (approved_spun_version_id / revised_spun_version_id).
+
+    Args:
+        versions (list): (version_id, metadata, blob_id) tuples, newest first (as VersionIndex.list_chapter returns them).
+        policy (dict): 'keep_last' and 'keep_days'.
+
+    Returns:
+        list: IDs of the versions that can be deleted.
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=policy["keep_days"]) if policy["keep_days"] > 0 else None
+    by_id = {version_id: metadata for version_id, metadata, _ in versions}
+
+    keep = set()
+    seen_per_type = {}
+    for version_id, metadata, _ in versions:
+        version_type = metadata.get("version_type")
+        seen = seen_per_type.get(version_type, 0)
+        seen_per_type[version_type] = seen + 1
+        if version_type in PROTECTED_VERSION_TYPES or seen < max(1, policy["keep_last"]):
+            keep.add(version_id)
+        elif cutoff is not None and datetime.fromisoformat(metadata["timestamp"]) >= cutoff:
+            keep.add(version_id)
+
+    # Lineage: keep what kept versions were derived from
+    pending = list(keep)
+    while pending:
+        metadata = by_id[pending.pop()]
+        for key in DELTA_PARENT_KEYS:
+            parent_id = metadata.get(key)
+            if parent_id in by_id and parent_id not in keep:
+                keep.add(parent_id)
+                pending.append(parent_id)
+
+    return [version_id for version_id, _, _ in versions if version_id not in keep]
+
+def compact(chroma_manager: ChromaManager = None, chapter_ids: list = None, keep_last: int = COMPACTION_KEEP_LAST,
+            keep_days: int = COMPACTION_KEEP_DAYS, dry_run: bool = False) -> list:
+    """
+    Applies the retention policies to the given chapters (default: all) and deletes what they do not keep.
+
+    Returns:
+        list: One dictionary per chapter with its 'policy', 'versions', 'to_delete' and (unless dry_run) 'deleted' counts.
+    """
+    chroma_manager = chroma_manager or get_chroma_manager()
+    report = []
+    for chapter_id in chapter_ids or chroma_manager.version_index.chapter_ids():
+        policy = get_policy(chapter_id, keep_last, keep_days)
+        versions = chroma_manager.version_index.list_chapter(chapter_id)
+        to_delete = select_versions_to_delete(versions, policy)
+        entry = {"chapter_id": chapter_id, "policy": policy, "versions": len(versions), "to_delete": len(to_delete)}
+        print(f"Compaction: '{chapter_id}' has {len(versions)} versions, {len(to_delete)} beyond its retention policy {policy}.")
+        if to_delete and not dry_run:
+            entry["deleted"] = chroma_manager.delete_versions(to_delete)
+        report.append(entry)
+    return report
+
+def vacuum_sqlite(path: str):
+    """
+    Rewrites an SQLite file to release the space of deleted rows. Nothing may have it open in a transaction.
+    """
+    if not os.path.exists(path):
+        return
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune old chapter versions and compact the ChromaDB storage.")
+    parser.add_argument("--chapter", action="append", help="Only compact this chapter (repeatable). Default: all chapters.")
+    parser.add_argument("--keep-last", type=int, default=COMPACTION_KEEP_LAST, help="Newest versions of each type to keep per chapter.")
+    parser.add_argument("--keep-days", type=int, default=COMPACTION_KEEP_DAYS, help="Keep versions younger than this many days (0 = ignore age).")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+    parser.add_argument("--rebuild-index", action="store_true", help="Rebuild the HNSW vector indexes without the deleted entries.")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite files afterwards (stop the backend first).")
+    parser.add_argument("--report", help="Write the per-chapter report as JSON to this path.")
+    args = parser.parse_args()
+
+    chroma_manager = get_chroma_manager()
+    path = chroma_manager.path
+    size_before = directory_size(path)
+
+    report = compact(chroma_manager, args.chapter, args.keep_last, args.keep_days, dry_run=args.dry_run)
+    if not args.dry_run:
+        if args.rebuild_index:
+            chroma_manager.rebuild_vector_indexes()
+        chroma_manager.lexical_index.optimize()
+        sqlite_files = [os.path.join(path, "chroma.sqlite3"), chroma_manager.version_index.path, chroma_manager.lexical_index.path]
+        close_chroma_manager()
+        if args.vacuum:
+            for sqlite_file in sqlite_files:
+                vacuum_sqlite(sqlite_file)
+                print(f"Compaction: Vacuumed {sqlite_file}")
+
+    size_after = directory_size(path)
+    print(f"Compaction: {sum(entry.get('deleted', {}).get('versions', 0) for entry in report)} versions deleted; "
+          f"storage {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB.")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Compaction: Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# src/database/delta_store.py
+import json
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+# Words with their trailing whitespace; joining the tokens gives back the exact text.
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def make_delta(base: str, content: str) -> str:
+    """
+    Encodes content as edits against base, word by word, so a revision that rewords a few sentences
+    only stores the changed words.
+
+    Returns:
+        str: A JSON list whose items are either [start, end] (copy these tokens of base) or a string (insert this text).
+    """
+    base_tokens = TOKEN_PATTERN.findall(base)
+    tokens = TOKEN_PATTERN.findall(content)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_tokens, tokens, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag != "delete":
+            ops.append("".join(tokens[j1:j2]))
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def apply_delta(base: str, delta: str) -> str:
+    """
+    Rebuilds the text encoded by make_delta from its base.
+    """
+    base_tokens = TOKEN_PATTERN.findall(base)
+    return "".join(
+        "".join(base_tokens[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(delta)
+    )
+
+
+class ContentCache:
+    """
+    In-memory LRU cache of full version texts keyed by ChromaDB document ID. Stored content never
+    changes, so entries only leave the cache when it is full or the document is deleted.
+    """
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, blob_id: str) -> str:
+        with self._lock:
+            content = self._entries.get(blob_id)
+            if content is not None:
+                self._entries.move_to_end(blob_id)
+            return content
+
+    def set(self, blob_id: str, content: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[blob_id] = content
+            self._entries.move_to_end(blob_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, blob_ids: list):
+        with self._lock:
+            for blob_id in blob_ids:
+                self._entries.pop(blob_id, None)
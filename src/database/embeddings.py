@@ -0,0 +1,139 @@
+# src/database/embeddings.py
+import hashlib
+import math
+import os
+import re
+import sys
+import threading
+import time
+from functools import cached_property
+
+from chromadb import EmbeddingFunction
+
+# Add the parent directory to the Python path to allow imports from src/config
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import EMBEDDING_BACKEND, EMBEDDING_BATCH_SIZE, EMBEDDING_THREADS, EMBEDDING_HASH_DIM
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashedBagOfWordsEmbedding(EmbeddingFunction):
+    """
+    Dependency-free embedding: word counts hashed into a fixed number of signed buckets, L2-normalised.
+    Fast and deterministic, so it suits tests and benchmarks, but it only captures word overlap, not meaning.
+    """
+    def __init__(self, dim: int = EMBEDDING_HASH_DIM):
+        self.dim = dim
+
+    def __call__(self, input: list) -> list:
+        embeddings = []
+        for text in input:
+            vector = [0.0] * self.dim
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                digest = hashlib.md5(token.encode("utf-8")).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            embeddings.append([v / norm for v in vector])
+        return embeddings
+
+
+def _onnx_minilm(threads: int):
+    """
+    Chroma's ONNX all-MiniLM-L6-v2 with a fixed number of intra-op threads (0 keeps onnxruntime's default).
+    """
+    from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+    class ThreadedONNXMiniLM(ONNXMiniLM_L6_V2):
+        @cached_property
+        def model(self):
+            if not threads:
+                return super().model
+            self._download_model_if_not_exists()
+            so = self.ort.SessionOptions()
+            so.log_severity_level = 3
+            so.intra_op_num_threads = threads
+            so.inter_op_num_threads = 1
+            so.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            return self.ort.InferenceSession(
+                os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                providers=self._preferred_providers or ["CPUExecutionProvider"],
+                sess_options=so
+            )
+
+    return ThreadedONNXMiniLM()
+
+
+class BatchedEmbeddingFunction(EmbeddingFunction):
+    """
+    Wraps an embedding function: splits input into batches of batch_size and records how many
+    texts were embedded and how long it took, so throughput can be reported.
+    """
+    def __init__(self, inner, backend: str, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.inner = inner
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self._stats = {"calls": 0, "texts": 0, "chars": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def __call__(self, input: list) -> list:
+        started = time.perf_counter()
+        embeddings = []
+        for start in range(0, len(input), self.batch_size):
+            embeddings.extend(self.inner(input[start:start + self.batch_size]))
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            self._stats["texts"] += len(input)
+            self._stats["chars"] += sum(len(text) for text in input)
+            self._stats["seconds"] += elapsed
+        return embeddings
+
+    def warm_up(self) -> float:
+        """
+        Embeds a short text so the model is loaded before the first real request.
+
+        Returns:
+            float: Seconds the warm-up took (including model loading).
+        """
+        started = time.perf_counter()
+        self.inner(["Warm-up passage for the embedding model."])
+        elapsed = time.perf_counter() - started
+        print(f"Embeddings: '{self.backend}' backend warmed up in {elapsed:.2f}s.")
+        return elapsed
+
+    def get_stats(self) -> dict:
+        """
+        Returns the embedding counters since start, with texts/s and chars/s throughput.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["backend"] = self.backend
+        stats["batch_size"] = self.batch_size
+        stats["texts_per_s"] = round(stats["texts"] / stats["seconds"], 2) if stats["seconds"] else None
+        stats["chars_per_s"] = round(stats["chars"] / stats["seconds"], 1) if stats["seconds"] else None
+        stats["seconds"] = round(stats["seconds"], 3)
+        return stats
+
+
+def create_embedding_function(backend: str = EMBEDDING_BACKEND) -> BatchedEmbeddingFunction:
+    """
+    Builds the embedding function selected by EMBEDDING_BACKEND:
+    "default" (Chroma's built-in model), "onnx_minilm" (same model, EMBEDDING_THREADS threads)
+    or "hashed_bow" (HashedBagOfWordsEmbedding).
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    if backend == "default":
+        from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+        inner = DefaultEmbeddingFunction()
+    elif backend == "onnx_minilm":
+        inner = _onnx_minilm(EMBEDDING_THREADS)
+    elif backend == "hashed_bow":
+        inner = HashedBagOfWordsEmbedding()
+    else:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Use 'default', 'onnx_minilm' or 'hashed_bow'.")
+    return BatchedEmbeddingFunction(inner, backend)
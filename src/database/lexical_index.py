@@ -0,0 +1,107 @@
+# src/database/lexical_index.py
+import json
+import os
+import re
+import sqlite3
+import threading
+
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+TERM_PATTERN = re.compile(r"\w+")
+
+
+def build_match_query(query_text: str) -> str:
+    """
+    Turns free text into an FTS5 MATCH expression: "quoted phrases" stay phrases, every other word
+    becomes a term, and any of them may match (BM25 ranks passages matching more of them higher).
+
+    Returns:
+        str: The expression, or an empty string if the text has no searchable words.
+    """
+    parts = []
+    for phrase in PHRASE_PATTERN.findall(query_text):
+        terms = TERM_PATTERN.findall(phrase)
+        if terms:
+            parts.append('"' + " ".join(terms) + '"')
+    for term in TERM_PATTERN.findall(PHRASE_PATTERN.sub(" ", query_text)):
+        parts.append(f'"{term}"')
+    return " OR ".join(dict.fromkeys(parts))
+
+
+class LexicalIndex:
+    """
+    SQLite FTS5 index of the same passages as the passage collection, for keyword (BM25) search.
+    Exact names and phrases are found without embedding the query.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5("
+                " text, passage_id UNINDEXED, version_id UNINDEXED, metadata UNINDEXED, tokenize = 'unicode61')"
+            )
+
+    def add_many(self, passages: list):
+        """
+        Indexes (passage_id, text, metadata) tuples in one transaction. metadata must contain version_id.
+        """
+        rows = [(text, passage_id, metadata["version_id"], json.dumps(metadata)) for passage_id, text, metadata in passages]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO passages (text, passage_id, version_id, metadata) VALUES (?, ?, ?, ?)", rows)
+
+    def search(self, query_text: str, limit: int = 20, version_ids: list = None) -> list:
+        """
+        Returns the best matching passages, best first, optionally only those of the given versions
+        (ChromaManager resolves metadata filters to version IDs).
+
+        Returns:
+            list: Dictionaries with 'passage_id', 'content', 'metadata' and 'score' (BM25 relevance, higher is better).
+        """
+        match_query = build_match_query(query_text)
+        if not match_query or version_ids is not None and not version_ids:
+            return []
+        sql = "SELECT passage_id, text, metadata, bm25(passages) FROM passages WHERE passages MATCH ?"
+        params = [match_query]
+        if version_ids is not None:
+            sql += f" AND version_id IN ({', '.join('?' for _ in version_ids)})"
+            params.extend(version_ids)
+        sql += " ORDER BY bm25(passages) LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, [*params, limit]).fetchall()
+        return [
+            {"passage_id": passage_id, "content": text, "metadata": json.loads(metadata), "score": -rank}
+            for passage_id, text, metadata, rank in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+
+    def count_versions(self) -> int:
+        """
+        Returns the number of versions with indexed passages.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT version_id) FROM passages").fetchone()[0]
+
+    def delete_versions(self, version_ids: list):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM passages WHERE version_id = ?", [(version_id,) for version_id in version_ids])
+
+    def optimize(self):
+        """
+        Merges the FTS5 index segments (worth doing after many deletes).
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO passages (passages) VALUES ('optimize')")
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM passages")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,54 @@
+# src/database/search_cache.py
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+
+class SearchResultCache:
+    """
+    In-memory LRU cache of semantic search results keyed on (kind, query, filter, n_results).
+
+    Every entry belongs to a generation of the collection. When the caller reports a new generation
+    (because something was written), all cached results are dropped.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, query_text: str, filter_metadata: dict, n_results: int) -> str:
+        return json.dumps([kind, query_text, filter_metadata or {}, n_results], sort_keys=True, ensure_ascii=False)
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: str, generation):
+        """
+        Returns a copy of the cached results for the key, or None.
+        """
+        with self._lock:
+            self._check_generation(generation)
+            results = self._entries.get(key)
+            if results is None:
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(results)
+
+    def set(self, key: str, results: list, generation):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = copy.deepcopy(results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,87 @@
+# src/database/test_chroma_manager.py
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import CHROMA_HYBRID_RRF_K
+from database.chroma_manager import ChromaManager
+
+
+def result(version_id: str, distance: float = None) -> dict:
+    return {"id": version_id, "content": f"passage of {version_id}", "metadata": {"version_id": version_id}, "distance": distance}
+
+@pytest.fixture
+def manager(tmp_path):
+    return ChromaManager(path=str(tmp_path / "chroma_db"))
+
+def test_hybrid_search_fuses_rankings_with_rrf(manager, monkeypatch):
+    monkeypatch.setattr(manager, "search_passages_many", lambda queries, n, f: [[result("a", 0.1), result("b", 0.2), result("c", 0.3)]])
+    monkeypatch.setattr(manager, "search_keyword_many", lambda queries, n, f: [[result("c"), result("d"), result("b")]])
+
+    fused = manager.search_hybrid_many(["storm"], n_results=3)[0]
+
+    # b (ranks 2 and 3) and c (ranks 3 and 1) were found by both searches and beat a (vector rank 1 only)
+    assert [r["id"] for r in fused] == ["c", "b", "a"]
+    assert fused[0]["score"] == pytest.approx(1 / (CHROMA_HYBRID_RRF_K + 1) + 1 / (CHROMA_HYBRID_RRF_K + 3))
+    assert fused[0]["distance"] == 0.3
+    assert fused[2]["distance"] == 0.1
+
+def test_hybrid_search_keeps_keyword_only_hits(manager, monkeypatch):
+    monkeypatch.setattr(manager, "search_passages_many", lambda queries, n, f: [[], [result("a", 0.1)]])
+    monkeypatch.setattr(manager, "search_keyword_many", lambda queries, n, f: [[result("k")], []])
+
+    first, second = manager.search_hybrid_many(["Ahab", "sea"], n_results=5)
+    assert [r["id"] for r in first] == ["k"]
+    assert first[0]["distance"] is None
+    assert [r["id"] for r in second] == ["a"]
+
+def test_non_object_filter_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.search_passages_many(["storm"], 5, ["chapter_id"])
+
+def test_bulk_add_returns_ids_in_order(manager):
+    versions = [{"chapter_id": f"chapter_{i % 3}", "content": f"Passage {i} about the harbour.", "version_type": "spun"} for i in range(12)]
+    version_ids = manager.add_chapter_versions(versions)
+
+    assert len(version_ids) == 12 and None not in version_ids
+    assert [version_id.rsplit("_", 1)[0] for version_id in version_ids] == [f"chapter_{i % 3}_spun" for i in range(12)]
+    assert manager.get_latest_chapter_version("chapter_2", "spun")["content"] == "Passage 11 about the harbour."
+
+def test_identical_content_is_stored_once_as_a_reference(manager):
+    chapter = "The storm broke over the harbour at dusk."
+    spun_id = manager.add_chapter_version("chapter_1", chapter, "spun")
+    approved_id, copy_id = manager.add_chapter_versions([
+        {"chapter_id": "chapter_1", "content": chapter, "version_type": "approved", "metadata": {"approved_spun_version_id": spun_id}},
+        {"chapter_id": "chapter_2", "content": chapter, "version_type": "original"},
+    ])
+
+    assert manager.get_version_metadata(spun_id).get("storage", "full") != "reference"
+    for version_id in (approved_id, copy_id):
+        assert manager.get_version_metadata(version_id)["storage"] == "reference"
+        assert manager.get_version_metadata(version_id)["blob_id"] == spun_id
+    assert manager.get_latest_chapter_version("chapter_1", "approved")["content"] == chapter
+    assert manager.get_latest_chapter_version("chapter_2")["content"] == chapter
+
+def test_small_edits_are_stored_as_deltas(tmp_path):
+    path = str(tmp_path / "chroma_db")
+    manager = ChromaManager(path=path)
+    first = " ".join(f"Line {i} of the storm over the harbour." for i in range(40))
+    second = first.replace("Line 7 of", "Line seven of")
+    first_id = manager.add_chapter_version("chapter_1", first, "spun")
+    second_id = manager.add_chapter_version("chapter_1", second, "spun")
+
+    metadata = manager.get_version_metadata(second_id)
+    assert metadata["storage"] == "delta"
+    assert (metadata["delta_base"], metadata["delta_depth"]) == (first_id, 1)
+    manager.close()
+
+    # A fresh manager, with nothing cached, rebuilds the text from the stored diff
+    reopened = ChromaManager(path=path)
+    assert reopened.get_latest_chapter_version("chapter_1", "spun")["content"] == second
+    reopened.close()
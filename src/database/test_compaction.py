@@ -0,0 +1,69 @@
+# src/database/test_compaction.py
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import compaction
+from database.chroma_manager import ChromaManager
+from database.compaction import compact, get_policy, select_versions_to_delete
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def version(version_id: str, version_type: str, days_old: int, **metadata) -> tuple:
+    metadata.update({"version_type": version_type, "timestamp": (NOW - timedelta(days=days_old)).isoformat()})
+    return (version_id, metadata, version_id)
+
+def test_get_policy_applies_chapter_overrides(monkeypatch):
+    monkeypatch.setattr(compaction, "COMPACTION_POLICIES", {"chapter_1": {"keep_last": 10}})
+    assert get_policy("chapter_1", keep_last=3, keep_days=30) == {"keep_last": 10, "keep_days": 30}
+    assert get_policy("chapter_2", keep_last=3, keep_days=30) == {"keep_last": 3, "keep_days": 30}
+
+def test_newest_versions_of_each_type_are_kept():
+    versions = [
+        version("spun_4", "spun", 40), version("review_2", "review_comments", 41), version("spun_3", "spun", 50),
+        version("spun_2", "spun", 60), version("review_1", "review_comments", 61), version("spun_1", "spun", 70),
+    ]
+    assert select_versions_to_delete(versions, {"keep_last": 2, "keep_days": 0}, NOW) == ["spun_2", "spun_1"]
+
+def test_recent_versions_are_kept():
+    versions = [version("spun_3", "spun", 1), version("spun_2", "spun", 5), version("spun_1", "spun", 40)]
+    assert select_versions_to_delete(versions, {"keep_last": 1, "keep_days": 30}, NOW) == ["spun_1"]
+
+def test_newest_version_is_kept_even_with_keep_last_zero():
+    versions = [version("spun_2", "spun", 40), version("spun_1", "spun", 50)]
+    assert select_versions_to_delete(versions, {"keep_last": 0, "keep_days": 0}, NOW) == ["spun_1"]
+
+def test_approved_versions_and_their_lineage_are_kept():
+    versions = [
+        version("spun_3", "spun", 40),
+        version("approved_2", "approved", 45, approved_spun_version_id="revised_1"),
+        version("revised_1", "revised", 50, revised_spun_version_id="spun_1"),
+        version("revised_0", "revised", 55),
+        version("spun_2", "spun", 60),
+        version("spun_1", "spun", 70),
+    ]
+    assert select_versions_to_delete(versions, {"keep_last": 1, "keep_days": 0}, NOW) == ["revised_0", "spun_2"]
+
+def test_compact_deletes_versions_beyond_the_policy(tmp_path):
+    manager = ChromaManager(path=str(tmp_path / "chroma_db"))
+    version_ids = manager.add_chapter_versions([
+        {"chapter_id": "chapter_1", "content": f"Draft {i} of the storm over the harbour.", "version_type": "spun"}
+        for i in range(4)
+    ])
+
+    report = compact(manager, keep_last=2, keep_days=0, dry_run=True)
+    assert report == [{"chapter_id": "chapter_1", "policy": {"keep_last": 2, "keep_days": 0}, "versions": 4, "to_delete": 2}]
+    assert manager.version_index.get_many(version_ids).keys() == set(version_ids)
+
+    report = compact(manager, keep_last=2, keep_days=0)
+    assert report[0]["deleted"]["versions"] == 2
+    assert set(manager.version_index.get_many(version_ids)) == set(version_ids[2:])
+    assert manager.get_latest_chapter_version("chapter_1", "spun")["content"] == "Draft 3 of the storm over the harbour."
@@ -0,0 +1,48 @@
+# src/database/test_delta_store.py
+import json
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.delta_store import TOKEN_PATTERN, ContentCache, apply_delta, make_delta
+
+BASE = "The storm broke over the harbour.\n\nShips  strained at their moorings, and the gulls fled inland.\n"
+
+
+def test_round_trip_of_a_small_edit():
+    content = "The storm broke over the old harbour.\n\nShips strained at their moorings, and the gulls fled inland.\n"
+    delta = make_delta(BASE, content)
+    assert apply_delta(BASE, delta) == content
+    # Unchanged runs are stored as token ranges, not text
+    assert len(delta) < len(content)
+
+def test_round_trip_keeps_whitespace_exactly():
+    content = "  The storm broke over the harbour.\r\n\n\n\tShips strained.   "
+    assert apply_delta(BASE, make_delta(BASE, content)) == content
+
+def test_round_trip_of_edge_cases():
+    for base, content in [("", "new text"), (BASE, ""), (BASE, BASE), ("one two three", "three two one")]:
+        assert apply_delta(base, make_delta(base, content)) == content
+
+def test_identical_content_is_a_single_copy():
+    assert json.loads(make_delta(BASE, BASE)) == [[0, len(TOKEN_PATTERN.findall(BASE))]]
+
+def test_content_cache_evicts_least_recently_used():
+    cache = ContentCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+def test_content_cache_discard():
+    cache = ContentCache()
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.discard(["a", "missing"])
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
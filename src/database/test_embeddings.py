@@ -0,0 +1,65 @@
+# src/database/test_embeddings.py
+import math
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.embeddings import BatchedEmbeddingFunction, HashedBagOfWordsEmbedding, create_embedding_function
+
+
+def as_lists(embeddings) -> list:
+    # Newer chromadb versions wrap EmbeddingFunction.__call__ and return numpy arrays
+    return [[float(v) for v in embedding] for embedding in embeddings]
+
+class RecordingEmbedding:
+    """
+    Embeds every text as its length and records the size of each batch it is given.
+    """
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, input: list) -> list:
+        self.batch_sizes.append(len(input))
+        return [[float(len(text))] for text in input]
+
+def test_hashed_embedding_is_deterministic_and_normalised():
+    embed = HashedBagOfWordsEmbedding(dim=64)
+    first, again, empty = as_lists(embed(["The storm broke over the harbour.", "the STORM broke over the harbour", ""]))
+    assert len(first) == 64
+    assert first == again # Case and punctuation do not matter
+    assert math.isclose(math.sqrt(sum(v * v for v in first)), 1.0)
+    assert empty == [0.0] * 64
+
+def test_hashed_embedding_reflects_word_overlap():
+    embed = HashedBagOfWordsEmbedding(dim=256)
+    storm, storm_again, gulls = as_lists(embed(["storm over the harbour", "storm over the harbour at dusk", "gulls came back"]))
+    similarity = lambda a, b: sum(x * y for x, y in zip(a, b))
+    assert similarity(storm, storm_again) > similarity(storm, gulls)
+
+def test_batched_embedding_splits_input_and_keeps_order():
+    inner = RecordingEmbedding()
+    embed = BatchedEmbeddingFunction(inner, "recording", batch_size=2)
+    assert as_lists(embed(["a", "bb", "ccc", "dddd", "eeeee"])) == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert inner.batch_sizes == [2, 2, 1]
+
+def test_batched_embedding_counts_texts_and_chars():
+    embed = BatchedEmbeddingFunction(RecordingEmbedding(), "recording", batch_size=0)
+    embed(["storm", "harbour"])
+    embed(["gulls"])
+    stats = embed.get_stats()
+    assert (stats["calls"], stats["texts"], stats["chars"]) == (2, 3, 17)
+    assert stats["backend"] == "recording"
+    assert stats["batch_size"] == 1 # Clamped to at least one text per batch
+
+def test_create_embedding_function():
+    embed = create_embedding_function("hashed_bow")
+    assert isinstance(embed.inner, HashedBagOfWordsEmbedding)
+    assert embed.backend == "hashed_bow"
+    with pytest.raises(ValueError):
+        create_embedding_function("word2vec")
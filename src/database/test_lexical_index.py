@@ -0,0 +1,57 @@
+# src/database/test_lexical_index.py
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.lexical_index import LexicalIndex, build_match_query
+
+
+def make_index(tmp_path) -> LexicalIndex:
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add_many([
+        ("v1_p0", "Captain Ahab paced the deck of the Pequod.", {"version_id": "v1"}),
+        ("v1_p1", "The whale was never seen again.", {"version_id": "v1"}),
+        ("v2_p0", "Ahab and the white whale, Ahab and the sea.", {"version_id": "v2"}),
+        ("v3_p0", "The harbour was quiet that morning.", {"version_id": "v3"})
+    ])
+    return index
+
+def test_build_match_query_keeps_phrases_and_quotes_terms():
+    assert build_match_query('white whale') == '"white" OR "whale"'
+    assert build_match_query('"white whale" Ahab') == '"white whale" OR "Ahab"'
+    assert build_match_query('whale whale') == '"whale"'
+    # FTS5 syntax in the input is not interpreted
+    assert build_match_query('NEAR(a* OR b)') == '"NEAR" OR "a" OR "OR" OR "b"'
+    assert build_match_query('?!') == ""
+
+def test_search_ranks_passages_matching_more_often_first(tmp_path):
+    index = make_index(tmp_path)
+    results = index.search("Ahab")
+    assert [result["passage_id"] for result in results] == ["v2_p0", "v1_p0"]
+    assert results[0]["score"] > results[1]["score"]
+    assert results[0]["metadata"] == {"version_id": "v2"}
+
+def test_phrase_query_requires_adjacent_words(tmp_path):
+    index = make_index(tmp_path)
+    assert [result["passage_id"] for result in index.search('"white whale"')] == ["v2_p0"]
+    assert [result["passage_id"] for result in index.search('"whale white"')] == []
+
+def test_search_restricted_to_versions(tmp_path):
+    index = make_index(tmp_path)
+    assert [result["passage_id"] for result in index.search("whale", version_ids=["v1"])] == ["v1_p1"]
+    assert index.search("whale", version_ids=[]) == []
+    assert index.search("", version_ids=None) == []
+
+def test_search_respects_limit(tmp_path):
+    index = make_index(tmp_path)
+    assert len(index.search("the", limit=2)) == 2
+
+def test_delete_versions(tmp_path):
+    index = make_index(tmp_path)
+    assert index.count_versions() == 3
+    index.delete_versions(["v2"])
+    assert index.count_versions() == 2
+    assert index.count() == 3
+    assert [result["passage_id"] for result in index.search("Ahab")] == ["v1_p0"]
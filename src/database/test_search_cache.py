@@ -0,0 +1,47 @@
+# src/database/test_search_cache.py
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.search_cache import SearchResultCache
+
+
+def test_make_key_ignores_filter_key_order():
+    key = SearchResultCache.make_key("passages", "storm", {"chapter_id": "ch1", "version_type": "original"}, 5)
+    assert key == SearchResultCache.make_key("passages", "storm", {"version_type": "original", "chapter_id": "ch1"}, 5)
+    assert key != SearchResultCache.make_key("passages", "storm", {"chapter_id": "ch1", "version_type": "original"}, 6)
+    assert SearchResultCache.make_key("versions", "storm", None, 5) == SearchResultCache.make_key("versions", "storm", {}, 5)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchResultCache(max_entries=2)
+    cache.set("a", [1], generation=0)
+    cache.set("b", [2], generation=0)
+    assert cache.get("a", generation=0) == [1]
+    cache.set("c", [3], generation=0)
+    assert cache.get("b", generation=0) is None
+    assert cache.get("a", generation=0) == [1]
+    assert cache.get("c", generation=0) == [3]
+
+def test_new_generation_drops_all_entries():
+    cache = SearchResultCache()
+    cache.set("a", [1], generation=0)
+    assert cache.get("a", generation=1) is None
+    # Going back to an older generation does not resurrect entries either
+    assert cache.get("a", generation=0) is None
+
+def test_results_are_copied_in_and_out():
+    cache = SearchResultCache()
+    results = [{"id": "v1", "metadata": {"chapter_id": "ch1"}}]
+    cache.set("a", results, generation=0)
+    results[0]["metadata"]["chapter_id"] = "changed"
+    cached = cache.get("a", generation=0)
+    assert cached[0]["metadata"]["chapter_id"] == "ch1"
+    cached[0]["id"] = "changed"
+    assert cache.get("a", generation=0)[0]["id"] == "v1"
+
+def test_zero_size_cache_stores_nothing():
+    cache = SearchResultCache(max_entries=0)
+    cache.set("a", [1], generation=0)
+    assert cache.get("a", generation=0) is None
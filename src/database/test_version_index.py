@@ -0,0 +1,129 @@
+# src/database/test_version_index.py
+import os
+import sys
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.version_index import VersionIndex
+
+
+def version_metadata(chapter_id: str, version_type: str, minute: int, **extra) -> dict:
+    return {"chapter_id": chapter_id, "version_type": version_type, "timestamp": f"2024-01-01T10:{minute:02d}:00", **extra}
+
+def make_index(tmp_path, name: str = "index.sqlite3") -> VersionIndex:
+    return VersionIndex(str(tmp_path / name))
+
+def test_latest_by_chapter_and_type(tmp_path):
+    index = make_index(tmp_path)
+    index.add_many([
+        ("v1", version_metadata("ch1", "original", 0), None),
+        ("v2", version_metadata("ch1", "ai_spun", 1), None),
+        ("v3", version_metadata("ch1", "ai_spun", 2), None),
+        ("w1", version_metadata("ch2", "original", 3), None)
+    ])
+    assert index.latest("ch1") == "v3"
+    assert index.latest("ch1", "original") == "v1"
+    assert index.latest("ch2") == "w1"
+    assert index.latest("ch1", "human_edited") is None
+    assert index.latest("missing") is None
+
+def test_get_many_returns_metadata_and_blob(tmp_path):
+    index = make_index(tmp_path)
+    index.add("v1", version_metadata("ch1", "original", 0))
+    found = index.get_many(["v1", "missing"])
+    assert list(found) == ["v1"]
+    metadata, blob_id = found["v1"]
+    assert metadata["chapter_id"] == "ch1"
+    assert blob_id == "v1"
+    assert index.get_many([]) == {}
+
+def test_list_page_walks_versions_newest_first(tmp_path):
+    index = make_index(tmp_path)
+    index.add_many([(f"v{i}", version_metadata("ch1", "ai_spun", i), None) for i in range(5)])
+    first_page = index.list_page("ch1", limit=2)
+    assert [version_id for version_id, _ in first_page] == ["v4", "v3"]
+    second_page = index.list_page("ch1", limit=2, before_seq=first_page[-1][1])
+    assert [version_id for version_id, _ in second_page] == ["v2", "v1"]
+
+def test_index_persists_across_instances(tmp_path):
+    index = make_index(tmp_path)
+    index.add("v1", version_metadata("ch1", "original", 0))
+    index.close()
+    reopened = make_index(tmp_path)
+    assert reopened.count() == 1
+    assert reopened.latest("ch1") == "v1"
+
+def test_reserve_sequences_is_per_chapter_and_consecutive(tmp_path):
+    index = make_index(tmp_path)
+    assert index.reserve_sequences(["ch1", "ch2", "ch1"]) == [1, 1, 2]
+    assert index.reserve_sequences(["ch1"]) == [3]
+
+def test_reservations_are_shared_between_instances(tmp_path):
+    first, second = make_index(tmp_path), make_index(tmp_path)
+    assert first.reserve_sequences(["ch1"]) == [1]
+    assert second.reserve_sequences(["ch1"]) == [2]
+    assert first.reserve_sequences(["ch1"]) == [3]
+
+def test_list_since_returns_only_newer_versions(tmp_path):
+    index = make_index(tmp_path)
+    seqs = index.reserve_sequences(["ch1"] * 3)
+    index.add_many([(f"v{seq}", version_metadata("ch1", "ai_spun", seq, seq=seq), None) for seq in seqs])
+    assert index.list_since("ch1", after_seq=1) == [("v2", 2), ("v3", 3)]
+    assert index.list_since("ch1", after_seq=3) == []
+
+def test_versions_without_seq_are_numbered_after_existing_ones(tmp_path):
+    index = make_index(tmp_path)
+    index.add("v1", version_metadata("ch1", "original", 0, seq=index.reserve_sequences(["ch1"])[0]))
+    index.add("v2", version_metadata("ch1", "ai_spun", 1))
+    assert index.get_many(["v2"])["v2"][0]["seq"] == 2
+    assert index.reserve_sequences(["ch1"]) == [3]
+
+def test_counters_resync_from_rebuilt_versions(tmp_path):
+    # A fresh index file rebuilt from records must not hand out numbers already in use
+    index = make_index(tmp_path, "fresh.sqlite3")
+    index.rebuild([
+        ("v1", version_metadata("ch1", "original", 0, seq=4)),
+        ("v2", version_metadata("ch1", "ai_spun", 1, seq=7))
+    ])
+    assert index.latest("ch1") == "v2"
+    assert index.reserve_sequences(["ch1"]) == [8]
+
+def test_find_blob_only_returns_stored_documents(tmp_path):
+    index = make_index(tmp_path)
+    index.add_many([
+        ("v1", version_metadata("ch1", "original", 0, content_hash="abc"), None),
+        ("v2", version_metadata("ch1", "ai_spun", 1, content_hash="abc"), "v1")
+    ])
+    assert index.find_blob("abc") == "v1"
+    assert index.find_blob("other") is None
+    assert index.referencing(["v1"]) == {"v1": ["v1", "v2"]}
+
+def test_rebuild_restores_references_and_counts_skipped(tmp_path):
+    index = make_index(tmp_path)
+    skipped = index.rebuild([
+        ("v1", version_metadata("ch1", "original", 0, content_hash="abc")),
+        ("v2", version_metadata("ch1", "ai_spun", 1, content_hash="abc", storage="reference", blob_id="v1")),
+        ("dangling", version_metadata("ch1", "ai_spun", 2, storage="reference", blob_id="gone")),
+        ("broken", {"chapter_id": "ch1"}),
+        ("bad_time", version_metadata("ch1", "ai_spun", 3, timestamp="yesterday"))
+    ])
+    assert skipped == 3
+    assert index.count_skipped() == 3
+    assert index.count() == 2
+    assert index.get_many(["v2"])["v2"][1] == "v1"
+    assert [version_id for version_id, _, _ in index.list_references()] == ["v2"]
+
+def test_rebuild_keeps_existing_sequence_numbers(tmp_path):
+    index = make_index(tmp_path)
+    index.add_many([
+        ("v1", version_metadata("ch1", "original", 0), None),
+        ("v2", version_metadata("ch1", "ai_spun", 1), None)
+    ])
+    seqs = {version_id: metadata["seq"] for version_id, (metadata, _) in index.get_many(["v1", "v2"]).items()}
+    # Records written before sequences existed carry no seq of their own
+    index.rebuild([
+        ("v1", version_metadata("ch1", "original", 0)),
+        ("v2", version_metadata("ch1", "ai_spun", 1))
+    ])
+    assert {version_id: metadata["seq"] for version_id, (metadata, _) in index.get_many(["v1", "v2"]).items()} == seqs
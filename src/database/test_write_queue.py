@@ -0,0 +1,60 @@
+# src/database/test_write_queue.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.write_queue import VersionWriteQueue
+
+
+class RecordingManager:
+    """
+    Stands in for ChromaManager.add_chapter_versions and records every batch it is given.
+    """
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    def add_chapter_versions(self, versions: list) -> list:
+        self.batches.append(versions)
+        if self.fail:
+            raise RuntimeError("disk full")
+        return [f"{version['chapter_id']}_{version['version_type']}_{len(self.batches)}" for version in versions]
+
+def test_bursts_are_written_in_batches():
+    manager = RecordingManager()
+    write_queue = VersionWriteQueue(chroma_manager=manager, batch_size=3, flush_interval=0.5)
+    futures = [write_queue.submit(f"ch{i}", f"text {i}", "spun") for i in range(5)]
+    version_ids = [future.result(timeout=5) for future in futures]
+    write_queue.close()
+
+    assert [len(batch) for batch in manager.batches] == [3, 2]
+    assert version_ids == ["ch0_spun_1", "ch1_spun_1", "ch2_spun_1", "ch3_spun_2", "ch4_spun_2"]
+    assert manager.batches[0][0] == {"chapter_id": "ch0", "content": "text 0", "version_type": "spun", "metadata": None}
+
+def test_failed_batch_resolves_to_none():
+    write_queue = VersionWriteQueue(chroma_manager=RecordingManager(fail=True), batch_size=10, flush_interval=0.05)
+    futures = [write_queue.submit("ch1", "text", "spun"), write_queue.submit("ch2", "text", "spun")]
+    assert [future.result(timeout=5) for future in futures] == [None, None]
+    write_queue.close()
+
+def test_async_add_waits_for_the_write():
+    write_queue = VersionWriteQueue(chroma_manager=RecordingManager(), batch_size=10, flush_interval=0.01)
+    assert asyncio.run(write_queue.add("ch1", "text", "original", {"source": "test"})) == "ch1_original_1"
+    write_queue.close()
+
+def test_close_flushes_pending_versions_and_rejects_new_ones():
+    manager = RecordingManager()
+    write_queue = VersionWriteQueue(chroma_manager=manager, batch_size=10, flush_interval=60)
+    future = write_queue.submit("ch1", "text", "spun")
+    write_queue.close()
+
+    assert future.result(timeout=0) == "ch1_spun_1"
+    with pytest.raises(RuntimeError):
+        write_queue.submit("ch2", "text", "spun")
@@ -0,0 +1,353 @@
+# src/database/version_index.py
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA_VERSION = 3
+
+
+class VersionIndex:
+    """
+    Sidecar SQLite index of chapter versions.
+
+    Every version has a row with its chapter_id, version_type, timestamp, metadata and the ID of the
+    ChromaDB document ("blob") that holds its content. A version whose content is already stored under
+    another version (found by content hash) points at that blob, so identical text is stored and embedded
+    once. Lets ChromaManager find the latest version of a chapter, or page through its versions, with
+    indexed lookups instead of loading and sorting documents.
+
+    The index is a cache: ChromaDB holds a record of every version, including those pointing at another
+    version's content, and rebuild() restores the index from those records.
+
+    Versions of a chapter are numbered by a per-chapter sequence counter (seq) that is incremented
+    atomically, so ordering never depends on timestamps and "versions after seq N" is a range query.
+    Several processes may share the same index file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            schema_version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if schema_version < 2:
+                # Layouts before 2 only mirrored ChromaDB and are rebuilt from it.
+                self._conn.execute("DROP TABLE IF EXISTS versions")
+            elif schema_version < 3:
+                # Version 2 rows (including references) are kept and numbered by _backfill_sequences.
+                self._conn.execute("ALTER TABLE versions ADD COLUMN seq INTEGER")
+                self._conn.execute("DROP INDEX IF EXISTS idx_versions_type")
+                self._conn.execute("DROP INDEX IF EXISTS idx_versions_chapter")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions ("
+                " id TEXT PRIMARY KEY,"
+                " chapter_id TEXT NOT NULL,"
+                " version_type TEXT NOT NULL,"
+                " timestamp REAL NOT NULL,"
+                " content_hash TEXT,"
+                " blob_id TEXT NOT NULL,"
+                " metadata TEXT NOT NULL,"
+                " seq INTEGER)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sequences (chapter_id TEXT PRIMARY KEY, last_seq INTEGER NOT NULL)")
+            # ChromaDB documents rebuild() could not index, so they still count as accounted for
+            self._conn.execute("CREATE TABLE IF NOT EXISTS skipped (id TEXT PRIMARY KEY)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_versions_type_seq ON versions (chapter_id, version_type, seq)")
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_versions_seq ON versions (chapter_id, seq)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_versions_hash ON versions (content_hash)")
+            self._backfill_sequences()
+
+    @staticmethod
+    def _row(version_id: str, metadata: dict, blob_id: str = None, seq: int = None) -> tuple:
+        return (
+            version_id,
+            metadata["chapter_id"],
+            metadata["version_type"],
+            datetime.fromisoformat(metadata["timestamp"]).timestamp(),
+            metadata.get("content_hash"),
+            blob_id or version_id,
+            json.dumps(metadata),
+            metadata.get("seq", seq)
+        )
+
+    @staticmethod
+    def _with_seq(metadata: str, seq: int) -> dict:
+        metadata = json.loads(metadata)
+        metadata["seq"] = seq
+        return metadata
+
+    def _sync_sequences(self):
+        # Counters never fall behind the numbers in use (e.g. after a rebuild into a new index file).
+        self._conn.execute(
+            "INSERT INTO sequences (chapter_id, last_seq)"
+            " SELECT chapter_id, MAX(seq) FROM versions WHERE seq IS NOT NULL GROUP BY chapter_id"
+            " ON CONFLICT (chapter_id) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)"
+        )
+
+    def _reserve(self, counts: dict) -> dict:
+        firsts = {}
+        for chapter_id, count in counts.items():
+            self._conn.execute("INSERT OR IGNORE INTO sequences (chapter_id, last_seq) VALUES (?, 0)", (chapter_id,))
+            self._conn.execute("UPDATE sequences SET last_seq = last_seq + ? WHERE chapter_id = ?", (count, chapter_id))
+            last_seq = self._conn.execute("SELECT last_seq FROM sequences WHERE chapter_id = ?", (chapter_id,)).fetchone()[0]
+            firsts[chapter_id] = last_seq - count + 1
+        return firsts
+
+    def _backfill_sequences(self):
+        # Rows without a number (written before sequences existed) are numbered in timestamp order.
+        self._sync_sequences()
+        rows = self._conn.execute(
+            "SELECT id, chapter_id FROM versions WHERE seq IS NULL ORDER BY chapter_id, timestamp, rowid"
+        ).fetchall()
+        if not rows:
+            return
+        counts = {}
+        for _, chapter_id in rows:
+            counts[chapter_id] = counts.get(chapter_id, 0) + 1
+        next_seq = self._reserve(counts)
+        updates = []
+        for version_id, chapter_id in rows:
+            updates.append((next_seq[chapter_id], version_id))
+            next_seq[chapter_id] += 1
+        self._conn.executemany("UPDATE versions SET seq = ? WHERE id = ?", updates)
+
+    def reserve_sequences(self, chapter_ids: list) -> list:
+        """
+        Atomically takes the next sequence number for each entry of chapter_ids (one per entry, so a
+        chapter listed twice gets two consecutive numbers). Safe across processes sharing the file.
+
+        Returns:
+            list: The sequence numbers, in the order of chapter_ids.
+        """
+        counts = {}
+        for chapter_id in chapter_ids:
+            counts[chapter_id] = counts.get(chapter_id, 0) + 1
+        with self._lock, self._conn:
+            next_seq = self._reserve(counts)
+        seqs = []
+        for chapter_id in chapter_ids:
+            seqs.append(next_seq[chapter_id])
+            next_seq[chapter_id] += 1
+        return seqs
+
+    def add(self, version_id: str, metadata: dict, blob_id: str = None):
+        """
+        Indexes one version. metadata must contain chapter_id, version_type, an ISO timestamp and
+        the seq taken from reserve_sequences. blob_id is the ChromaDB document holding the content
+        (defaults to the version itself).
+        """
+        self.add_many([(version_id, metadata, blob_id)])
+
+    def add_many(self, versions: list):
+        """
+        Indexes several (version_id, metadata, blob_id) tuples in one transaction.
+        """
+        rows = [self._row(*version) for version in versions]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO versions (id, chapter_id, version_type, timestamp, content_hash, blob_id, metadata, seq)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if any(row[-1] is None for row in rows):
+                self._backfill_sequences()
+
+    def find_blob(self, content_hash: str) -> str:
+        """
+        Returns the ID of a ChromaDB document that already holds content with this hash, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blob_id FROM versions WHERE content_hash = ? AND id = blob_id LIMIT 1", (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def latest(self, chapter_id: str, version_type: str = None) -> str:
+        """
+        Returns the ID of the newest version (highest seq) of the chapter (of the given type, if any), or None.
+        """
+        with self._lock:
+            if version_type:
+                row = self._conn.execute(
+                    "SELECT id FROM versions WHERE chapter_id = ? AND version_type = ? ORDER BY seq DESC LIMIT 1",
+                    (chapter_id, version_type)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT id FROM versions WHERE chapter_id = ? ORDER BY seq DESC LIMIT 1",
+                    (chapter_id,)
+                ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, version_ids: list) -> dict:
+        """
+        Returns {version_id: (metadata, blob_id)} for the versions that are indexed. metadata includes the version's seq.
+        """
+        if not version_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in version_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, metadata, blob_id, seq FROM versions WHERE id IN ({placeholders})", list(version_ids)
+            ).fetchall()
+        return {version_id: (self._with_seq(metadata, seq), blob_id) for version_id, metadata, blob_id, seq in rows}
+
+    def list_page(self, chapter_id: str, version_type: str = None, limit: int = 50, before_seq: int = None) -> list:
+        """
+        Returns one page of the chapter's versions, newest first, for keyset (cursor) pagination.
+
+        Args:
+            before_seq (int, optional): seq of the last row of the previous page.
+
+        Returns:
+            list: (version_id, seq) tuples.
+        """
+        conditions = ["chapter_id = ?"]
+        params = [chapter_id]
+        if version_type:
+            conditions.append("version_type = ?")
+            params.append(version_type)
+        if before_seq is not None:
+            conditions.append("seq < ?")
+            params.append(before_seq)
+        params.append(limit)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, seq FROM versions WHERE {' AND '.join(conditions)} ORDER BY seq DESC LIMIT ?",
+                params
+            ).fetchall()
+
+    def list_since(self, chapter_id: str, after_seq: int = 0, limit: int = 100) -> list:
+        """
+        Returns (version_id, seq) for the chapter's versions with seq > after_seq, oldest first,
+        so a client can fetch only what was added since it last synced.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, seq FROM versions WHERE chapter_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (chapter_id, after_seq, limit)
+            ).fetchall()
+
+    def list_chapter(self, chapter_id: str) -> list:
+        """
+        Returns (version_id, metadata, blob_id) for every version of the chapter, newest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, metadata, blob_id, seq FROM versions WHERE chapter_id = ? ORDER BY seq DESC", (chapter_id,)
+            ).fetchall()
+        return [(version_id, self._with_seq(metadata, seq), blob_id) for version_id, metadata, blob_id, seq in rows]
+
+    def chapter_ids(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT chapter_id FROM versions ORDER BY chapter_id").fetchall()]
+
+    def referencing(self, blob_ids: list) -> dict:
+        """
+        Returns {blob_id: [version_id, ...]} for every version whose content is one of the given documents.
+        """
+        if not blob_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in blob_ids)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT blob_id, id FROM versions WHERE blob_id IN ({placeholders})", list(blob_ids)).fetchall()
+        references = {}
+        for blob_id, version_id in rows:
+            references.setdefault(blob_id, []).append(version_id)
+        return references
+
+    def delta_dependents(self, blob_ids: list) -> list:
+        """
+        Returns the IDs of stored documents that are diffs against one of the given documents.
+        """
+        if not blob_ids:
+            return []
+        placeholders = ", ".join("?" for _ in blob_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM versions WHERE id = blob_id AND json_extract(metadata, '$.delta_base') IN ({placeholders})",
+                list(blob_ids)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def update_metadata_many(self, versions: list):
+        """
+        Replaces the stored metadata of several (version_id, metadata) pairs in one transaction.
+        """
+        rows = [(json.dumps(metadata), version_id) for version_id, metadata in versions]
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE versions SET metadata = ? WHERE id = ?", rows)
+
+    def delete_many(self, version_ids: list):
+        """
+        Removes versions from the index. Their sequence numbers are not reused.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM versions WHERE id = ?", [(version_id,) for version_id in version_ids])
+
+    def data_version(self) -> int:
+        """
+        Changes whenever another connection (e.g. another process) commits to the index file.
+        """
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM versions").fetchone()[0]
+
+    def list_references(self) -> list:
+        """
+        Returns (version_id, metadata, blob_id) for every version whose content is stored under another version.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, metadata, blob_id, seq FROM versions WHERE id != blob_id ORDER BY rowid").fetchall()
+        return [(version_id, self._with_seq(metadata, seq), blob_id) for version_id, metadata, blob_id, seq in rows]
+
+    def count_skipped(self) -> int:
+        """
+        Returns the number of ChromaDB documents the last rebuild() skipped.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM skipped").fetchone()[0]
+
+    def rebuild(self, versions: list):
+        """
+        Replaces the index with the given (version_id, metadata) pairs, the version records of the collection.
+        A record with metadata 'storage' "reference" is indexed with the document named by its 'blob_id'.
+        Sequence numbers of versions whose metadata predates them are kept.
+        Entries whose metadata lacks chapter_id, version_type or a valid timestamp, and references whose
+        document is not among the pairs, are skipped and recorded (see count_skipped).
+
+        Returns:
+            int: The number of skipped entries.
+        """
+        stored = {version_id for version_id, metadata in versions if (metadata or {}).get("storage") != "reference"}
+        with self._lock, self._conn:
+            known_seqs = dict(self._conn.execute("SELECT id, seq FROM versions").fetchall())
+            rows, skipped = [], []
+            for version_id, metadata in versions:
+                metadata = metadata or {}
+                blob_id = metadata.get("blob_id") if metadata.get("storage") == "reference" else version_id
+                try:
+                    if blob_id not in stored:
+                        raise KeyError(blob_id)
+                    rows.append(self._row(version_id, metadata, blob_id, seq=known_seqs.get(version_id)))
+                except (KeyError, TypeError, ValueError):
+                    skipped.append((version_id,))
+            self._conn.execute("DELETE FROM skipped")
+            self._conn.executemany("INSERT OR IGNORE INTO skipped (id) VALUES (?)", skipped)
+            self._conn.execute("DELETE FROM versions")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO versions (id, chapter_id, version_type, timestamp, content_hash, blob_id, metadata, seq)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._backfill_sequences()
+        return len(skipped)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
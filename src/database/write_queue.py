@@ -0,0 +1,131 @@
+# src/database/write_queue.py
+import asyncio
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import CHROMA_WRITE_BATCH_SIZE, CHROMA_WRITE_FLUSH_INTERVAL
+from database.chroma_manager import ChromaManager, get_chroma_manager
+
+
+class VersionWriteQueue:
+    """
+    Write-behind queue for chapter versions.
+
+    Versions submitted from any thread or event loop are collected by a background thread and
+    written with ChromaManager.add_chapter_versions in groups of up to batch_size, so a burst of
+    writes shares one embedding batch and one transaction. Each submission returns a Future that
+    resolves to the version ID once the version is stored (or None if storing failed).
+    """
+    def __init__(self, chroma_manager: ChromaManager = None, batch_size: int = CHROMA_WRITE_BATCH_SIZE,
+                 flush_interval: float = CHROMA_WRITE_FLUSH_INTERVAL):
+        self.chroma_manager = chroma_manager or get_chroma_manager()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="chroma-write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, chapter_id: str, content: str, version_type: str, metadata: dict = None) -> Future:
+        """
+        Queues a version for writing.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the stored version ID, or None if the write failed.
+        """
+        if self._closed:
+            raise RuntimeError("VersionWriteQueue is closed.")
+        future = Future()
+        self._queue.put(({
+            "chapter_id": chapter_id,
+            "content": content,
+            "version_type": version_type,
+            "metadata": metadata
+        }, future))
+        return future
+
+    async def add(self, chapter_id: str, content: str, version_type: str, metadata: dict = None) -> str:
+        """
+        Async variant of submit: waits until the version is stored and returns its ID (or None).
+        """
+        return await asyncio.wrap_future(self.submit(chapter_id, content, version_type, metadata))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Wait a little for more versions so bursts are written together.
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list):
+        try:
+            version_ids = self.chroma_manager.add_chapter_versions([version for version, _ in batch])
+        except Exception as e:
+            print(f"Error in write-behind batch: {e}")
+            version_ids = [None] * len(batch)
+        for (_, future), version_id in zip(batch, version_ids):
+            future.set_result(version_id)
+
+    def close(self, timeout: float = 30.0):
+        """
+        Writes everything still queued and stops the background thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+def get_version_write_queue() -> VersionWriteQueue:
+    """
+    Returns the process-wide VersionWriteQueue (writing through the shared ChromaManager), creating it on first use.
+    """
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = VersionWriteQueue()
+    return _write_queue
+
+def close_version_write_queue():
+    """
+    Flushes and stops the process-wide VersionWriteQueue, if one was created.
+    """
+    global _write_queue
+    with _write_queue_lock:
+        write_queue = _write_queue
+        _write_queue = None
+    if write_queue is not None:
+        write_queue.close()
+
+# Registered after chroma_manager's handler, so atexit runs it first and pending writes reach the database.
+atexit.register(close_version_write_queue)
@@ -2,8 +2,12 @@
 from dotenv import load_dotenv
 load_dotenv() # This loads variables from .env file
 
+import gzip
+import hashlib
+import json
 import os
-from flask import Flask, jsonify, send_from_directory, request
+import threading
+from flask import Flask, Response, jsonify, send_from_directory, request
 from flask_cors import CORS
 from datetime import datetime
 
@@ -12,30 +16,119 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 # Import DEFAULT_CHAPTER_ID and CHROMA_DB_PATH
-from config import ORIGINAL_CHAPTER_PATH, SCREENSHOT_OUTPUT_FILE_PATH, DEFAULT_CHAPTER_ID, CHROMA_DB_PATH
-from database.chroma_manager import ChromaManager # Import ChromaManager
+from config import (ORIGINAL_CHAPTER_PATH, SCREENSHOT_OUTPUT_FILE_PATH, DEFAULT_CHAPTER_ID, CHROMA_DB_PATH, REVISION_MODE, SPIN_CANDIDATE_COUNT, CHROMA_SEARCH_MODE, EVENTS_KEEPALIVE_SECONDS,
+                    HTTP_COMPRESSION_ENABLED, HTTP_COMPRESSION_MIN_BYTES, HTTP_COMPRESSION_LEVEL)
+from database.chroma_manager import get_chroma_manager # Process-wide ChromaManager, shared with the agents
+from pipeline.job_queue import get_job_queue
 # Import the writer_agent and reviewer_agent to trigger them
-from ai_agents.writer_agent import spin_chapter_content
+from ai_agents.writer_agent import spin_chapter_content, stream_spin_chapter_content
 from ai_agents.reviewer_agent import review_chapter_content
+from ai_agents.overlapped_revision import spin_and_review_overlapped
+from ai_agents.candidate_selection import spin_best_of_n
+# Shared LLM client: agent calls run on one long-lived event loop so the connection pool survives across requests
+from ai_agents.llm_client import run_coroutine, iterate_in_background
+from ai_agents.token_budget import get_usage_tracker
 # Import the reward model functions
 from rl_system.reward_model import calculate_review_reward, calculate_human_action_reward, log_workflow_event
 
+try:
+    import brotli
+    _BROTLI_AVAILABLE = True
+except ImportError:
+    _BROTLI_AVAILABLE = False
+
 app = Flask(__name__)
 CORS(app)
 
-# Initialize ChromaManager GLOBALLY when the Flask app starts
+# Initialize ChromaManager GLOBALLY when the Flask app starts (the agents reuse the same instance)
 try:
     app.logger.info("Initializing ChromaManager globally for Flask app...")
-    chroma_manager = ChromaManager()
+    chroma_manager = get_chroma_manager()
     app.logger.info(f"ChromaManager initialized. Collection: '{chroma_manager.collection.name}' at path: '{CHROMA_DB_PATH}'")
     collection_count = chroma_manager.collection.count()
     app.logger.info(f"ChromaDB collection '{chroma_manager.collection.name}' has {collection_count} documents on Flask startup.")
+    # Load the embedding model before the first request needs it
+    chroma_manager.warm_up()
 except Exception as e:
     app.logger.error(f"CRITICAL ERROR: Failed to initialize ChromaManager globally: {e}")
     chroma_manager = None
 
 DATA_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 
+# Responses worth compressing; images such as the PNG screenshot are compressed already.
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """
+    Compresses JSON and text responses with brotli or gzip, whichever the client prefers. A strong ETag
+    becomes weak, as the bytes on the wire now depend on the encoding.
+    """
+    if (not HTTP_COMPRESSION_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300 or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < HTTP_COMPRESSION_MIN_BYTES:
+        return response
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if _BROTLI_AVAILABLE else ["gzip"])
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=min(HTTP_COMPRESSION_LEVEL, 11)))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(data, compresslevel=min(max(HTTP_COMPRESSION_LEVEL, 1), 9)))
+    else:
+        return response
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def not_modified(etag: str) -> Response:
+    """
+    Empty 304 response for a client whose cached copy (If-None-Match) is still current.
+    """
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+_file_etags = {} # path -> ((mtime_ns, size), sha256 of the file)
+
+def file_etag(path: str) -> str:
+    """
+    Content hash of a file for its ETag, recomputed only when the file's modification time or size changes.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_etags.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    _file_etags[path] = (key, digest.hexdigest())
+    return digest.hexdigest()
+
+# Storage bookkeeping (diffs, shared documents, dedup hashes) that clients have no use for
+INTERNAL_METADATA_KEYS = ("storage", "delta_base", "delta_depth", "blob_id", "content_hash")
+
+def public_metadata(metadata: dict) -> dict:
+    return {key: value for key, value in (metadata or {}).items() if key not in INTERNAL_METADATA_KEYS}
+
+def version_etag(version_id: str, metadata: dict) -> str:
+    """
+    ETag of a served version: its ID (a version's content never changes) plus the metadata sent with it,
+    which compaction can rewrite in place.
+    """
+    served = json.dumps([version_id, public_metadata(metadata)], sort_keys=True)
+    return hashlib.sha256(served.encode("utf-8")).hexdigest()
+
 @app.route('/')
 def index():
     app.logger.info("Human-in-the-Loop Backend is running!")
@@ -54,12 +147,26 @@ def get_chapter_version(chapter_id: str, version_type: str):
         app.logger.warning(f"Requested chapter_id '{chapter_id}' does not match DEFAULT_CHAPTER_ID '{DEFAULT_CHAPTER_ID}'.")
         return jsonify({"error": f"Chapter ID '{chapter_id}' not found."}), 404
 
+    # The ETag comes from the latest version's ID and metadata (see version_etag), so a client that
+    # already has it gets a 304 without the content being loaded.
+    latest_version_id = chroma_manager.get_latest_version_id(chapter_id, version_type)
+    latest_metadata = chroma_manager.get_version_metadata(latest_version_id) if latest_version_id else None
+    if latest_metadata is not None:
+        etag = version_etag(latest_version_id, latest_metadata)
+        if request.if_none_match.contains_weak(etag):
+            app.logger.info(f"{version_type} content for {chapter_id} not modified (version '{latest_version_id}').")
+            return not_modified(etag)
+
     app.logger.info(f"Attempting to retrieve latest version for chapter_id='{chapter_id}', version_type='{version_type}' from ChromaDB.")
     latest_version = chroma_manager.get_latest_chapter_version(chapter_id, version_type)
     
     if latest_version:
         app.logger.info(f"Successfully retrieved {version_type} content for {chapter_id}.")
-        return jsonify({"content": latest_version['content'], "id": latest_version['id'], "metadata": latest_version['metadata']})
+        response = jsonify({"content": latest_version['content'], "id": latest_version['id'], "metadata": public_metadata(latest_version['metadata'])})
+        response.set_etag(version_etag(latest_version['id'], latest_version['metadata']))
+        # Cache, but revalidate on every use: the latest version changes when a new one is stored.
+        response.cache_control.no_cache = True
+        return response
     else:
         app.logger.warning(f"No {version_type} content found in ChromaDB for chapter ID: {chapter_id}")
         return jsonify({"error": f"No {version_type} content found for chapter ID: {chapter_id}"}), 404
@@ -80,7 +187,10 @@ def get_screenshot():
     screenshot_filename = os.path.basename(abs_screenshot_path)
     
     app.logger.info(f"Serving screenshot from: {abs_screenshot_path}")
-    return send_from_directory(screenshot_dir, screenshot_filename)
+    # Conditional response: If-None-Match with the current content hash is answered with a 304.
+    response = send_from_directory(screenshot_dir, screenshot_filename, etag=file_etag(abs_screenshot_path), max_age=0)
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/approve_chapter/<chapter_id>', methods=['POST'])
 def approve_chapter(chapter_id: str):
@@ -124,8 +234,116 @@ def approve_chapter(chapter_id: str):
         app.logger.error(f"Error during chapter approval for {chapter_id}: {e}")
         return jsonify({"error": f"An error occurred during approval: {e}"}), 500
 
+def record_revision_request(chapter_id: str, latest_spun_version: dict, feedback: str) -> str:
+    """
+    Stores a 'revision_requested' version for the latest spun content and logs the RL event.
+
+    Returns:
+        str: The new version ID, or None if it could not be stored.
+    """
+    revision_metadata = {
+        "human_action": "revision_requested",
+        "revised_spun_version_id": latest_spun_version['id'],
+        "revision_request_timestamp": datetime.now().isoformat(),
+        "feedback": feedback
+    }
+    version_id = chroma_manager.add_chapter_version(
+        chapter_id=chapter_id,
+        content=latest_spun_version['content'],
+        version_type="revision_requested",
+        metadata=revision_metadata
+    )
+
+    if not version_id:
+        app.logger.error(f"Failed to record revision request for chapter '{chapter_id}' in ChromaDB.")
+        return None
+
+    app.logger.info(f"Chapter '{chapter_id}' revision request recorded. New version ID: {version_id}")
+    # --- RL Logging: Human Revision Request ---
+    reward = calculate_human_action_reward("revision_requested", feedback)
+    log_workflow_event("human_action_revision_requested", chapter_id, version_id, reward, {"feedback": feedback, "revised_version_id": latest_spun_version['id']})
+    # --- End RL Logging ---
+    return version_id
+
+def process_revision(chapter_id: str, feedback: str, revision_mode: str, candidate_count: int, version_id: str) -> dict:
+    """
+    Job handler for 'revision' jobs: generates new spun content for the chapter and reviews it.
+    Runs on a job worker thread; the agents run on the shared LLM event loop.
+
+    Returns:
+        dict: 'message' and the 'version_id' of the revision request.
+
+    Raises:
+        RuntimeError: If the original content is missing or the AI Writer fails.
+    """
+    app.logger.info(f"Triggering AI Writer to generate new spun content for chapter: {chapter_id} with feedback.")
+    original_content_version = chroma_manager.get_latest_chapter_version(chapter_id, "original")
+    if not original_content_version:
+        app.logger.error(f"Could not find original content for chapter {chapter_id} to trigger revision.")
+        raise RuntimeError("Could not find original content for revision.")
+
+    new_review_comments = None
+    if revision_mode == "overlapped":
+        # Writer and reviewer run as a pipeline: finished sections are reviewed while later ones are written.
+        new_spun_content, new_review_comments = run_coroutine(
+            spin_and_review_overlapped(chapter_id, original_content_version['content'], feedback=feedback)
+        ).result()
+    elif revision_mode == "best_of_n":
+        # Several candidates are scored and only the best is stored; with review scoring its review comes along.
+        new_spun_content, new_review_comments = run_coroutine(
+            spin_best_of_n(chapter_id, original_content_version['content'], feedback=feedback, candidate_count=candidate_count)
+        ).result()
+    else:
+        new_spun_content = run_coroutine(spin_chapter_content(chapter_id, original_content_version['content'], feedback=feedback)).result()
+
+    if new_spun_content.startswith("Error:"):
+        app.logger.error(f"AI Writer failed to generate revised content: {new_spun_content}")
+        raise RuntimeError(f"AI Writer failed to generate revised content: {new_spun_content}")
+
+    app.logger.info(f"AI Writer successfully generated revised content for chapter: {chapter_id}")
+    # --- RL Logging: AI Writer Output ---
+    log_workflow_event("ai_writer_output", chapter_id, None, 0.0, {"type": "spun_revision", "feedback_used": feedback}) # Reward for writer is indirect
+    # --- End RL Logging ---
+
+    if new_review_comments is None:
+        app.logger.info(f"Triggering AI Reviewer for the newly generated spun content for chapter: {chapter_id}.")
+        new_review_comments = run_coroutine(review_chapter_content(chapter_id, new_spun_content)).result()
+
+    if new_review_comments.startswith("Error:"):
+        app.logger.error(f"AI Reviewer failed to generate new review comments: {new_review_comments}")
+        return {"message": f"Chapter '{chapter_id}' revision requested and new content generated, but review failed.", "version_id": version_id}
+
+    app.logger.info(f"AI Reviewer successfully generated new review comments for chapter: {chapter_id}")
+    # --- RL Logging: AI Reviewer Output ---
+    review_reward = calculate_review_reward(new_review_comments)
+    log_workflow_event("ai_reviewer_output", chapter_id, None, review_reward, {"review_text": new_review_comments})
+    # --- End RL Logging ---
+
+    return {"message": f"Chapter '{chapter_id}' revision requested, new content and review generated successfully.", "version_id": version_id}
+
+# Revisions run on the job queue's worker pool; jobs queued before a restart are picked up again.
+# The queue is started on first use (or by __main__ in the serving process), not at import: under the
+# debug reloader both the watching parent and the serving child import this module.
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_revision_job_queue():
+    """
+    Returns the job queue with the revision handler registered, starting it and recovering
+    unfinished jobs on first use.
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                job_queue = get_job_queue()
+                job_queue.register("revision", process_revision)
+                job_queue.recover()
+                _job_queue = job_queue
+    return _job_queue
+
 @app.route('/request_revision/<chapter_id>', methods=['POST'])
-async def request_revision(chapter_id: str):
+def request_revision(chapter_id: str):
     app.logger.info(f"Received request for revision for chapter: {chapter_id}")
     if chapter_id != DEFAULT_CHAPTER_ID:
         app.logger.warning(f"Attempt to request revision for invalid chapter ID: {chapter_id}")
@@ -142,66 +360,180 @@ async def request_revision(chapter_id: str):
 
         request_data = request.get_json(silent=True)
         feedback = request_data.get('feedback', '') if request_data else ''
-        app.logger.info(f"Revision feedback received: '{feedback}'")
-
-        revision_metadata = {
-            "human_action": "revision_requested",
-            "revised_spun_version_id": latest_spun_version['id'],
-            "revision_request_timestamp": datetime.now().isoformat(),
-            "feedback": feedback
-        }
-        version_id = chroma_manager.add_chapter_version(
-            chapter_id=chapter_id,
-            content=latest_spun_version['content'],
-            version_type="revision_requested",
-            metadata=revision_metadata
-        )
-
+        revision_mode = request_data.get('mode', REVISION_MODE) if request_data else REVISION_MODE
+        app.logger.info(f"Revision feedback received: '{feedback}' (mode: {revision_mode})")
+        if revision_mode not in ["sequential", "overlapped", "best_of_n"]:
+            return jsonify({"error": f"Invalid revision mode '{revision_mode}'."}), 400
+        candidate_count = request_data.get('candidates', SPIN_CANDIDATE_COUNT) if request_data else SPIN_CANDIDATE_COUNT
+        if not isinstance(candidate_count, int) or not 1 <= candidate_count <= 8:
+            return jsonify({"error": "'candidates' must be an integer between 1 and 8."}), 400
+
+        version_id = record_revision_request(chapter_id, latest_spun_version, feedback)
         if not version_id:
-            app.logger.error(f"Failed to record revision request for chapter '{chapter_id}' in ChromaDB.")
             return jsonify({"error": "Failed to record revision request."}), 500
-        
-        app.logger.info(f"Chapter '{chapter_id}' revision request recorded. New version ID: {version_id}")
-        # --- RL Logging: Human Revision Request ---
-        reward = calculate_human_action_reward("revision_requested", feedback)
-        log_workflow_event("human_action_revision_requested", chapter_id, version_id, reward, {"feedback": feedback, "revised_version_id": latest_spun_version['id']})
-        # --- End RL Logging ---
 
-        app.logger.info(f"Triggering AI Writer to generate new spun content for chapter: {chapter_id} with feedback.")
+        # Writer and reviewer take minutes; the request returns at once and the client polls the job.
+        job_id = get_revision_job_queue().submit("revision", {
+            "chapter_id": chapter_id,
+            "feedback": feedback,
+            "revision_mode": revision_mode,
+            "candidate_count": candidate_count,
+            "version_id": version_id
+        })
+        return jsonify({
+            "message": f"Chapter '{chapter_id}' revision requested; new content is being generated.",
+            "version_id": version_id,
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}"
+        }), 202
+
+    except Exception as e:
+        app.logger.error(f"Error during chapter revision request for {chapter_id}: {e}")
+        return jsonify({"error": f"An error occurred during revision request: {e}"}), 500
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id: str):
+    app.logger.info(f"Received request for job {job_id}.")
+    job = get_revision_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    return jsonify(job), 200
+
+def format_sse(event: str, data: dict, event_id: int = None) -> str:
+    """
+    Formats a server-sent event with a JSON payload. With an event_id, a reconnecting
+    EventSource sends it back in the Last-Event-ID header.
+    """
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/request_revision_stream/<chapter_id>', methods=['POST'])
+def request_revision_stream(chapter_id: str):
+    """
+    Streaming variant of /request_revision. Responds with server-sent events:
+    'revision_recorded', one 'chunk' per piece of generated text, 'spun_complete',
+    then 'review_complete' (or 'error'), and finally 'done'.
+    """
+    app.logger.info(f"Received streaming revision request for chapter: {chapter_id}")
+    if chapter_id != DEFAULT_CHAPTER_ID:
+        app.logger.warning(f"Attempt to request revision for invalid chapter ID: {chapter_id}")
+        return jsonify({"error": "Invalid chapter ID."}), 400
+    if chroma_manager is None:
+        app.logger.error("ChromaManager not initialized globally. Cannot request revision.")
+        return jsonify({"error": "Backend database not available."}), 500
+
+    try:
+        latest_spun_version = chroma_manager.get_latest_chapter_version(chapter_id, "spun")
+        if not latest_spun_version:
+            app.logger.error(f"Cannot request revision for chapter {chapter_id}: No spun content found to revise.")
+            return jsonify({"error": "No spun content found to revise."}), 404
+
         original_content_version = chroma_manager.get_latest_chapter_version(chapter_id, "original")
         if not original_content_version:
             app.logger.error(f"Could not find original content for chapter {chapter_id} to trigger revision.")
             return jsonify({"error": "Could not find original content for revision."}), 500
 
-        new_spun_content = await spin_chapter_content(chapter_id, original_content_version['content'], feedback=feedback)
+        request_data = request.get_json(silent=True)
+        feedback = request_data.get('feedback', '') if request_data else ''
+        app.logger.info(f"Revision feedback received: '{feedback}'")
+
+        version_id = record_revision_request(chapter_id, latest_spun_version, feedback)
+        if not version_id:
+            return jsonify({"error": "Failed to record revision request."}), 500
+    except Exception as e:
+        app.logger.error(f"Error during streaming revision request for {chapter_id}: {e}")
+        return jsonify({"error": f"An error occurred during revision request: {e}"}), 500
 
-        if new_spun_content.startswith("Error:"):
-            app.logger.error(f"AI Writer failed to generate revised content: {new_spun_content}")
-            return jsonify({"error": f"AI Writer failed to generate revised content: {new_spun_content}"}), 500
-        
-        app.logger.info(f"AI Writer successfully generated revised content for chapter: {chapter_id}")
+    def generate_events():
+        yield format_sse("revision_recorded", {"version_id": version_id})
+
+        spun_parts = []
+        try:
+            app.logger.info(f"Streaming AI Writer output for chapter: {chapter_id} with feedback.")
+            for chunk in iterate_in_background(stream_spin_chapter_content(chapter_id, original_content_version['content'], feedback=feedback)):
+                spun_parts.append(chunk)
+                yield format_sse("chunk", {"text": chunk})
+        except Exception as e:
+            app.logger.error(f"AI Writer failed while streaming revised content: {e}")
+            yield format_sse("error", {"error": f"AI Writer failed to generate revised content: {e}"})
+            return
+
+        new_spun_content = "".join(spun_parts)
         # --- RL Logging: AI Writer Output ---
-        log_workflow_event("ai_writer_output", chapter_id, None, 0.0, {"type": "spun_revision", "feedback_used": feedback}) # Reward for writer is indirect
+        log_workflow_event("ai_writer_output", chapter_id, None, 0.0, {"type": "spun_revision", "feedback_used": feedback, "streamed": True})
         # --- End RL Logging ---
+        yield format_sse("spun_complete", {"content_length": len(new_spun_content)})
 
-        app.logger.info(f"Triggering AI Reviewer for the newly generated spun content for chapter: {chapter_id}.")
-        new_review_comments = await review_chapter_content(chapter_id, new_spun_content)
-
+        new_review_comments = run_coroutine(review_chapter_content(chapter_id, new_spun_content)).result()
         if new_review_comments.startswith("Error:"):
             app.logger.error(f"AI Reviewer failed to generate new review comments: {new_review_comments}")
-            return jsonify({"message": f"Chapter '{chapter_id}' revision requested and new content generated, but review failed.", "version_id": version_id}), 200
-        
-        app.logger.info(f"AI Reviewer successfully generated new review comments for chapter: {chapter_id}")
-        # --- RL Logging: AI Reviewer Output ---
-        review_reward = calculate_review_reward(new_review_comments)
-        log_workflow_event("ai_reviewer_output", chapter_id, None, review_reward, {"review_text": new_review_comments})
-        # --- End RL Logging ---
-
-        return jsonify({"message": f"Chapter '{chapter_id}' revision requested, new content and review generated successfully.", "version_id": version_id}), 200
-
-    except Exception as e:
-        app.logger.error(f"Error during chapter revision request for {chapter_id}: {e}")
-        return jsonify({"error": f"An error occurred during revision request: {e}"}), 500
+            yield format_sse("error", {"error": new_review_comments})
+        else:
+            # --- RL Logging: AI Reviewer Output ---
+            review_reward = calculate_review_reward(new_review_comments)
+            log_workflow_event("ai_reviewer_output", chapter_id, None, review_reward, {"review_text": new_review_comments})
+            # --- End RL Logging ---
+            yield format_sse("review_complete", {"content_length": len(new_review_comments)})
+
+        yield format_sse("done", {"version_id": version_id})
+
+    return Response(
+        generate_events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def format_search_results(search_results: list) -> list:
+    """
+    Shapes ChromaManager search results for the frontend.
+    """
+    formatted_results = []
+    for res in search_results:
+        formatted_results.append({
+            "id": res['id'],
+            "content": res['content'],
+            "version_type": res['metadata'].get('version_type', 'unknown'),
+            "timestamp": res['metadata'].get('timestamp', 'unknown'),
+            "distance": res['distance'],
+            "score": res.get('score'),
+            "start": res.get('start'),
+            "end": res.get('end')
+        })
+    return formatted_results
+
+def run_semantic_searches(query_texts: list, n_results: int, filter_metadata: dict, granularity: str, mode: str = "vector") -> list:
+    """
+    Runs all queries as one batch. 'keyword' mode only uses the lexical index (nothing is embedded);
+    'hybrid' fuses it with passage search. In 'vector' mode passage search is used unless granularity
+    is 'document'. Queries without hits in vector or hybrid mode fall back to whole-document search.
+    """
+    if mode == "keyword":
+        return chroma_manager.search_keyword_many(query_texts, n_results, filter_metadata)
+
+    all_results = [[] for _ in query_texts]
+    if mode == "hybrid":
+        all_results = chroma_manager.search_hybrid_many(query_texts, n_results, filter_metadata)
+    elif granularity == "passage":
+        # Best matching passage per version, instead of whole chapters
+        all_results = chroma_manager.search_passages_many(query_texts, n_results, filter_metadata)
+    missing = [i for i, results in enumerate(all_results) if not results]
+    if missing:
+        document_results = chroma_manager.semantic_search_many([query_texts[i] for i in missing], n_results, filter_metadata)
+        for i, results in zip(missing, document_results):
+            all_results[i] = results
+    return all_results
+
+def parse_n_results(value) -> int:
+    """
+    Returns n_results (an integer or integer string) as an int between 1 and 100, or None if it is anything else.
+    """
+    if isinstance(value, (bool, float)):
+        return None
+    try:
+        n_results = int(value)
+    except (TypeError, ValueError):
+        return None
+    return n_results if 1 <= n_results <= 100 else None
 
 @app.route('/semantic_search', methods=['POST'])
 def semantic_search_endpoint():
@@ -213,32 +545,70 @@ def semantic_search_endpoint():
     try:
         request_data = request.get_json()
         query_text = request_data.get('query_text')
-        n_results = request_data.get('n_results', 5)
+        n_results = parse_n_results(request_data.get('n_results', 5))
         filter_metadata = request_data.get('filter_metadata', {})
+        granularity = request_data.get('granularity', 'passage') # 'passage' or 'document'
+        mode = request_data.get('mode', CHROMA_SEARCH_MODE) # 'vector', 'keyword' or 'hybrid'
 
         if not query_text:
             return jsonify({"error": "Missing 'query_text' in request body."}), 400
-
-        app.logger.info(f"Performing semantic search for query: '{query_text}' with n_results={n_results}, filter={filter_metadata}")
-        search_results = chroma_manager.semantic_search(query_text, n_results, filter_metadata)
-
-        formatted_results = []
-        for res in search_results:
-            formatted_results.append({
-                "id": res['id'],
-                "content": res['content'],
-                "version_type": res['metadata'].get('version_type', 'unknown'),
-                "timestamp": res['metadata'].get('timestamp', 'unknown'),
-                "distance": res['distance']
-            })
+        if n_results is None:
+            return jsonify({"error": "'n_results' must be an integer between 1 and 100."}), 400
+        if granularity not in ["passage", "document"]:
+            return jsonify({"error": f"Invalid granularity '{granularity}'."}), 400
+        if mode not in ["vector", "keyword", "hybrid"]:
+            return jsonify({"error": f"Invalid search mode '{mode}'."}), 400
+
+        app.logger.info(f"Performing semantic search for query: '{query_text}' with n_results={n_results}, filter={filter_metadata}, granularity={granularity}, mode={mode}")
+        formatted_results = format_search_results(run_semantic_searches([query_text], n_results, filter_metadata, granularity, mode)[0])
         
         app.logger.info(f"Semantic search returned {len(formatted_results)} results.")
         return jsonify({"results": formatted_results}), 200
 
+    except ValueError as e:
+        app.logger.warning(f"Invalid semantic search request: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error during semantic search: {e}")
         return jsonify({"error": f"An error occurred during semantic search: {e}"}), 500
 
+@app.route('/semantic_search_batch', methods=['POST'])
+def semantic_search_batch_endpoint():
+    app.logger.info("Received request for batched semantic search.")
+    if chroma_manager is None:
+        app.logger.error("ChromaManager not initialized globally. Cannot perform semantic search.")
+        return jsonify({"error": "Backend database not available."}), 500
+
+    try:
+        request_data = request.get_json()
+        query_texts = request_data.get('queries')
+        n_results = parse_n_results(request_data.get('n_results', 5))
+        filter_metadata = request_data.get('filter_metadata', {})
+        granularity = request_data.get('granularity', 'passage')
+        mode = request_data.get('mode', CHROMA_SEARCH_MODE)
+
+        if not query_texts or not isinstance(query_texts, list) or not all(isinstance(q, str) and q for q in query_texts):
+            return jsonify({"error": "'queries' must be a non-empty list of query strings."}), 400
+        if n_results is None:
+            return jsonify({"error": "'n_results' must be an integer between 1 and 100."}), 400
+        if granularity not in ["passage", "document"]:
+            return jsonify({"error": f"Invalid granularity '{granularity}'."}), 400
+        if mode not in ["vector", "keyword", "hybrid"]:
+            return jsonify({"error": f"Invalid search mode '{mode}'."}), 400
+
+        app.logger.info(f"Performing {len(query_texts)} semantic searches with n_results={n_results}, filter={filter_metadata}, granularity={granularity}, mode={mode}")
+        all_results = run_semantic_searches(query_texts, n_results, filter_metadata, granularity, mode)
+        return jsonify({"results": [
+            {"query_text": query_text, "results": format_search_results(results)} for query_text, results in zip(query_texts, all_results)
+        ]}), 200
+
+    except ValueError as e:
+        app.logger.warning(f"Invalid batched semantic search request: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error during batched semantic search: {e}")
+        return jsonify({"error": f"An error occurred during semantic search: {e}"}), 500
+
 @app.route('/chromadb_status')
 def chromadb_status():
     app.logger.info("Received request for ChromaDB status.")
@@ -246,27 +616,40 @@ def chromadb_status():
         app.logger.error("ChromaManager not initialized globally. Cannot get ChromaDB status.")
         return jsonify({"error": "Backend database not available."}), 500
 
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        limit = None
+    if limit is None or not 1 <= limit <= 500:
+        return jsonify({"status": "error", "message": "'limit' must be an integer between 1 and 500."}), 400
+    cursor = request.args.get('cursor')
+    version_type = request.args.get('version_type')
+
     try:
         collection_count = chroma_manager.collection.count()
         app.logger.info(f"ChromaDB collection '{chroma_manager.collection.name}' has {collection_count} documents.")
 
-        all_versions = chroma_manager.get_all_chapter_versions(DEFAULT_CHAPTER_ID)
+        # Metadata only: content_length and content_hash were recorded when each version was written.
+        page = chroma_manager.list_chapter_versions(DEFAULT_CHAPTER_ID, version_type=version_type, limit=limit, cursor=cursor)
         
-        if all_versions:
+        if page['versions']:
             content_summary = []
-            for v in all_versions:
+            for v in page['versions']:
                 content_summary.append({
                     "id": v['id'],
+                    "seq": v['metadata'].get('seq'),
                     "version_type": v['metadata'].get('version_type', 'unknown'),
                     "timestamp": v['metadata'].get('timestamp', 'unknown'),
-                    "content_length": len(v['content'])
+                    "content_length": v['metadata'].get('content_length'),
+                    "content_hash": v['metadata'].get('content_hash')
                 })
-            app.logger.info(f"Found {len(all_versions)} versions for chapter '{DEFAULT_CHAPTER_ID}'.")
+            app.logger.info(f"Found {len(content_summary)} versions for chapter '{DEFAULT_CHAPTER_ID}' on this page.")
             return jsonify({
                 "status": "success",
                 "collection_name": chroma_manager.collection.name,
                 "document_count": collection_count,
-                "chapter_versions": content_summary
+                "chapter_versions": content_summary,
+                "next_cursor": page['next_cursor']
             }), 200
         else:
             app.logger.warning(f"No versions found for default chapter '{DEFAULT_CHAPTER_ID}' in ChromaDB.")
@@ -277,10 +660,39 @@ def chromadb_status():
                 "message": f"No content found for chapter '{DEFAULT_CHAPTER_ID}'. Please run Python agents."
             }), 200
 
+    except ValueError as e:
+        app.logger.warning(f"Invalid ChromaDB status request: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error checking ChromaDB status: {e}")
         return jsonify({"status": "error", "message": f"Failed to connect to ChromaDB: {e}"}), 500
 
+def advance_chapter_status(status: str, version_type: str) -> str:
+    """
+    Returns the chapter's workflow status after a version of the given type was added.
+    """
+    if version_type == 'approved':
+        return 'approved'
+    if version_type == 'revision_requested':
+        return 'revision_requested'
+    if version_type == 'spun' and status == 'revision_requested':
+        return 'processing'
+    return status
+
+def chapter_status(versions: list, up_to_seq: int = None) -> str:
+    """
+    Replays the chapter's versions in sequence order (optionally only those up to up_to_seq)
+    and returns the resulting status: pending, processing, revision_requested or approved.
+    """
+    status = 'pending'
+    # Versions are ordered by their per-chapter sequence number; no timestamps need parsing.
+    for version in sorted(versions, key=lambda version: version['metadata'].get('seq') or 0):
+        seq = version['metadata'].get('seq')
+        if seq is None or (up_to_seq is not None and seq > up_to_seq):
+            continue
+        status = advance_chapter_status(status, version['metadata'].get('version_type'))
+    return status
+
 @app.route('/chromadb_status_chapter/<chapter_id>')
 def chromadb_status_chapter(chapter_id: str):
     app.logger.info(f"Received request for chapter status for chapter: {chapter_id}")
@@ -292,32 +704,8 @@ def chromadb_status_chapter(chapter_id: str):
         return jsonify({"error": "Backend database not available."}), 500
 
     try:
-        all_versions = chroma_manager.get_all_chapter_versions(chapter_id)
-        
-        latest_status = 'pending'
-        latest_timestamp = datetime.min
-
-        for version in all_versions:
-            v_type = version['metadata'].get('version_type')
-            v_timestamp_str = version['metadata'].get('timestamp')
-            
-            if v_timestamp_str:
-                v_timestamp = datetime.fromisoformat(v_timestamp_str)
-                if v_type == 'approved' and v_timestamp > latest_timestamp:
-                    latest_status = 'approved'
-                    latest_timestamp = v_timestamp
-                elif v_type == 'revision_requested' and v_timestamp > latest_timestamp:
-                    latest_status = 'revision_requested'
-                    latest_timestamp = v_timestamp
-                elif v_type == 'spun' and v_timestamp > latest_timestamp:
-                    if latest_status == 'revision_requested':
-                        latest_status = 'processing'
-                    elif latest_status == 'pending':
-                        latest_status = 'pending'
-                    latest_timestamp = v_timestamp
-                elif v_type == 'original' and latest_status == 'pending':
-                     latest_status = 'pending'
-                     latest_timestamp = v_timestamp
+        all_versions = chroma_manager.get_all_chapter_versions(chapter_id, include_content=False)
+        latest_status = chapter_status(all_versions)
 
         app.logger.info(f"Latest status for chapter '{chapter_id}': {latest_status}")
         return jsonify({"latest_status": latest_status}), 200
@@ -326,6 +714,119 @@ def chromadb_status_chapter(chapter_id: str):
         app.logger.error(f"Error getting chapter status for {chapter_id}: {e}")
         return jsonify({"error": f"Failed to get chapter status: {e}"}), 500
 
+@app.route('/chapter_versions/<chapter_id>')
+def chapter_versions(chapter_id: str):
+    """
+    Incremental sync: returns the chapter's versions added after ?after_seq=N (oldest first) and the
+    last_seq to send next time. Content is only included with ?include_content=true.
+    """
+    app.logger.info(f"Received request for versions of chapter {chapter_id} since seq {request.args.get('after_seq', 0)}")
+    if chapter_id != DEFAULT_CHAPTER_ID:
+        app.logger.warning(f"Attempt to list versions for invalid chapter ID: {chapter_id}")
+        return jsonify({"error": "Invalid chapter ID."}), 400
+    if chroma_manager is None:
+        app.logger.error("ChromaManager not initialized globally. Cannot list chapter versions.")
+        return jsonify({"error": "Backend database not available."}), 500
+
+    try:
+        after_seq = int(request.args.get('after_seq', 0))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({"error": "'after_seq' and 'limit' must be integers."}), 400
+    if after_seq < 0 or not 1 <= limit <= 500:
+        return jsonify({"error": "'after_seq' must be at least 0 and 'limit' between 1 and 500."}), 400
+    include_content = request.args.get('include_content', 'false').lower() == 'true'
+
+    try:
+        result = chroma_manager.get_chapter_versions_since(chapter_id, after_seq, limit, include_content=include_content)
+        return jsonify(result), 200
+    except Exception as e:
+        app.logger.error(f"Error listing versions for {chapter_id}: {e}")
+        return jsonify({"error": f"Failed to list chapter versions: {e}"}), 500
+
+@app.route('/events/<chapter_id>')
+def chapter_events(chapter_id: str):
+    """
+    Pushes the chapter's changes as server-sent events, so the UI fetches content only once it exists:
+    'status' on connect, then 'version_created' for every new version and 'status_changed' when the
+    workflow status moves. Events carry the version's seq as their ID; a client reconnecting with
+    Last-Event-ID (or ?after_seq=N) receives what it missed.
+    """
+    app.logger.info(f"Received event stream request for chapter: {chapter_id}")
+    if chapter_id != DEFAULT_CHAPTER_ID:
+        app.logger.warning(f"Attempt to subscribe to events for invalid chapter ID: {chapter_id}")
+        return jsonify({"error": "Invalid chapter ID."}), 400
+    if chroma_manager is None:
+        app.logger.error("ChromaManager not initialized globally. Cannot stream chapter events.")
+        return jsonify({"error": "Backend database not available."}), 500
+
+    try:
+        resume_from = request.headers.get('Last-Event-ID', request.args.get('after_seq'))
+        after_seq = int(resume_from) if resume_from is not None else None
+    except ValueError:
+        return jsonify({"error": "'after_seq' (or Last-Event-ID) must be an integer."}), 400
+    if after_seq is not None and after_seq < 0:
+        return jsonify({"error": "'after_seq' (or Last-Event-ID) must be at least 0."}), 400
+
+    try:
+        all_versions = chroma_manager.get_all_chapter_versions(chapter_id, include_content=False)
+        if after_seq is None:
+            # New subscribers start from the current state; only later versions are pushed.
+            after_seq = max((version['metadata'].get('seq') or 0 for version in all_versions), default=0)
+        status = chapter_status(all_versions, up_to_seq=after_seq)
+    except Exception as e:
+        app.logger.error(f"Error preparing event stream for {chapter_id}: {e}")
+        return jsonify({"error": f"Failed to read chapter state: {e}"}), 500
+
+    def generate_events():
+        nonlocal after_seq, status
+        yield format_sse("status", {"latest_status": status, "seq": after_seq}, event_id=after_seq)
+        while True:
+            try:
+                result = chroma_manager.wait_for_chapter_versions(chapter_id, after_seq, timeout=EVENTS_KEEPALIVE_SECONDS)
+            except Exception as e:
+                app.logger.error(f"Error reading new versions for {chapter_id}: {e}")
+                yield format_sse("error", {"error": f"Failed to read new versions: {e}"})
+                return
+            if not result["versions"]:
+                # Comment line: keeps proxies from closing the idle connection and notices disconnected clients.
+                yield ": keep-alive\n\n"
+                continue
+
+            for version in result["versions"]:
+                seq = version['metadata']['seq']
+                version_type = version['metadata'].get('version_type')
+                yield format_sse("version_created", {
+                    "id": version['id'],
+                    "seq": seq,
+                    "version_type": version_type,
+                    "timestamp": version['metadata'].get('timestamp')
+                }, event_id=seq)
+                new_status = advance_chapter_status(status, version_type)
+                if new_status != status:
+                    status = new_status
+                    yield format_sse("status_changed", {"latest_status": status, "seq": seq}, event_id=seq)
+            after_seq = result["last_seq"]
+
+    return Response(
+        generate_events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/llm_usage')
+def llm_usage():
+    app.logger.info("Received request for LLM usage.")
+    return jsonify({"usage": get_usage_tracker().get_totals()}), 200
+
+@app.route('/embedding_stats')
+def embedding_stats():
+    app.logger.info("Received request for embedding stats.")
+    if chroma_manager is None:
+        app.logger.error("ChromaManager not initialized globally. Cannot get embedding stats.")
+        return jsonify({"error": "Backend database not available."}), 500
+    return jsonify({"embedding": chroma_manager.get_embedding_stats()}), 200
+
 
 if __name__ == '__main__':
     
@@ -335,5 +836,8 @@ if __name__ == '__main__':
     os.makedirs(os.path.dirname(SCREENSHOT_OUTPUT_FILE_PATH), exist_ok=True)
 
     port = int(os.environ.get("PORT", 5000))
+    # The reloader's parent process only watches files; the child it spawns serves and runs the jobs.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        get_revision_job_queue()
     app.run(debug=True, host='0.0.0.0', port=port)
 
@@ -0,0 +1,86 @@
+# src/human_in_loop/backend/test_app_validation.py
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the backend directory to the Python path to import the Flask app
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import app as backend_app
+from config import DEFAULT_CHAPTER_ID
+
+
+@pytest.fixture
+def client():
+    if backend_app.chroma_manager is None:
+        pytest.skip("ChromaManager could not be initialized.")
+    backend_app.app.config["TESTING"] = True
+    return backend_app.app.test_client()
+
+@pytest.mark.parametrize("value", [0, 101, -1, "abc", "", 2.5, True, None, [5]])
+def test_parse_n_results_rejects_invalid_values(value):
+    assert backend_app.parse_n_results(value) is None
+
+@pytest.mark.parametrize("value, expected", [(1, 1), (100, 100), ("7", 7)])
+def test_parse_n_results_accepts_integers(value, expected):
+    assert backend_app.parse_n_results(value) == expected
+
+@pytest.mark.parametrize("n_results", [0, 101, "many", 2.5, None])
+def test_semantic_search_rejects_invalid_n_results(client, n_results):
+    response = client.post('/semantic_search', json={"query_text": "storm", "n_results": n_results, "mode": "keyword"})
+    assert response.status_code == 400
+    assert "n_results" in response.get_json()["error"]
+
+@pytest.mark.parametrize("n_results", [0, 101, "many", 2.5, None])
+def test_semantic_search_batch_rejects_invalid_n_results(client, n_results):
+    response = client.post('/semantic_search_batch', json={"queries": ["storm"], "n_results": n_results, "mode": "keyword"})
+    assert response.status_code == 400
+    assert "n_results" in response.get_json()["error"]
+
+def test_semantic_search_accepts_n_results_string(client):
+    response = client.post('/semantic_search', json={"query_text": "storm", "n_results": "3", "mode": "keyword"})
+    assert response.status_code == 200
+    assert response.get_json()["results"] == []
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=501", "limit=ten", "after_seq=-1", "after_seq=1.5"])
+def test_chapter_versions_rejects_invalid_paging(client, query):
+    response = client.get(f'/chapter_versions/{DEFAULT_CHAPTER_ID}?{query}')
+    assert response.status_code == 400
+
+def test_chapter_versions_rejects_unknown_chapter(client):
+    assert client.get('/chapter_versions/no-such-chapter').status_code == 400
+
+def test_chapter_versions_accepts_valid_paging(client):
+    response = client.get(f'/chapter_versions/{DEFAULT_CHAPTER_ID}?after_seq=0&limit=500')
+    assert response.status_code == 200
+    assert "last_seq" in response.get_json()
+
+@pytest.mark.parametrize("mode", ["vector", "keyword", "hybrid"])
+@pytest.mark.parametrize("filter_metadata", [["chapter_id"], "chapter_id", {"chapter_id": {"$bogus": 1}}])
+def test_semantic_search_rejects_invalid_filter(client, mode, filter_metadata):
+    response = client.post('/semantic_search', json={"query_text": "storm", "mode": mode, "filter_metadata": filter_metadata})
+    assert response.status_code == 400
+    assert "filter_metadata" in response.get_json()["error"]
+
+def test_semantic_search_batch_rejects_invalid_filter(client):
+    response = client.post('/semantic_search_batch', json={"queries": ["storm", "harbour"], "mode": "hybrid", "filter_metadata": {"chapter_id": {"$bogus": 1}}})
+    assert response.status_code == 400
+
+def test_semantic_search_rejects_unknown_mode(client):
+    response = client.post('/semantic_search', json={"query_text": "storm", "mode": "fuzzy"})
+    assert response.status_code == 400
+
+def test_semantic_search_accepts_valid_filter(client):
+    response = client.post('/semantic_search', json={"query_text": "storm", "mode": "keyword", "filter_metadata": {"chapter_id": DEFAULT_CHAPTER_ID}})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("after_seq", ["-1", "abc", "1.5"])
+def test_events_rejects_invalid_after_seq(client, after_seq):
+    assert client.get(f'/events/{DEFAULT_CHAPTER_ID}?after_seq={after_seq}').status_code == 400
+    assert client.get(f'/events/{DEFAULT_CHAPTER_ID}', headers={"Last-Event-ID": after_seq}).status_code == 400
+
+def test_events_rejects_unknown_chapter(client):
+    assert client.get('/events/no-such-chapter').status_code == 400
@@ -114,6 +114,8 @@ function App() {
   );
 
   const CHAPTER_ID = "the_gates_of_morning_book1_chapter1";
+  // How often a queued revision job is checked
+  const JOB_POLL_INTERVAL_MS = 2000;
 
   // UPDATED: Use import.meta.env.VITE_BACKEND_API_BASE for Vite
   const API_BASE =
@@ -165,42 +167,6 @@ function App() {
     [API_BASE]
   );
 
-  const fetchChapterStatus = useCallback(async () => {
-    setLoading((prev) => ({ ...prev, status: true }));
-    setErrors((prev) => ({ ...prev, status: null }));
-    try {
-      const response = await fetch(
-        `${API_BASE}/chromadb_status_chapter/${CHAPTER_ID}`
-      );
-      if (!response.ok) {
-        const errorData = await response
-          .json()
-          .catch(() => ({ message: response.statusText }));
-        throw new Error(
-          `HTTP error! status: ${response.status} - ${
-            errorData.message || response.statusText
-          }`
-        );
-      }
-      const data = await response.json();
-      if (data.latest_status) {
-        setCurrentChapterStatus(data.latest_status);
-      } else {
-        setCurrentChapterStatus("pending");
-      }
-    } catch (error: any) {
-      const errorMessage =
-        error instanceof Error ? error.message : "An unexpected error occurred";
-      setErrors((prev) => ({
-        ...prev,
-        status: `Failed to fetch chapter status: ${errorMessage}`,
-      }));
-      setCurrentChapterStatus("pending");
-    } finally {
-      setLoading((prev) => ({ ...prev, status: false }));
-    }
-  }, [API_BASE, CHAPTER_ID]);
-
   const handleSemanticSearch = async () => {
     if (!searchQuery.trim()) {
       setErrors((prev) => ({
@@ -366,16 +332,89 @@ function App() {
         ),
         fetchContent("/screenshot", "screenshotUrl"),
       ]);
-      fetchChapterStatus();
     };
     loadData();
-  }, [fetchContent, fetchChapterStatus, CHAPTER_ID]);
+  }, [fetchContent, CHAPTER_ID]);
+
+  // Push updates: the backend announces every new version and status change of the chapter,
+  // so content is fetched once, when it exists, instead of after a fixed delay.
+  useEffect(() => {
+    const contentTypes: Record<string, keyof ContentData> = {
+      original: "original",
+      spun: "spun",
+      review_comments: "reviewComments",
+    };
+    const events = new EventSource(`${API_BASE}/events/${CHAPTER_ID}`);
+
+    const applyStatus = (event: MessageEvent) => {
+      const payload = JSON.parse(event.data);
+      setCurrentChapterStatus(payload.latest_status);
+      setLoading((prev) => ({ ...prev, status: false }));
+      setErrors((prev) => ({ ...prev, status: null }));
+    };
+    events.addEventListener("status", applyStatus);
+    events.addEventListener("status_changed", applyStatus);
+
+    events.addEventListener("version_created", (event: MessageEvent) => {
+      const payload = JSON.parse(event.data);
+      const contentType = contentTypes[payload.version_type];
+      if (!contentType) return;
+      setLoading((prev) => ({ ...prev, [contentType]: true }));
+      fetchContent(`/content/${CHAPTER_ID}/${payload.version_type}`, contentType);
+    });
+
+    events.onerror = () => {
+      // EventSource reconnects by itself (resuming from the last event ID) unless the backend refused it.
+      if (events.readyState === EventSource.CLOSED) {
+        setErrors((prev) => ({
+          ...prev,
+          status:
+            "Lost the connection for live chapter updates. Reload the page to reconnect.",
+        }));
+        setLoading((prev) => ({ ...prev, status: false }));
+      }
+    };
+
+    return () => events.close();
+  }, [API_BASE, CHAPTER_ID, fetchContent]);
 
   const handleImageError = () => {
     setImageError(true);
     setErrors((prev) => ({ ...prev, screenshot: "Failed to load screenshot" }));
   };
 
+  // Queues a revision on the backend's job queue and waits for the job to finish. The request
+  // returns at once; the new spun text, review and status arrive over the chapter event stream.
+  const runRevisionJob = async (feedback: string) => {
+    const response = await fetch(`${API_BASE}/request_revision/${CHAPTER_ID}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ feedback }),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || "Unknown error occurred.");
+    }
+
+    setCurrentChapterStatus("processing");
+    setActionMessage("Revision requested. AI is writing the new version...");
+
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const jobResponse = await fetch(`${API_BASE}${data.status_url}`);
+      const job = await jobResponse.json();
+      if (!jobResponse.ok) {
+        throw new Error(job.error || "Could not check the revision job.");
+      }
+      if (job.status === "failed") {
+        throw new Error(job.error || "The revision job failed.");
+      }
+      if (job.status === "succeeded") {
+        return job.result;
+      }
+    }
+  };
+
   const handleWorkflowAction = async (
     actionType: "approve" | "request_revision",
     feedback: string = ""
@@ -384,52 +423,25 @@ function App() {
     setErrors((prev) => ({ ...prev, action: null }));
     setActionMessage(null);
 
-    const endpoint =
-      actionType === "approve"
-        ? `/approve_chapter/${CHAPTER_ID}`
-        : `/request_revision/${CHAPTER_ID}`;
-    const method = "POST";
-    const body =
-      actionType === "request_revision"
-        ? JSON.stringify({ feedback })
-        : undefined;
-    const headers = { "Content-Type": "application/json" };
-
     try {
-      const response = await fetch(`${API_BASE}${endpoint}`, {
-        method,
-        body,
-        headers,
-      });
-      const data = await response.json();
-
-      if (!response.ok) {
-        throw new Error(data.error || "Unknown error occurred.");
-      }
-      setActionMessage(data.message);
-      setCurrentChapterStatus(
-        actionType === "approve" ? "approved" : "processing"
-      );
-
       if (actionType === "request_revision") {
+        const result = await runRevisionJob(feedback);
         setActionMessage(
-          "Revision requested. AI is generating new content and review. Please wait..."
-        );
-        await new Promise((resolve) => setTimeout(resolve, 10000));
-        setLoading((prev) => ({ ...prev, spun: true, reviewComments: true }));
-        await Promise.all([
-          fetchContent(`/content/${CHAPTER_ID}/spun`, "spun"),
-          fetchContent(
-            `/content/${CHAPTER_ID}/review_comments`,
-            "reviewComments"
-          ),
-        ]);
-        await fetchChapterStatus();
-        setActionMessage(
-          "New content and review comments loaded. Ready for review."
+          result?.message ||
+            "New content and review comments generated. Ready for review."
         );
       } else if (actionType === "approve") {
-        await fetchChapterStatus();
+        const response = await fetch(`${API_BASE}/approve_chapter/${CHAPTER_ID}`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+        });
+        const data = await response.json();
+
+        if (!response.ok) {
+          throw new Error(data.error || "Unknown error occurred.");
+        }
+        setActionMessage(data.message);
+        setCurrentChapterStatus("approved");
       }
     } catch (error: any) {
       const errorMessage =
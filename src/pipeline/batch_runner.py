@@ -0,0 +1,264 @@
+# src/pipeline/batch_runner.py
+from dotenv import load_dotenv
+load_dotenv() # This loads variables from .env file
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import urlparse, unquote
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import (
+    BATCH_SCRAPE_CONCURRENCY,
+    BATCH_SPIN_CONCURRENCY,
+    BATCH_REVIEW_CONCURRENCY,
+    BATCH_QUEUE_SIZE,
+    BATCH_SCREENSHOT_DIR,
+)
+from ai_agents.writer_agent import spin_chapter_content, spin_chapter_content_chunked
+from ai_agents.reviewer_agent import review_chapter_content
+from ai_agents.llm_client import get_llm_client
+from database.chroma_manager import ChromaManager, get_chroma_manager
+
+
+def chapter_id_from_url(url: str) -> str:
+    """
+    Derives a chapter ID from a chapter URL, e.g.
+    https://en.wikisource.org/wiki/The_Gates_of_Morning/Book_1/Chapter_1 -> the_gates_of_morning_book1_chapter1
+    """
+    path = unquote(urlparse(url).path)
+    if path.startswith("/wiki/"):
+        path = path[len("/wiki/"):]
+    chapter_id = re.sub(r"[^a-z0-9]+", "_", path.lower()).strip("_")
+    return re.sub(r"_(?=\d)", "", chapter_id) # "book_1" -> "book1"
+
+def parse_chapter_item(item: str) -> dict:
+    """
+    Parses one input item: a URL, a chapter ID already stored in ChromaDB, or "chapter_id url".
+
+    Returns:
+        dict: A chapter job with 'chapter_id' and 'url' (None if no URL was given).
+    """
+    parts = item.split()
+    if len(parts) == 2:
+        return {"chapter_id": parts[0], "url": parts[1]}
+    if parts[0].startswith(("http://", "https://")):
+        return {"chapter_id": chapter_id_from_url(parts[0]), "url": parts[0]}
+    return {"chapter_id": parts[0], "url": None}
+
+def _is_newer(version: dict, than: dict) -> bool:
+    if not version:
+        return False
+    if not than:
+        return True
+    return version['metadata'].get('seq', 0) > than['metadata'].get('seq', 0)
+
+
+class BatchPipeline:
+    """
+    Pushes many chapters through scrape -> spin -> review -> store as an asyncio pipeline.
+
+    Each stage has its own worker pool, and stages are connected by bounded queues so a slow
+    stage applies backpressure to the ones before it. Work already present in ChromaDB is
+    reused, so an interrupted run can simply be started again with the same input.
+    """
+    def __init__(self, scrape_concurrency: int = BATCH_SCRAPE_CONCURRENCY, spin_concurrency: int = BATCH_SPIN_CONCURRENCY,
+                 review_concurrency: int = BATCH_REVIEW_CONCURRENCY, queue_size: int = BATCH_QUEUE_SIZE,
+                 chunked: bool = False, use_cache: bool = True, resume: bool = True, chroma_manager: ChromaManager = None):
+        self.scrape_concurrency = scrape_concurrency
+        self.spin_concurrency = spin_concurrency
+        self.review_concurrency = review_concurrency
+        self.queue_size = queue_size
+        self.chunked = chunked
+        self.use_cache = use_cache
+        self.resume = resume
+        self.chroma_manager = chroma_manager or get_chroma_manager()
+
+        self._browser = None
+        self._playwright = None
+        self._browser_lock = None
+
+    async def _get_latest(self, chapter_id: str, version_type: str) -> dict:
+        if not self.resume:
+            return None
+        # ChromaDB calls are blocking; keep them off the event loop.
+        return await asyncio.to_thread(self.chroma_manager.get_latest_chapter_version, chapter_id, version_type)
+
+    async def _get_browser(self):
+        async with self._browser_lock:
+            if self._browser is None:
+                from playwright.async_api import async_playwright # Only needed when something has to be scraped
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+        return self._browser
+
+    async def _close_browser(self):
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+            self._browser = None
+            self._playwright = None
+
+    # --- Stages ---
+
+    async def _scrape(self, job: dict):
+        original = await self._get_latest(job['chapter_id'], "original")
+        if original:
+            job['original'] = original['content']
+            job['skipped'].append("scrape")
+            return
+        if not job['url']:
+            raise ValueError(f"No original content in ChromaDB and no URL given for chapter '{job['chapter_id']}'.")
+
+        from scraping.web_scraper import scrape_chapter_with_browser
+        browser = await self._get_browser()
+        screenshot_path = os.path.join(BATCH_SCREENSHOT_DIR, f"{job['chapter_id']}.png")
+        job['original'] = await scrape_chapter_with_browser(browser, job['url'], job['chapter_id'], screenshot_path,
+                                                            chroma_manager=self.chroma_manager)
+
+    async def _spin(self, job: dict):
+        original = await self._get_latest(job['chapter_id'], "original")
+        spun = await self._get_latest(job['chapter_id'], "spun")
+        if _is_newer(spun, original):
+            job['spun'] = spun['content']
+            job['skipped'].append("spin")
+            return
+
+        if self.chunked:
+            spun_content = await spin_chapter_content_chunked(job['chapter_id'], job['original'], use_cache=self.use_cache,
+                                                              chroma_manager=self.chroma_manager)
+        else:
+            spun_content = await spin_chapter_content(job['chapter_id'], job['original'], use_cache=self.use_cache,
+                                                      chroma_manager=self.chroma_manager)
+        if spun_content.startswith("Error:"):
+            raise RuntimeError(spun_content)
+        job['spun'] = spun_content
+
+    async def _review(self, job: dict):
+        spun = await self._get_latest(job['chapter_id'], "spun")
+        review = await self._get_latest(job['chapter_id'], "review_comments")
+        if _is_newer(review, spun):
+            job['skipped'].append("review")
+            return
+
+        review_comments = await review_chapter_content(job['chapter_id'], job['spun'], use_cache=self.use_cache,
+                                                       chroma_manager=self.chroma_manager)
+        if review_comments.startswith("Error:"):
+            raise RuntimeError(review_comments)
+
+    # --- Plumbing ---
+
+    async def _worker(self, stage_name: str, stage, in_queue: asyncio.Queue, out_queue: asyncio.Queue = None):
+        while True:
+            job = await in_queue.get()
+            try:
+                started = time.perf_counter()
+                await stage(job)
+                job['timings'][stage_name] = round(time.perf_counter() - started, 3)
+                if out_queue is not None:
+                    await out_queue.put(job) # Blocks while the next stage is saturated
+                else:
+                    job['status'] = "completed"
+                    print(f"Batch: Chapter '{job['chapter_id']}' completed (skipped: {job['skipped'] or 'none'}).")
+            except Exception as e:
+                job['status'] = "failed"
+                job['error'] = f"{stage_name}: {e}"
+                print(f"Batch: Chapter '{job['chapter_id']}' failed during {stage_name}: {e}")
+            finally:
+                in_queue.task_done()
+
+    async def run(self, items: list) -> list:
+        """
+        Runs the pipeline over the given chapter items (see parse_chapter_item).
+
+        Returns:
+            list: One result dict per chapter with 'chapter_id', 'status', 'error', 'skipped' and per-stage 'timings'.
+        """
+        self._browser_lock = asyncio.Lock()
+        scrape_queue = asyncio.Queue(maxsize=self.queue_size)
+        spin_queue = asyncio.Queue(maxsize=self.queue_size)
+        review_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        workers = (
+            [asyncio.create_task(self._worker("scrape", self._scrape, scrape_queue, spin_queue)) for _ in range(self.scrape_concurrency)] +
+            [asyncio.create_task(self._worker("spin", self._spin, spin_queue, review_queue)) for _ in range(self.spin_concurrency)] +
+            [asyncio.create_task(self._worker("review", self._review, review_queue)) for _ in range(self.review_concurrency)]
+        )
+
+        jobs = []
+        started = time.perf_counter()
+        try:
+            for item in items:
+                job = parse_chapter_item(item)
+                job.update({"status": "pending", "error": None, "skipped": [], "timings": {}})
+                jobs.append(job)
+                await scrape_queue.put(job)
+
+            # Each worker hands a job on before marking it done, so joining in stage order drains the pipeline.
+            await scrape_queue.join()
+            await spin_queue.join()
+            await review_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self._close_browser()
+
+        elapsed = time.perf_counter() - started
+        completed = sum(1 for job in jobs if job['status'] == "completed")
+        print(f"Batch: {completed}/{len(jobs)} chapters completed in {elapsed:.1f}s.")
+        return [
+            {key: job[key] for key in ("chapter_id", "url", "status", "error", "skipped", "timings")}
+            for job in jobs
+        ]
+
+
+def read_chapter_items(path: str) -> list:
+    """
+    Reads chapter items from a text file, one per line. Blank lines and '#' comments are ignored.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run scrape -> spin -> review -> store for many chapters.")
+    parser.add_argument("chapters", nargs="+", help="Chapter URLs/IDs, or a text file with one item per line.")
+    parser.add_argument("--scrape-concurrency", type=int, default=BATCH_SCRAPE_CONCURRENCY)
+    parser.add_argument("--spin-concurrency", type=int, default=BATCH_SPIN_CONCURRENCY)
+    parser.add_argument("--review-concurrency", type=int, default=BATCH_REVIEW_CONCURRENCY)
+    parser.add_argument("--queue-size", type=int, default=BATCH_QUEUE_SIZE)
+    parser.add_argument("--chunked", action="store_true", help="Spin long chapters in parallel windows.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse cached LLM responses.")
+    parser.add_argument("--no-resume", action="store_true", help="Redo every stage even if its output is already in ChromaDB.")
+    parser.add_argument("--report", help="Write per-chapter results as JSON to this path.")
+    args = parser.parse_args()
+
+    items = []
+    for entry in args.chapters:
+        items.extend(read_chapter_items(entry) if os.path.isfile(entry) else [entry])
+
+    pipeline = BatchPipeline(
+        scrape_concurrency=args.scrape_concurrency,
+        spin_concurrency=args.spin_concurrency,
+        review_concurrency=args.review_concurrency,
+        queue_size=args.queue_size,
+        chunked=args.chunked,
+        use_cache=not args.no_cache,
+        resume=not args.no_resume
+    )
+    results = await pipeline.run(items)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Batch: Report written to {args.report}")
+
+    await get_llm_client().aclose() # Release pooled connections before the event loop closes
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,229 @@
+# src/pipeline/job_queue.py
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import JOB_DB_PATH, JOB_WORKERS, JOB_LEASE_SECONDS
+
+
+class JobQueue:
+    """
+    Background jobs for work that takes too long for one HTTP request (e.g. a revision: writer plus reviewer).
+
+    Jobs are recorded in an SQLite file, so their status can be looked up by ID while they run and after
+    they finish, and are executed by a pool of worker threads. Each job kind has a handler registered with
+    register(); it is called with the job's params and returns a JSON-serialisable result, or raises to fail the job.
+
+    Several processes may share one job file (gunicorn workers, the debug reloader, a benchmark). A running job
+    is leased to the queue that claimed it (owner: pid plus a random token) and the lease is renewed while it
+    runs, so only jobs whose owner stopped renewing are treated as interrupted.
+    """
+    def __init__(self, path: str = JOB_DB_PATH, workers: int = JOB_WORKERS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at TEXT NOT NULL,"
+                " started_at TEXT,"
+                " finished_at TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("lease_until", "REAL")): # Files created before leases
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+
+        # Renews the leases of this queue's running jobs and fails jobs whose lease expired
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def register(self, kind: str, handler):
+        """
+        Sets the function that runs jobs of this kind: handler(**params) -> result.
+        """
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, params: dict) -> str:
+        """
+        Records a job and hands it to the worker pool.
+
+        Returns:
+            str: The job ID.
+
+        Raises:
+            ValueError: If no handler is registered for the kind.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'.")
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params), datetime.now().isoformat())
+            )
+        self._executor.submit(self._run, job_id)
+        print(f"Jobs: Queued {kind} job {job_id}.")
+        return job_id
+
+    def _run(self, job_id: str):
+        with self._lock, self._conn:
+            # Claiming the job atomically means a job is never run twice.
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, lease_until = ? WHERE id = ? AND status = 'queued'",
+                (datetime.now().isoformat(), self.owner, time.time() + self.lease_seconds, job_id)
+            ).rowcount
+            row = self._conn.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not claimed:
+            return
+
+        kind, params = row
+        try:
+            result = self._handlers[kind](**json.loads(params))
+            status, result, error = "succeeded", json.dumps(result), None
+        except Exception as e:
+            print(f"Jobs: {kind} job {job_id} failed: {e}")
+            status, result, error = "failed", None, str(e)
+        with self._lock, self._conn:
+            # Not if another queue already failed the job because its lease ran out
+            finished = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND status = 'running' AND owner = ?",
+                (status, result, error, datetime.now().isoformat(), job_id, self.owner)
+            ).rowcount
+        if finished:
+            print(f"Jobs: {kind} job {job_id} {status}.")
+        else:
+            print(f"Jobs: {kind} job {job_id} finished after its lease expired; result discarded.")
+
+    def get(self, job_id: str) -> dict:
+        """
+        Returns the job's 'id', 'kind', 'status' (queued, running, succeeded or failed), 'params', 'result',
+        'error' and timestamps, or None if there is no such job.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, params, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(["id", "kind", "status", "params", "result", "error", "created_at", "started_at", "finished_at"], row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def counts(self) -> dict:
+        """
+        Returns the number of jobs per status.
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def _fail_expired(self) -> int:
+        """
+        Marks running jobs failed whose owner stopped renewing their lease (or that predate leases).
+
+        Returns:
+            int: The number of jobs marked failed.
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by a restart.', finished_at = ?, lease_until = NULL"
+                " WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (datetime.now().isoformat(), time.time())
+            ).rowcount
+
+    def _renew_leases(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND owner = ?",
+                        (time.time() + self.lease_seconds, self.owner)
+                    )
+                expired = self._fail_expired()
+                if expired:
+                    print(f"Jobs: Marked {expired} jobs of stopped processes failed.")
+            except sqlite3.Error as e:
+                print(f"Jobs: Error renewing job leases: {e}")
+
+    def recover(self):
+        """
+        Resumes jobs left behind by a previous run: queued jobs are handed to the workers again, running
+        jobs whose lease expired are marked failed (jobs other live processes are running are left alone).
+        Call it once after registering handlers.
+        """
+        expired = self._fail_expired()
+        if expired:
+            print(f"Jobs: Marked {expired} interrupted jobs failed.")
+        with self._lock:
+            queued = self._conn.execute("SELECT id, kind FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        resumed = [job_id for job_id, kind in queued if kind in self._handlers]
+        for job_id in resumed:
+            self._executor.submit(self._run, job_id)
+        if resumed:
+            print(f"Jobs: Resumed {len(resumed)} queued jobs.")
+
+    def close(self, wait: bool = True):
+        """
+        Stops the worker pool (finishing running jobs if wait is True) and closes the database.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._stop.set()
+        self._heartbeat.join()
+        with self._lock:
+            self._conn.close()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """
+    Returns the process-wide JobQueue, creating it on first use.
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
+
+def close_job_queue():
+    """
+    Stops the process-wide JobQueue, if one was created. Jobs still queued are resumed by recover() on the next start.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        job_queue = _job_queue
+        _job_queue = None
+    if job_queue is not None:
+        job_queue.close()
+
+atexit.register(close_job_queue)
@@ -0,0 +1,103 @@
+# src/pipeline/test_batch_runner.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline import batch_runner
+from pipeline.batch_runner import BatchPipeline, chapter_id_from_url, parse_chapter_item, read_chapter_items
+
+
+class VersionStore:
+    """
+    In-memory stand-in for the ChromaManager methods the pipeline reads: the latest version per chapter and type.
+    """
+    def __init__(self):
+        self.versions = {}
+        self.seq = 0
+
+    def add(self, chapter_id: str, version_type: str, content: str):
+        self.seq += 1
+        self.versions[(chapter_id, version_type)] = {"content": content, "metadata": {"seq": self.seq}}
+
+    def get_latest_chapter_version(self, chapter_id: str, version_type: str) -> dict:
+        return self.versions.get((chapter_id, version_type))
+
+@pytest.fixture
+def store(monkeypatch):
+    store = VersionStore()
+    calls = {"spin": [], "review": []}
+    async def fake_spin(chapter_id, original, use_cache=True, chroma_manager=None):
+        calls["spin"].append(chapter_id)
+        if "broken" in chapter_id:
+            return "Error: model unavailable"
+        chroma_manager.add(chapter_id, "spun", original.upper())
+        return original.upper()
+    async def fake_review(chapter_id, spun, use_cache=True, chroma_manager=None):
+        calls["review"].append(chapter_id)
+        chroma_manager.add(chapter_id, "review_comments", f"Review of {spun}")
+        return f"Review of {spun}"
+    monkeypatch.setattr(batch_runner, "spin_chapter_content", fake_spin)
+    monkeypatch.setattr(batch_runner, "review_chapter_content", fake_review)
+    store.calls = calls
+    return store
+
+def test_chapter_id_from_url():
+    assert chapter_id_from_url("https://en.wikisource.org/wiki/The_Gates_of_Morning/Book_1/Chapter_1") == "the_gates_of_morning_book1_chapter1"
+    assert chapter_id_from_url("https://example.com/wiki/Caf%C3%A9_Stories/Chapter_12") == "caf_stories_chapter12"
+
+def test_parse_chapter_item():
+    assert parse_chapter_item("chapter_1") == {"chapter_id": "chapter_1", "url": None}
+    assert parse_chapter_item("ch1 https://example.com/wiki/Ch_1") == {"chapter_id": "ch1", "url": "https://example.com/wiki/Ch_1"}
+    assert parse_chapter_item("https://example.com/wiki/Book/Chapter_2") == {"chapter_id": "book_chapter2", "url": "https://example.com/wiki/Book/Chapter_2"}
+
+def test_read_chapter_items_skips_blank_lines_and_comments(tmp_path):
+    path = tmp_path / "chapters.txt"
+    path.write_text("# Book 1\nchapter_1\n\n  chapter_2  \n# done\n", encoding="utf-8")
+    assert read_chapter_items(str(path)) == ["chapter_1", "chapter_2"]
+
+def test_pipeline_runs_every_stage(store):
+    store.add("ch1", "original", "storm")
+    store.add("ch2", "original", "harbour")
+    pipeline = BatchPipeline(scrape_concurrency=1, spin_concurrency=2, review_concurrency=1, queue_size=1, chroma_manager=store)
+
+    results = asyncio.run(pipeline.run(["ch1", "ch2"]))
+
+    assert [result["status"] for result in results] == ["completed", "completed"]
+    assert all(result["skipped"] == ["scrape"] for result in results)
+    assert set(results[0]["timings"]) == {"scrape", "spin", "review"}
+    assert store.get_latest_chapter_version("ch2", "review_comments")["content"] == "Review of HARBOUR"
+
+def test_pipeline_resumes_finished_work(store):
+    store.add("ch1", "original", "storm")
+    store.add("ch1", "spun", "STORM")
+    store.add("ch2", "original", "harbour")
+    store.add("ch2", "spun", "HARBOUR")
+    store.add("ch2", "review_comments", "Fine")
+    store.add("ch2", "original", "harbour, rewritten") # Newer than its spun version
+
+    results = asyncio.run(BatchPipeline(chroma_manager=store).run(["ch1", "ch2"]))
+
+    assert results[0]["skipped"] == ["scrape", "spin"]
+    assert results[1]["skipped"] == ["scrape"]
+    assert store.calls["spin"] == ["ch2"]
+    assert sorted(store.calls["review"]) == ["ch1", "ch2"]
+
+def test_pipeline_reports_failures_per_chapter(store):
+    store.add("broken_ch", "original", "storm")
+    store.add("ch1", "original", "harbour")
+
+    results = asyncio.run(BatchPipeline(chroma_manager=store).run(["broken_ch", "missing_ch", "ch1"]))
+
+    assert results[0]["status"] == "failed"
+    assert results[0]["error"] == "spin: Error: model unavailable"
+    assert results[1]["status"] == "failed"
+    assert results[1]["error"].startswith("scrape: No original content")
+    assert results[2]["status"] == "completed"
+    assert store.calls["review"] == ["ch1"]
@@ -0,0 +1,128 @@
+# src/pipeline/test_job_queue.py
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+# Add the parent directory to the Python path to allow imports from src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline.job_queue import JobQueue
+
+
+@pytest.fixture
+def job_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+@pytest.fixture
+def queues(job_path):
+    created = []
+    def make_queue(**kwargs) -> JobQueue:
+        queue = JobQueue(path=job_path, workers=2, **kwargs)
+        created.append(queue)
+        return queue
+    yield make_queue
+    for queue in created:
+        queue.close()
+
+def wait_for(queue: JobQueue, job_id: str, statuses=("succeeded", "failed"), timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} still {queue.get(job_id)['status']} after {timeout}s")
+
+def insert_job(job_path: str, job_id: str, status: str, lease_until: float = None):
+    # Rows as another (possibly stopped) process would have left them
+    with sqlite3.connect(job_path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, params, created_at, owner, lease_until) VALUES (?, 'add', ?, '{\"a\": 1, \"b\": 2}', ?, 'gone-1234', ?)",
+            (job_id, status, datetime.now().isoformat(), lease_until)
+        )
+
+def test_job_runs_and_records_result(queues):
+    queue = queues()
+    queue.register("add", lambda a, b: {"sum": a + b})
+    job_id = queue.submit("add", {"a": 1, "b": 2})
+    job = wait_for(queue, job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"sum": 3}
+    assert job["params"] == {"a": 1, "b": 2}
+    assert job["started_at"] and job["finished_at"]
+    assert queue.counts() == {"succeeded": 1}
+
+def test_failing_handler_fails_job(queues):
+    queue = queues()
+    def fail():
+        raise RuntimeError("model unavailable")
+    queue.register("fail", fail)
+    job = wait_for(queue, queue.submit("fail", {}))
+    assert job["status"] == "failed"
+    assert job["error"] == "model unavailable"
+    assert job["result"] is None
+
+def test_unknown_kind_is_rejected(queues):
+    with pytest.raises(ValueError):
+        queues().submit("missing", {})
+    assert queues().get("no-such-job") is None
+
+def test_job_is_claimed_once(queues):
+    queue = queues()
+    calls = []
+    queue.register("add", lambda a, b: calls.append(a + b))
+    job_id = queue.submit("add", {"a": 1, "b": 2})
+    wait_for(queue, job_id)
+    queue._run(job_id) # e.g. a second worker or process picking up the same row
+    assert calls == [3]
+
+def test_recover_resumes_queued_and_fails_expired_jobs(job_path, queues):
+    queues() # Creates the job file
+    insert_job(job_path, "queued-job", "queued")
+    insert_job(job_path, "expired-job", "running", lease_until=time.time() - 1)
+    insert_job(job_path, "unleased-job", "running")
+
+    queue = queues()
+    queue.register("add", lambda a, b: a + b)
+    queue.recover()
+
+    assert wait_for(queue, "queued-job")["result"] == 3
+    for job_id in ("expired-job", "unleased-job"):
+        job = queue.get(job_id)
+        assert job["status"] == "failed"
+        assert job["error"] == "Interrupted by a restart."
+
+def test_recover_leaves_jobs_of_live_queues_running(queues):
+    release = threading.Event()
+    sibling = queues(lease_seconds=0.3)
+    sibling.register("wait", lambda: release.wait(5))
+    job_id = sibling.submit("wait", {})
+    wait_for(sibling, job_id, statuses=("running",))
+
+    restarted = queues(lease_seconds=0.3)
+    restarted.recover()
+    # Several lease periods pass: the sibling keeps renewing, so neither queue fails the job
+    time.sleep(1.0)
+    assert restarted.get(job_id)["status"] == "running"
+
+    release.set()
+    assert wait_for(sibling, job_id)["status"] == "succeeded"
+
+def test_result_of_expired_lease_is_discarded(job_path, queues):
+    queue = queues()
+    release = threading.Event()
+    queue.register("wait", lambda: release.wait(5))
+    job_id = queue.submit("wait", {})
+    wait_for(queue, job_id, statuses=("running",))
+
+    # Another queue gave up on the job, e.g. because this process stalled past its lease
+    with sqlite3.connect(job_path) as conn:
+        conn.execute("UPDATE jobs SET status = 'failed', error = 'Interrupted by a restart.' WHERE id = ?", (job_id,))
+    release.set()
+    queue._executor.shutdown(wait=True) # Lets the handler return and the worker try to record its result
+    assert queue.get(job_id)["status"] == "failed"
@@ -34,6 +34,46 @@ def calculate_review_reward(review_comments: str) -> float:
 
     return reward
 
+def calculate_candidate_reward(candidate_text: str, original_text: str, finish_reason: str = None) -> float:
+    """
+    Scores a generated chapter candidate without another LLM call.
+    A cheap heuristic: penalises truncated generations, large length drift from the original
+    and near-verbatim copies, and rewards keeping the paragraph structure.
+
+    Args:
+        candidate_text (str): The generated (spun) chapter text.
+        original_text (str): The chapter text the candidate was generated from.
+        finish_reason (str): The API's finishReason for the candidate, if known.
+
+    Returns:
+        float: A numerical reward score. Higher is better.
+    """
+    if not candidate_text or not candidate_text.strip():
+        return -5.0
+
+    reward = 0.0
+    if finish_reason and finish_reason != "STOP":
+        reward -= 1.0 # Cut off (MAX_TOKENS) or blocked (SAFETY, RECITATION)
+
+    if original_text:
+        length_ratio = len(candidate_text) / len(original_text)
+        if 0.8 <= length_ratio <= 1.5:
+            reward += 0.5
+        else:
+            reward -= min(1.0, abs(1.0 - length_ratio)) # Dropped or padded content
+
+        original_paragraphs = max(1, original_text.count("\n\n") + 1)
+        candidate_paragraphs = candidate_text.count("\n\n") + 1
+        reward += 0.3 * min(candidate_paragraphs, original_paragraphs) / max(candidate_paragraphs, original_paragraphs)
+
+        # Word overlap with the original: some is expected, an almost unchanged copy is not a rewrite.
+        original_words = set(original_text.lower().split())
+        candidate_words = set(candidate_text.lower().split())
+        if original_words and len(original_words & candidate_words) / len(original_words | candidate_words) > 0.9:
+            reward -= 0.5
+
+    return reward
+
 def calculate_human_action_reward(action_type: str, feedback: str = "") -> float:
     """
     Calculates a reward score based on the human's explicit action.
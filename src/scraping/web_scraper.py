@@ -7,16 +7,92 @@ import sys
 from playwright.async_api import async_playwright
 
 # Add the parent directory to the Python path to allow imports from src/
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import paths and DEFAULT_CHAPTER_ID from our centralized configuration
-from src.config import ORIGINAL_CHAPTER_PATH, SCREENSHOT_OUTPUT_FILE_PATH, DEFAULT_CHAPTER_ID
-# CORRECTED IMPORT: Import from src.database.chroma_manager
-from src.database.chroma_manager import ChromaManager # Import ChromaManager
+from config import ORIGINAL_CHAPTER_PATH, SCREENSHOT_OUTPUT_FILE_PATH, DEFAULT_CHAPTER_ID
+# Same module path as the agents and the backend, so they all share one process-wide ChromaManager
+from database.chroma_manager import ChromaManager, get_chroma_manager
 
 # Define the URL to scrape
 URL = "https://en.wikisource.org/wiki/The_Gates_of_Morning/Book_1/Chapter_1"
 
+CONTENT_SELECTOR = "#mw-content-text .mw-parser-output"
+
+async def extract_chapter_text(page, url: str) -> str:
+    """
+    Navigates the page to the URL and returns the cleaned main chapter text.
+
+    Args:
+        page: A Playwright page.
+        url (str): The URL of the web page to scrape.
+
+    Returns:
+        str: The chapter text with blank lines removed and each line stripped.
+    """
+    await page.goto(url, wait_until="domcontentloaded")
+    print("Page loaded successfully.")
+
+    # --- Extract Chapter Content ---
+    await page.wait_for_selector(CONTENT_SELECTOR)
+    chapter_content = await page.inner_text(CONTENT_SELECTOR)
+    return "\n".join([line.strip() for line in chapter_content.splitlines() if line.strip()])
+
+def store_original_version(chapter_id: str, content: str, url: str = None, chroma_manager: ChromaManager = None) -> str:
+    """
+    Stores scraped content in ChromaDB as a new 'original' version.
+    chroma_manager defaults to the process-wide instance.
+
+    Returns:
+        str: The new version ID, or None if storing failed.
+    """
+    chroma_manager = chroma_manager or get_chroma_manager()
+    original_version_id = chroma_manager.add_chapter_version(
+        chapter_id=chapter_id, # Use the passed chapter_id
+        content=content,
+        version_type="original",
+        metadata={"source_url": url} if url else None
+    )
+    if original_version_id:
+        print(f"Original content stored in ChromaDB with ID: {original_version_id}")
+    else:
+        print("Failed to store original content in ChromaDB.")
+    return original_version_id
+
+async def scrape_chapter_with_browser(browser, url: str, chapter_id: str, screenshot_path: str = None,
+                                      chroma_manager: ChromaManager = None) -> str:
+    """
+    Scrapes one chapter in a new page of an already running browser and stores it in ChromaDB.
+    Used by the batch pipeline so many chapters share a single browser process.
+
+    Args:
+        browser: A launched Playwright browser.
+        url (str): The URL of the web page to scrape.
+        chapter_id (str): The ID to associate with this chapter in ChromaDB.
+        screenshot_path (str, optional): Where to save a full-page screenshot. Skipped if None.
+        chroma_manager (ChromaManager, optional): Where to store the content; defaults to the process-wide instance.
+
+    Returns:
+        str: The scraped chapter text.
+
+    Raises:
+        Exception: Any navigation/extraction error, or RuntimeError if the content could not be stored.
+    """
+    print(f"Starting to scrape: {url}")
+    page = await browser.new_page()
+    try:
+        cleaned_content = await extract_chapter_text(page, url)
+        if not await asyncio.to_thread(store_original_version, chapter_id, cleaned_content, url, chroma_manager=chroma_manager):
+            raise RuntimeError(f"Failed to store original content for chapter '{chapter_id}' in ChromaDB.")
+
+        if screenshot_path:
+            os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
+            await page.screenshot(path=screenshot_path, full_page=True)
+            print(f"Full page screenshot saved to {screenshot_path}")
+        return cleaned_content
+    finally:
+        await page.close()
+
 async def scrape_chapter(url: str, chapter_id: str):
     """
     Scrapes the main content from a given URL, takes a full-page screenshot,
@@ -33,15 +109,8 @@ async def scrape_chapter(url: str, chapter_id: str):
         page = await browser.new_page()
 
         try:
-            # Navigate to the specified URL
-            await page.goto(url, wait_until="domcontentloaded")
-            print("Page loaded successfully.")
-
-            # --- Extract Chapter Content ---
-            content_selector = "#mw-content-text .mw-parser-output"
-            await page.wait_for_selector(content_selector)
-            chapter_content = await page.inner_text(content_selector)
-            cleaned_content = "\n".join([line.strip() for line in chapter_content.splitlines() if line.strip()])
+            # Navigate to the specified URL and extract the chapter text
+            cleaned_content = await extract_chapter_text(page, url)
 
             # Ensure the directory for the output file exists
             os.makedirs(os.path.dirname(ORIGINAL_CHAPTER_PATH), exist_ok=True)
@@ -52,16 +121,7 @@ async def scrape_chapter(url: str, chapter_id: str):
             print(f"Chapter content saved to {ORIGINAL_CHAPTER_PATH}")
 
             # --- Store original content in ChromaDB ---
-            chroma_manager = ChromaManager() # Initialize ChromaManager
-            original_version_id = chroma_manager.add_chapter_version(
-                chapter_id=chapter_id, # Use the passed chapter_id
-                content=cleaned_content,
-                version_type="original"
-            )
-            if original_version_id:
-                print(f"Original content stored in ChromaDB with ID: {original_version_id}")
-            else:
-                print("Failed to store original content in ChromaDB.")
+            await asyncio.to_thread(store_original_version, chapter_id, cleaned_content, url)
 
             # --- Take Screenshot ---
             # Ensure the directory for the screenshot file exists